@@ -40,7 +40,7 @@ from bpy.props import (
         PointerProperty,
         BoolVectorProperty
         )
-from .measureit_arch_baseclass import BaseProp, BaseWithText
+from .measureit_arch_baseclass import BaseProp, BaseWithText, queue_text_update
 from .measureit_arch_main import get_smart_selected, get_selected_vertex
 from mathutils import Vector, Matrix
 import math
@@ -49,6 +49,7 @@ def annotation_update_flag(self,context):
     for textField in self.textFields:
         textField.text_updated = True
         update_custom_props(self,context)
+    queue_text_update(self)
 
 def update_custom_props(self,context):
     ignoredProps = ['AnnotationGenerator','DimensionGenerator','LineGenerator','_RNA_UI','cycles','cycles_visibility','obverts']
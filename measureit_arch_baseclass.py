@@ -7,10 +7,38 @@ from mathutils import Matrix
 from bpy.types import PropertyGroup, Panel, Object, Operator, SpaceView3D, Scene
 from bpy.props import IntProperty, CollectionProperty, FloatVectorProperty, BoolProperty, StringProperty, \
                 FloatProperty, EnumProperty, PointerProperty
+from bpy.app.handlers import persistent
+
+
+# --------------------------------------------------------------------
+# Text update queue
+# Items whose text needs to be redrawn are queued by their update
+# callbacks and the draw functions, so the 2D draw handler only has to
+# look at those. Items are kept as (ID type, ID name, data path) since
+# references to collection items don't survive adding or removing
+# items
+# --------------------------------------------------------------------
+textUpdateQueue = {}
+
+
+def queue_text_update(item):
+    idData = item.id_data
+    if idData is None:
+        return
+    try:
+        path = item.path_from_id()
+    except ValueError:
+        return
+
+    # Text fields are updated through the item that owns them
+    if '.textFields[' in path:
+        path = path[:path.rindex('.textFields[')]
+    textUpdateQueue[(idData.id_type, idData.name, path)] = True
 
 
 def update_flag(self,context):
     self.text_updated = True
+    queue_text_update(self)
 
 def has_dimension_generator(context):
     return context.object is not None and \
@@ -62,6 +90,86 @@ def recalc_dimWrapper_index(self,context):
                 dim.itemIndex = id_area
                 id_area += 1
 
+
+
+# --------------------------------------------------------------------
+# Style registry
+# Maps style names to their index in the StyleGenerator collections,
+# so items find their style without scanning all of them. Indices are
+# kept instead of the styles themselves, Blender may move collection
+# items in memory when styles are added or removed
+# --------------------------------------------------------------------
+styleRegistry = {}
+
+
+def invalidate_styles(self=None, context=None):
+    styleRegistry.clear()
+
+
+def get_style_index(scene, collectionName):
+    key = (scene.name, collectionName)
+    index = styleRegistry.get(key)
+    if index is None:
+        styles = getattr(scene.StyleGenerator, collectionName)
+        index = {style.name: idx for idx, style in enumerate(styles)}
+        styleRegistry[key] = index
+    return index
+
+
+# --------------------------------------------------------------------
+# Get a style by name
+# collectionName: 'alignedDimensions', 'annotations' or 'line_groups'
+# return: the style, None if there is no style with that name
+# --------------------------------------------------------------------
+def get_style(context, collectionName, name):
+    scene = context.scene
+    styles = getattr(scene.StyleGenerator, collectionName)
+    idx = get_style_index(scene, collectionName).get(name)
+    if idx is None:
+        return None
+
+    if idx < len(styles) and styles[idx].name == name:
+        return styles[idx]
+
+    # Renamed or removed since the index was built
+    del styleRegistry[(scene.name, collectionName)]
+    idx = get_style_index(scene, collectionName).get(name)
+    if idx is None:
+        return None
+    return styles[idx]
+
+
+# Properties an item is drawn with, its style's if it uses one
+def get_style_props(context, item, collectionName):
+    if item.uses_style:
+        style = get_style(context, collectionName, item.style)
+        if style is not None:
+            return style
+    return item
+
+
+# Style names aren't custom properties so they have no update callback,
+# any change to a scene can be a renamed style
+@persistent
+def style_update_handler(scene, depsgraph=None):
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    for update in depsgraph.updates:
+        if isinstance(update.id, Scene):
+            invalidate_styles()
+            return
+
+
+@persistent
+def style_load_handler(dummy):
+    invalidate_styles()
+
+
+bpy.app.handlers.depsgraph_update_post.append(style_update_handler)
+bpy.app.handlers.load_post.append(style_load_handler)
+bpy.app.handlers.undo_post.append(style_load_handler)
+bpy.app.handlers.redo_post.append(style_load_handler)
+
                 
 class BaseProp:
     icon: StringProperty(name = "Icon",
@@ -413,6 +521,29 @@ class MeasureItARCHSceneProps(PropertyGroup):
                             description="Render the scene and automatically combine the rendered image with the Measureit-ARCH render pass",
                             default=False)
 
+    write_png_direct: BoolProperty(name="Write PNG Directly",
+                            description="Save MeasureIt_ARCH renders straight to a PNG in the Output path, without an image datablock. Uses much less memory on large renders",
+                            default=False)
+
+    svg_pretty_print: BoolProperty(name="Indent SVG",
+                            description="Indent the elements of SVG renders, turn off for smaller files",
+                            default=True)
+
+    svg_merge_paths: BoolProperty(name="Merge SVG Paths",
+                            description="Write the lines of each item as one path of connected polylines and merge filled triangles into outlines. Gives much smaller SVG files",
+                            default=True)
+
+    svg_precision: IntProperty(name="SVG Precision", min=0, max=6, default=2,
+                            description="Number of decimal places of merged SVG path coordinates")
+
+    use_tiled_render: BoolProperty(name="Tiled Render",
+                            description="Render large sheets in tiles, the image is written straight to a PNG in the Output path. Use when the sheet is larger than the GPU can render at once",
+                            default=False)
+
+    render_tile_size: IntProperty(name="Tile Size", min=256, max=16384, default=2048,
+                            description="Width and height of a render tile in pixels",
+                            subtype='PIXEL')
+
     default_scale: IntProperty(name='Default Paper Scale', min=1, default=25,
                                 description="Default Paper Scale (used for font sizing)")
     
@@ -497,6 +628,8 @@ class DeletePropButton(Operator):
         # Delete element
         itemGroup[self.tag].free = True
         itemGroup.remove(self.tag)
+        if self.is_style:
+            invalidate_styles()
         # redraw
         context.area.tag_redraw()
 
@@ -607,6 +740,7 @@ class DeleteAllItemsButton(Operator):
                 StyleGen.annotations.remove(0)
             for wrapper in StyleGen.wrappedStyles:
                 StyleGen.wrappedStyles.remove(0)
+            invalidate_styles()
 
         else:
             if self.item_type is 'D':
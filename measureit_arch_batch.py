@@ -0,0 +1,207 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+# File: measureit_arch_batch.py
+# Batch export of Views, runs without any UI so it can be
+# called from the command line:
+#   blender -b file.blend --python-expr
+#       "import bpy; bpy.ops.measureit_arch.batch_export()"
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+
+import bpy
+import importlib
+import multiprocessing
+import os
+import shutil
+import site
+import sys
+import tempfile
+import time
+from bpy.types import Operator
+from bpy.props import BoolProperty, IntProperty, StringProperty
+
+from .measureit_arch_render import render_main, render_main_svg
+from .measureit_arch_views import update
+
+
+# --------------------------------------------------------------------
+# Process pool for the SVG export workers
+# Workers run the Python bundled with Blender (not the Blender binary)
+# and import svg_export as a top level module, so they never load bpy
+# or the rest of the addon
+# processes: number of workers, 0 for one per core
+# return: pool, the worker function, names of the top level modules
+#         to release with release_export_modules once the pool is done
+# --------------------------------------------------------------------
+def get_export_pool(processes):
+    addonDir = os.path.dirname(os.path.abspath(__file__))
+
+    # Spawn workers unpickle the job function by module name, so it has
+    # to be imported as the top level svg_export here as well, not as a
+    # submodule of the addon
+    oldModules = set(sys.modules)
+    sys.path.insert(0, addonDir)
+    try:
+        exportModule = importlib.import_module('svg_export')
+    finally:
+        sys.path.remove(addonDir)
+    moduleNames = [name for name in set(sys.modules) - oldModules
+                   if os.path.dirname(getattr(sys.modules[name], '__file__', None) or '') == addonDir]
+
+    mpContext = multiprocessing.get_context('spawn')
+    mpContext.set_executable(getattr(bpy.app, 'binary_path_python', sys.executable))
+    pool = mpContext.Pool(processes or None, initializer=site.addsitedir, initargs=(addonDir,))
+    return pool, exportModule.export_drawing, moduleNames
+
+
+# --------------------------------------------------------------------
+# Drop the top level copies of the export modules from sys.modules, so
+# the generic names (svg_export, svg_writer, ...) don't clash with other
+# addons or a reloaded copy of this one. Jobs are pickled by module
+# name, so only call this once nothing more is sent to the pool
+# --------------------------------------------------------------------
+def release_export_modules(moduleNames):
+    for name in moduleNames:
+        sys.modules.pop(name, None)
+
+
+# --------------------------------------------------------------------
+# Render a list of Views to their output paths
+# viewNames: names of the Views to export, all Views if None
+# allFrames: export the whole frame range of each View
+# processes: with more than 1, SVG projection, clipping and writing
+#            run in a pool of worker processes while the next View is
+#            drawn, 0 uses one worker per core
+# return: list of (view name, seconds) for the exported Views
+# --------------------------------------------------------------------
+def export_views(self, context, viewNames=None, png=True, svg=False, allFrames=False, processes=1):
+    scene = context.scene
+    ViewGen = scene.ViewGenerator
+    oldIndex = ViewGen.active_index
+    oldCamera = scene.camera
+    oldFrame = scene.frame_current
+
+    pool = None
+    jobDir = None
+    exportModules = []
+    if svg and processes != 1:
+        pool, exportDrawing, exportModules = get_export_pool(processes)
+        jobDir = tempfile.mkdtemp(prefix='measureit_arch_')
+
+    timings = []
+    results = []
+    try:
+        for idx, view in enumerate(ViewGen.views):
+            if viewNames is not None and view.name not in viewNames:
+                continue
+            if view.camera is None:
+                print("MeasureIt_ARCH: Skipping View " + view.name + ", it has no camera")
+                continue
+
+            start = time.perf_counter()
+
+            # Same camera & resolution setup as picking the View in the UI
+            ViewGen.active_index = idx
+            scene.camera = view.camera
+            update(None, context)
+
+            frames = [view.start_frame]
+            if allFrames:
+                frames = range(view.start_frame, view.end_frame + 1)
+
+            for frame in frames:
+                scene.frame_set(frame)
+                if png:
+                    render_main(self, context, animation=True)
+                if svg and pool is None:
+                    render_main_svg(self, context)
+                elif svg:
+                    job = render_main_svg(self, context, jobDir=jobDir)
+                    results.append(pool.apply_async(exportDrawing, (job,)))
+
+            elapsed = time.perf_counter() - start
+            print("MeasureIt_ARCH: View " + view.name + " exported in " + "%.2f" % elapsed + " s")
+            timings.append((view.name, elapsed))
+
+        # Wait for the SVG workers still writing
+        if pool is not None:
+            pool.close()
+            waitStart = time.perf_counter()
+            for result in results:
+                filename, seconds = result.get()
+                print("MeasureIt_ARCH: Wrote " + filename + " in " + "%.2f" % seconds + " s")
+            pool.join()
+            print("MeasureIt_ARCH: Waited " + "%.2f" % (time.perf_counter() - waitStart) + " s for SVG workers")
+    finally:
+        if pool is not None:
+            pool.terminate()
+        release_export_modules(exportModules)
+        if jobDir is not None:
+            shutil.rmtree(jobDir, ignore_errors=True)
+
+        # Restore the active View
+        if len(ViewGen.views) > 0:
+            ViewGen.active_index = oldIndex
+            update(None, context)
+        scene.camera = oldCamera
+        scene.frame_set(oldFrame)
+
+    return timings
+
+
+class BatchExportViews(Operator):
+    bl_idname = "measureit_arch.batch_export"
+    bl_label = "Export Views"
+    bl_description = "Render Views to their output paths, works in background mode"
+    bl_category = 'MeasureitArch'
+
+    views: StringProperty(name="Views",
+                          description="Comma separated View names, all Views are exported if empty",
+                          default="")
+    png: BoolProperty(name="PNG", description="Export a PNG image of each View", default=True)
+    svg: BoolProperty(name="SVG", description="Export an SVG drawing of each View", default=False)
+    frames: BoolProperty(name="All Frames", description="Export every frame in the frame range of each View", default=False)
+    processes: IntProperty(name="Processes",
+                           description="Worker processes writing the SVG drawings, 0 uses one per core, "
+                                       "1 writes them in Blender",
+                           default=1, min=0)
+
+    # ------------------------------
+    # Execute button action
+    # ------------------------------
+    def execute(self, context):
+        viewNames = None
+        if self.views != "":
+            viewNames = {name.strip() for name in self.views.split(",")}
+
+        start = time.perf_counter()
+        timings = export_views(self, context, viewNames, png=self.png, svg=self.svg,
+                               allFrames=self.frames, processes=self.processes)
+        elapsed = time.perf_counter() - start
+
+        if len(timings) == 0:
+            self.report({'WARNING'}, "MeasureIt_ARCH: No Views with a camera to export")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "MeasureIt_ARCH: Exported " + str(len(timings)) + " Views in " + "%.2f" % elapsed + " s")
+        return {'FINISHED'}
@@ -739,21 +739,7 @@ class AddAreaButton(Operator):
 
                 # Calc Perimeter edges
                 bm = bmesh.from_edit_mesh(myobj.data)
-                faces = bm.faces
-
-                bm.faces.ensure_lookup_table()
-
-                perimiterEdges = []
-                for faceIdx in mylist:
-                    face = faces[faceIdx]
-                    edges = face.edges
-                    for edge in edges:
-                        adjFaces = edge.link_faces
-                        if len(adjFaces)>1:
-                            if adjFaces[0].index in mylist and adjFaces[1].index in mylist:
-                                pass
-                        else:
-                            perimiterEdges.append(edge.index)
+                perimiterEdges = get_perimeter_edges(bm, mylist)
 
                 # Add perimeter edges to buffer
                 newDim['perimeterEdgeBuffer'] = perimiterEdges 
@@ -976,6 +962,22 @@ class CursorToArcOrigin(Operator):
             "Please Select an Arc Dimension")
         return {'CANCELLED'}
 
+# --------------------------------------------------------------------
+# Perimeter of a set of faces
+# An edge is on the perimeter when only one face of the set uses it,
+# edges are returned in face order
+# --------------------------------------------------------------------
+def get_perimeter_edges(bm, faceIdxs):
+    bm.faces.ensure_lookup_table()
+    faces = bm.faces
+
+    edgeCount = {}
+    for faceIdx in dict.fromkeys(faceIdxs):
+        for edge in faces[faceIdx].edges:
+            edgeCount[edge.index] = edgeCount.get(edge.index, 0) + 1
+
+    return [edgeIdx for edgeIdx, count in edgeCount.items() if count == 1]
+
 class AddFaceToArea(Operator):   
     bl_idname = "measureit_arch.addfacetoarea"
     bl_label = "Add Selected Faces to Area Dimension"
@@ -1030,30 +1032,19 @@ class AddFaceToArea(Operator):
                     else:
                         return{'CANCLED'}
 
-                    # add faces to buffer
+                    # add faces to buffer, skipping the ones already in it
                     templist = dim['facebuffer'].to_list()
+                    faceSet = set(templist)
                     for idx in mylist:
-                        templist.append(idx)
+                        if idx not in faceSet:
+                            faceSet.add(idx)
+                            templist.append(idx)
                     dim['facebuffer'] = templist
 
 
                     # Calc Perimeter edges
                     bm = bmesh.from_edit_mesh(myobj.data)
-                    faces = bm.faces
-
-                    bm.faces.ensure_lookup_table()
-
-                    perimiterEdges = []
-                    dim['perimeterEdgeBuffer'] = perimiterEdges 
-                    for faceIdx in templist:
-                        face = faces[faceIdx]
-                        edges = face.edges
-                        for edge in edges:
-                            adjFaces = edge.link_faces
-                            if adjFaces[0].index in templist and adjFaces[1].index in templist:
-                                pass
-                            else:
-                                perimiterEdges.append(edge.index)
+                    perimiterEdges = get_perimeter_edges(bm, templist)
 
                     # Add perimeter edges to buffer
                     dim['perimeterEdgeBuffer'] = perimiterEdges 
@@ -1114,32 +1105,15 @@ class RemoveFaceFromArea(Operator):
                         return{'CANCLED'}
 
                     # remove faces from buffer
-                    templist = dim['facebuffer'].to_list()
-                    for idx in mylist:
-                        if idx in templist:
-                            idxToRemove = templist.index(idx)
-                            del templist[idxToRemove]
+                    removeSet = set(mylist)
+                    templist = [idx for idx in dim['facebuffer'].to_list() if idx not in removeSet]
 
                     dim['facebuffer'] = templist
 
 
                     # reCalc Perimeter edges
                     bm = bmesh.from_edit_mesh(myobj.data)
-                    faces = bm.faces
-
-                    bm.faces.ensure_lookup_table()
-
-                    perimiterEdges = []
-                    dim['perimeterEdgeBuffer'] = perimiterEdges 
-                    for faceIdx in templist:
-                        face = faces[faceIdx]
-                        edges = face.edges
-                        for edge in edges:
-                            adjFaces = edge.link_faces
-                            if adjFaces[0].index in templist and adjFaces[1].index in templist:
-                                pass
-                            else:
-                                perimiterEdges.append(edge.index)
+                    perimiterEdges = get_perimeter_edges(bm, templist)
 
                     # Add perimeter edges to buffer
                     dim['perimeterEdgeBuffer'] = perimiterEdges 
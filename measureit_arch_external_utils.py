@@ -26,6 +26,7 @@
 
 
 from .measureit_arch_geometry import get_mesh_vertex, get_point, sortPoints, select_normal, interpolate3d
+from .measureit_arch_baseclass import get_style_props
 from mathutils import Vector, Matrix, Euler, Quaternion
 from math import fabs, degrees, radians, sqrt, cos, sin, pi, floor
 
@@ -84,11 +85,7 @@ def blenderBIM_get_coords (context, offset_pos=True):
     return dim_coords_list
 
 def get_dim_coords(context, myobj, DimGen, dim, mat, offset_pos = True):
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     # get points positions from indicies
     aMatrix = dim.dimObjectA.matrix_world
@@ -44,12 +44,61 @@ import numpy as np
 from array import array
 import random
 from . import svg_shaders
+from . import svg_occlusion
+from .measureit_arch_baseclass import get_style_props, queue_text_update
+from .measureit_arch_text_atlas import textAtlas
 from datetime import datetime
-
-lastMode = None
-lineBatch3D = {}
-dashedBatch3D = {}
-hiddenBatch3D = {}
+from bpy.app.handlers import persistent
+
+# Line group cache, keyed on (object name, line group name)
+# Each entry holds the local coords, weights and GPU batches of a line group
+# along with the state it was built from
+lineGroupCache = {}
+
+# Geometry revision counters keyed on object / mesh name,
+# bumped by the depsgraph handler when their geometry changes
+geometryRevisions = {}
+
+# Mesh topology (edges, edge-face adjacency, crease angles), keyed on
+# ('EVAL', object name) or ('MESH', mesh name)
+meshTopologyCache = {}
+
+# Dimension geometry cache, keyed on the dimensions pointer and the
+# instance being drawn
+# Entries hold the final world space lines, fills & text card of a
+# dimension along with the state they were computed from
+dimensionCache = {}
+
+# Scene wide part of the dimension cache state, computed once per draw
+dimSceneState = None
+
+# Per redraw state read from bpy once, None outside of draw3d_loop
+drawContext = None
+
+# Depsgraph instances of objects with generators, keyed on the name of
+# the instanced object, None when it needs to be rebuilt
+instanceTable = None
+instanceRevision = 0
+# (scene, view layer) pointers the table was built from
+instanceTableKey = None
+
+# Instance being drawn, (instancer name, persistent id) or None for
+# objects drawn by themselves
+drawInstanceKey = None
+
+# Properties the cached dimension geometry depends on, missing ones
+# (like dimAxis on aligned dimensions) are skipped
+DIM_STATE_PROPS = ('dimPointA', 'dimPointB', 'dimOffset', 'dimLeaderOffset', 'dimRotation',
+                   'dimViewPlane', 'dimAxis', 'endcapA', 'endcapB', 'endcapSize', 'endcapArrowAngle',
+                   'evalMods', 'fontSize', 'textAlignment')
+SCENE_STATE_PROPS = ('use_text_autoplacement', 'metric_precision', 'imperial_precision', 'hide_units',
+                     'eval_mods', 'is_render_draw')
+
+# BLF font ids keyed on font filepath, so each font is only loaded once
+fontRegistry = {}
+
+# Text metrics keyed on (font id, size, dpi)
+fontMetricCache = {}
 
 # define Shaders
 
@@ -62,11 +111,15 @@ if bpy.app.version > (2,83,0):
     basefrag = Frag_Shaders_3D_B283.base_fragment_shader
     dashedfrag = Frag_Shaders_3D_B283.dashed_fragment_shader
     textfrag = Frag_Shaders_3D_B283.text_fragment_shader
+    aabatchfrag = Frag_Shaders_3D_B283.aa_batch_fragment_shader
+    basebatchfrag = Frag_Shaders_3D_B283.base_batch_fragment_shader
 else:
     aafrag = Base_Shader_3D_AA.fragment_shader
     basefrag = Base_Shader_3D.fragment_shader
     dashedfrag = Dashed_Shader_3D.fragment_shader
     textfrag = Text_Shader.fragment_shader
+    aabatchfrag = Batch_Frag_Shaders_3D.aa_fragment_shader
+    basebatchfrag = Batch_Frag_Shaders_3D.base_fragment_shader
 
 
 lineShader = gpu.types.GPUShader(
@@ -97,6 +150,22 @@ textShader = gpu.types.GPUShader(
     Text_Shader.vertex_shader,
     textfrag)
 
+# Batch shaders, used by the draw collector
+# (color and thickness are per vertex attributes)
+lineBatchShader = gpu.types.GPUShader(
+    Batch_Shader_3D.vertex_shader,
+    aabatchfrag,
+    geocode=Batch_Shader_3D.line_geometry_shader)
+
+pointBatchShader = gpu.types.GPUShader(
+    Batch_Shader_3D.vertex_shader,
+    aabatchfrag,
+    geocode=Batch_Shader_3D.point_geometry_shader)
+
+triBatchShader = gpu.types.GPUShader(
+    Batch_Shader_3D.tri_vertex_shader,
+    basebatchfrag)
+
 def get_dim_tag(self,obj):
     dimGen = obj.DimensionGenerator[0]
     itemType = self.itemType
@@ -135,9 +204,99 @@ def recalc_dimWrapper_index(dimGen):
             id_axis += 1
 
 def clear_batches():
-    lineBatch3D.clear()
-    dashedBatch3D.clear()
-    hiddenBatch3D.clear()
+    lineGroupCache.clear()
+    meshTopologyCache.clear()
+    dimensionCache.clear()
+
+
+# --------------------------------------------------------------------
+# Geometry change tracking
+# --------------------------------------------------------------------
+@persistent
+def geometry_update_handler(scene, depsgraph=None):
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.VectorFont):
+            invalidate_fonts()
+        if isinstance(update.id, (bpy.types.Object, bpy.types.Collection)):
+            invalidate_instances()
+        if update.is_updated_geometry:
+            name = update.id.name
+            geometryRevisions[name] = geometryRevisions.get(name, 0) + 1
+
+
+@persistent
+def geometry_load_handler(dummy):
+    geometryRevisions.clear()
+    clear_batches()
+    invalidate_instances()
+
+
+# Instancers may be animated
+@persistent
+def instance_frame_handler(scene, depsgraph=None):
+    invalidate_instances()
+
+
+def get_geometry_revision(myobj):
+    dataName = ''
+    if myobj.data is not None:
+        dataName = myobj.data.name
+    return (geometryRevisions.get(myobj.name, 0), geometryRevisions.get(dataName, 0))
+
+
+def invalidate_line_groups(myobj):
+    for key in [key for key in lineGroupCache if key[0] == myobj.name]:
+        del lineGroupCache[key]
+
+
+bpy.app.handlers.depsgraph_update_post.append(geometry_update_handler)
+bpy.app.handlers.load_post.append(geometry_load_handler)
+bpy.app.handlers.frame_change_post.append(instance_frame_handler)
+
+# --------------------------------------------------------------------
+# Font registry
+# --------------------------------------------------------------------
+def get_font_id(vecFont):
+    badfonts = [None]
+    if 'Bfont' in bpy.data.fonts:
+        badfonts.append(bpy.data.fonts['Bfont'])
+    if vecFont in badfonts:
+        return 0
+
+    fontPath = vecFont.filepath
+    if fontPath not in fontRegistry:
+        fontRegistry[fontPath] = blf.load(fontPath)
+    return fontRegistry[fontPath]
+
+
+def invalidate_fonts():
+    for fontPath in fontRegistry:
+        blf.unload(fontPath)
+    fontRegistry.clear()
+    fontMetricCache.clear()
+    textAtlas.clear()
+
+
+# Get the line height and width of a string, blf.size must already be set
+def get_text_metrics(font_id, size, resolution, text):
+    metrics = fontMetricCache.get((font_id, size, resolution))
+    if metrics is None:
+        metrics = {
+            'lineHeight': blf.dimensions(font_id, 'Tpg"')[1],
+            'widths': {}
+        }
+        fontMetricCache[(font_id, size, resolution)] = metrics
+
+    widths = metrics['widths']
+    if text not in widths:
+        if len(widths) > 4096:
+            widths.clear()
+        widths[text] = blf.dimensions(font_id, text)[0]
+
+    return metrics['lineHeight'], widths[text]
+
 
 def update_text(textobj, props, context):
     update_flag = False
@@ -149,84 +308,91 @@ def update_text(textobj, props, context):
             textField.text_updated = True
 
         if textField.text_updated or sceneProps.text_updated:
-            # Get textitem Properties
-            rawRGB = props.color
-            rgb = (pow(rawRGB[0], (1/2.2)), pow(rawRGB[1], (1/2.2)), pow(rawRGB[2], (1/2.2)), rawRGB[3])
-            size = 20
-            resolution = get_resolution()
-
-            # Get Font Id
-            badfonts = [None]
-            if 'Bfont' in bpy.data.fonts:
-                badfonts.append(bpy.data.fonts['Bfont'])
-            if props.font not in badfonts:
-                vecFont = props.font
-                fontPath = vecFont.filepath
-                font_id = blf.load(fontPath)
-            else:
-                font_id = 0
+            rasterize_text(textField, props, context)
+    textobj.text_updated = False    
 
-            # Set BLF font Properties
-            blf.color(font_id, rgb[0], rgb[1], rgb[2], rgb[3])
-            blf.size(font_id, size, resolution)
-            
-            text = textField.text
 
-            # Calculate Optimal Dimensions for Text Texture.
-            fheight = blf.dimensions(font_id, 'Tpg"')[1]
-            fwidth = blf.dimensions(font_id, text)[0]
-            width = math.ceil(fwidth)
-            height = math.ceil(fheight*1.3)
-            
+# Key of a rendered label in the text atlas
+def get_text_key(textField, props):
+    rawRGB = props.color
+    rgb = (pow(rawRGB[0], (1/2.2)), pow(rawRGB[1], (1/2.2)), pow(rawRGB[2], (1/2.2)), rawRGB[3])
+    return (textField.text, get_font_id(props.font), 20, get_resolution(),
+            tuple(round(c, 4) for c in rgb))
 
-            # Save Texture size to textobj Properties
-            textField.textHeight = height
-            textField.textWidth = width
 
-            # Start Offscreen Draw
-            if width != 0 and height != 0:
-                textOffscreen = gpu.types.GPUOffScreen(width, height)
+def rasterize_text(textField, props, context):
+    sceneProps = context.scene.MeasureItArchProps
 
-                
-                with textOffscreen.bind():
-                    # Clear Past Draw and Set 2D View matrix
-                    bgl.glClearColor(rgb[0], rgb[1], rgb[2], 0)
-                    bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
-                    
-                    view_matrix = Matrix([
-                        [2 / width, 0, 0, -1],
-                        [0, 2 / height, 0, -1],
-                        [0, 0, 1, 0],
-                        [0, 0, 0, 1]])
-                    
-                    gpu.matrix.reset()
-                    gpu.matrix.load_matrix(view_matrix)
-                    gpu.matrix.load_projection_matrix(Matrix.Identity(4))
-                
-                    blf.position(font_id, 0, height*0.3, 0)
-                    blf.draw(font_id, text)
-                    
-                    # Read Offscreen To Texture Buffer
-                    texture_buffer = bgl.Buffer(bgl.GL_BYTE, width * height * 4)
-                    bgl.glReadBuffer(bgl.GL_COLOR_ATTACHMENT0)
-                    bgl.glReadPixels(0, 0, width, height, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, texture_buffer)
-                    
-                    # Write Texture Buffer to ID Property as List
-                    if 'texture' in textField:
-                        del textField['texture']
-                    textField['texture'] = texture_buffer
-                    textField.text_updated = False
-                    textField.texture_updated = True
+    # Get textitem Properties
+    rawRGB = props.color
+    rgb = (pow(rawRGB[0], (1/2.2)), pow(rawRGB[1], (1/2.2)), pow(rawRGB[2], (1/2.2)), rawRGB[3])
+    size = 20
+    resolution = get_resolution()
+
+    # Get Font Id
+    font_id = get_font_id(props.font)
+
+    # Set BLF font Properties
+    blf.color(font_id, rgb[0], rgb[1], rgb[2], rgb[3])
+    blf.size(font_id, size, resolution)
+    
+    text = textField.text
+
+    # Calculate Optimal Dimensions for Text Texture.
+    fheight, fwidth = get_text_metrics(font_id, size, resolution, text)
+    width = math.ceil(fwidth)
+    height = math.ceil(fheight*1.3)
+    
+
+    # Save Texture size to textobj Properties
+    textField.textHeight = height
+    textField.textWidth = width
+
+    # Textures used to be stored on the text field, clean them up
+    if 'texture' in textField:
+        del textField['texture']
+
+    # Start Offscreen Draw
+    if width != 0 and height != 0:
+        textOffscreen = gpu.types.GPUOffScreen(width, height)
+
+        with textOffscreen.bind(), gpu.matrix.push_pop(), gpu.matrix.push_pop_projection():
+            # Clear Past Draw and Set 2D View matrix
+            bgl.glClearColor(rgb[0], rgb[1], rgb[2], 0)
+            bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
             
-                    # generate image datablock from buffer for debug preview
-                    # ONLY USE FOR DEBUG. SERIOUSLY SLOWS PREFORMANCE
-                    if sceneProps.measureit_arch_debug_text:
-                        if not str('test') in bpy.data.images:
-                            bpy.data.images.new(str('test'), width, height)
-                        image = bpy.data.images[str('test')]
-                        image.scale(width, height)
-                        image.pixels = [v / 255 for v in texture_buffer]
-    textobj.text_updated = False    
+            view_matrix = Matrix([
+                [2 / width, 0, 0, -1],
+                [0, 2 / height, 0, -1],
+                [0, 0, 1, 0],
+                [0, 0, 0, 1]])
+            
+            gpu.matrix.reset()
+            gpu.matrix.load_matrix(view_matrix)
+            gpu.matrix.load_projection_matrix(Matrix.Identity(4))
+        
+            blf.position(font_id, 0, height*0.3, 0)
+            blf.draw(font_id, text)
+            
+            # Read Offscreen To Texture Buffer
+            texture_buffer = bgl.Buffer(bgl.GL_BYTE, width * height * 4)
+            bgl.glReadBuffer(bgl.GL_COLOR_ATTACHMENT0)
+            bgl.glReadPixels(0, 0, width, height, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, texture_buffer)
+
+        textOffscreen.free()
+
+        # Pack the label into the text atlas
+        textAtlas.add_label(get_text_key(textField, props), width, height, texture_buffer)
+        textField.text_updated = False
+
+        # generate image datablock from buffer for debug preview
+        # ONLY USE FOR DEBUG. SERIOUSLY SLOWS PREFORMANCE
+        if sceneProps.measureit_arch_debug_text:
+            if not str('test') in bpy.data.images:
+                bpy.data.images.new(str('test'), width, height)
+            image = bpy.data.images[str('test')]
+            image.scale(width, height)
+            set_image_pixels(image, buffer_to_array(texture_buffer, np.uint8, (height, width, 4)))
 
 def draw_sheet_views(context, myobj, sheetGen, sheet_view, mat, svg=None):
 
@@ -396,11 +562,7 @@ def draw_alignedDimension(context, myobj, measureGen, dim, mat, svg=None):
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
 
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     # Enable GL Settings
     set_OpenGL_Settings(True,dimProps)
@@ -421,136 +583,159 @@ def draw_alignedDimension(context, myobj, measureGen, dim, mat, svg=None):
         caps = (dimProps.endcapA, dimProps.endcapB)
         capSize = dimProps.endcapSize
 
-        offset = dim.dimOffset
-        geoOffset = dim.dimLeaderOffset
-
-        # get points positions from indicies
-        aMatrix = dim.dimObjectA.matrix_world
-        bMatrix = dim.dimObjectB.matrix_world
+        # Replay the cached geometry if nothing it depends on changed
+        viewAxis = get_dim_view_axis(dim, dimProps)
+        viewKey = None
+        if viewAxis is not None:
+            viewKey = tuple(viewAxis)
+        state = get_dim_state(context, myobj, dim, dimProps, mat, viewKey)
+        dimCache = get_dim_cache(dim, state)
+
+        if dimCache is None:
+            offset = dim.dimOffset
+            geoOffset = dim.dimLeaderOffset
+
+            # get points positions from indicies
+            aMatrix = dim.dimObjectA.matrix_world
+            bMatrix = dim.dimObjectB.matrix_world
         
-        # get points positions from indicies
-        p1Local = None
-        p2Local = None
+            # get points positions from indicies
+            p1Local = None
+            p2Local = None
 
-        deleteFlag = False
-        try:
-            p1Local = get_mesh_vertex(dim.dimObjectA,dim.dimPointA,dimProps.evalMods)
-        except IndexError:
-            print('p1 excepted for ' + dim.name + ' on ' + myobj.name)
-            deleteFlag = True
+            deleteFlag = False
+            try:
+                p1Local = get_mesh_vertex(dim.dimObjectA,dim.dimPointA,dimProps.evalMods)
+            except IndexError:
+                print('p1 excepted for ' + dim.name + ' on ' + myobj.name)
+                deleteFlag = True
 
-        try:
-            p2Local = get_mesh_vertex(dim.dimObjectB,dim.dimPointB,dimProps.evalMods)
-        except IndexError:
-            print('p2 excepted for ' + dim.name + ' on ' + myobj.name)
-            deleteFlag = True
+            try:
+                p2Local = get_mesh_vertex(dim.dimObjectB,dim.dimPointB,dimProps.evalMods)
+            except IndexError:
+                print('p2 excepted for ' + dim.name + ' on ' + myobj.name)
+                deleteFlag = True
 
-        if deleteFlag:
-            dimGen = myobj.DimensionGenerator[0]
-            wrapTag = get_dim_tag(dim, myobj)
-            wrapper = dimGen.wrappedDimensions[wrapTag]
-            tag = wrapper.itemIndex
-            dimGen.alignedDimensions.remove(tag)
-            dimGen.wrappedDimensions.remove(wrapTag)
-            recalc_dimWrapper_index(dimGen)
-            return
+            if deleteFlag:
+                dimGen = myobj.DimensionGenerator[0]
+                wrapTag = get_dim_tag(dim, myobj)
+                wrapper = dimGen.wrappedDimensions[wrapTag]
+                tag = wrapper.itemIndex
+                dimGen.alignedDimensions.remove(tag)
+                dimGen.wrappedDimensions.remove(wrapTag)
+                recalc_dimWrapper_index(dimGen)
+                return
 
-        p1 = get_point(p1Local, dim.dimObjectA,aMatrix)
-        p2 = get_point(p2Local, dim.dimObjectB,bMatrix)
+            p1 = get_point(p1Local, dim.dimObjectA,aMatrix)
+            p2 = get_point(p2Local, dim.dimObjectB,bMatrix)
             
 
 
-        #check dominant Axis
-        sortedPoints = sortPoints(p1, p2)
-        p1 = sortedPoints[0]
-        p2 = sortedPoints[1]
+            #check dominant Axis
+            sortedPoints = sortPoints(p1, p2)
+            p1 = sortedPoints[0]
+            p2 = sortedPoints[1]
     
         
-        #calculate distance & MidpointGY
-        distVector = Vector(p1)-Vector(p2)
-        dist = distVector.length
-        midpoint = interpolate3d(p1, p2, fabs(dist / 2))
-        normDistVector = distVector.normalized()
+            #calculate distance & MidpointGY
+            distVector = Vector(p1)-Vector(p2)
+            dist = distVector.length
+            midpoint = interpolate3d(p1, p2, fabs(dist / 2))
+            normDistVector = distVector.normalized()
 
 
-        # Compute offset vector from face normal and user input
-        rotationMatrix = Matrix.Rotation(dim.dimRotation, 4, normDistVector)
-        selectedNormal = Vector(select_normal(myobj, dim, normDistVector, midpoint, dimProps))
+            # Compute offset vector from face normal and user input
+            rotationMatrix = Matrix.Rotation(dim.dimRotation, 4, normDistVector)
+            selectedNormal = Vector(select_normal(myobj, dim, normDistVector, midpoint, dimProps))
         
-        userOffsetVector = rotationMatrix@selectedNormal
-        offsetDistance = userOffsetVector*offset
-        geoOffsetDistance = offsetDistance.normalized()*geoOffset
+            userOffsetVector = rotationMatrix@selectedNormal
+            offsetDistance = userOffsetVector*offset
+            geoOffsetDistance = offsetDistance.normalized()*geoOffset
 
-        if offsetDistance < geoOffsetDistance:
-            offsetDistance = geoOffsetDistance
+            if offsetDistance < geoOffsetDistance:
+                offsetDistance = geoOffsetDistance
 
 
-        #Set Gizmo Props
-        dim.gizLoc = midpoint
-        dim.gizRotDir = userOffsetVector
+            #Set Gizmo Props
+            dim.gizLoc = midpoint
+            dim.gizRotDir = userOffsetVector
         
-        # Define Lines
-        leadStartA = Vector(p1) + geoOffsetDistance
-        leadEndA = Vector(p1) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
-
-        leadStartB = Vector(p2) + geoOffsetDistance
-        leadEndB = Vector(p2) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
-
-        dimLineStart = Vector(p1)+offsetDistance
-        dimLineEnd = Vector(p2)+offsetDistance
-        textLoc = interpolate3d(dimLineStart, dimLineEnd, fabs(dist / 2))
-
-        # i,j,k as card axis
-        i = Vector((1,0,0))
-        j = Vector((0,1,0))
-        k = Vector((0,0,1))
-
-        # Check for text field
-        if len(dim.textFields) == 0:
-            dim.textFields.add()
-
-        dimText = dim.textFields[0]
-
-        # format text and update if necessary
-        distanceText = str(format_distance(textFormat,dist))
-        if dimText.text != str(distanceText):
-            dimText.text = str(distanceText)
-            dimText.text_updated = True
+            # Define Lines
+            leadStartA = Vector(p1) + geoOffsetDistance
+            leadEndA = Vector(p1) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
+
+            leadStartB = Vector(p2) + geoOffsetDistance
+            leadEndB = Vector(p2) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
+
+            dimLineStart = Vector(p1)+offsetDistance
+            dimLineEnd = Vector(p2)+offsetDistance
+            textLoc = interpolate3d(dimLineStart, dimLineEnd, fabs(dist / 2))
+
+            # i,j,k as card axis
+            i = Vector((1,0,0))
+            j = Vector((0,1,0))
+            k = Vector((0,0,1))
+
+            # Check for text field
+            if len(dim.textFields) == 0:
+                dim.textFields.add()
+
+            dimText = dim.textFields[0]
+
+            # format text and update if necessary
+            distanceText = str(format_distance(textFormat,dist))
+            if dimText.text != str(distanceText):
+                dimText.text = str(distanceText)
+                dimText.text_updated = True
+                queue_text_update(dimText)
            
-        origin = Vector(textLoc)
+            origin = Vector(textLoc)
 
 
-        placementResults = dim_text_placement(dim,dimProps,origin,dist,distVector,offsetDistance,capSize)
-        square = placementResults[0]
-        flipCaps = placementResults[1]
-        dimLineExtension = placementResults[2]
-        origin = placementResults[3]
+            placementResults = dim_text_placement(dim,dimProps,origin,dist,distVector,offsetDistance,capSize)
+            square = placementResults[0]
+            flipCaps = placementResults[1]
+            dimLineExtension = placementResults[2]
+            origin = placementResults[3]
 
 
-        # Add the Extension to the dimension line
-        dimLineVec = dimLineStart - dimLineEnd
-        dimLineVec.normalize()
-        dimLineEndCoord = dimLineEnd - dimLineVec * dimLineExtension 
-        dimLineStartCoord = dimLineStart + dimLineVec * dimLineExtension 
+            # Add the Extension to the dimension line
+            dimLineVec = dimLineStart - dimLineEnd
+            dimLineVec.normalize()
+            dimLineEndCoord = dimLineEnd - dimLineVec * dimLineExtension 
+            dimLineStartCoord = dimLineStart + dimLineVec * dimLineExtension 
         
-        #square = [(origin-(cardX/2)),(origin-(cardX/2)+cardY ),(origin+(cardX/2)+cardY ),(origin+(cardX/2))]
+            #square = [(origin-(cardX/2)),(origin-(cardX/2)+cardY ),(origin+(cardX/2)+cardY ),(origin+(cardX/2))]
+
+            #Collect coords and endcaps
+            coords = [leadStartA,leadEndA,leadStartB,leadEndB,dimLineStartCoord,dimLineEndCoord]
+            filledCoords = []
+            pos = (dimLineStart,dimLineEnd)
+            i=0
+            for cap in caps:
+                capCoords = generate_end_caps(context,dimProps,cap,capSize,pos[i],userOffsetVector,textLoc,i,flipCaps)
+                i += 1 
+                for coord in capCoords[0]:
+                    coords.append(coord)
+                for filledCoord in capCoords[1]:
+                    filledCoords.append(filledCoord)
+
+            dimCache = set_dim_cache(dim, state, coords, filledCoords, square, origin)
+
+        # Nothing to draw outside of the view
+        if not bounds_in_view(dimCache['bounds']):
+            set_OpenGL_Settings(False)
+            return
+
+        coords = dimCache['coords']
+        filledCoords = dimCache['filledCoords']
+        square = dimCache['square']
+        origin = dimCache['origin']
+        dimText = dim.textFields[0]
 
         if sceneProps.show_dim_text:
             draw_text_3D(context,dimText,dimProps,myobj,square)
 
-        #Collect coords and endcaps
-        coords = [leadStartA,leadEndA,leadStartB,leadEndB,dimLineStartCoord,dimLineEndCoord]
-        filledCoords = []
-        pos = (dimLineStart,dimLineEnd)
-        i=0
-        for cap in caps:
-            capCoords = generate_end_caps(context,dimProps,cap,capSize,pos[i],userOffsetVector,textLoc,i,flipCaps)
-            i += 1 
-            for coord in capCoords[0]:
-                coords.append(coord)
-            for filledCoord in capCoords[1]:
-                filledCoords.append(filledCoord)
-
         # Filled Coords Call
         if len(filledCoords) != 0:
             draw_filled_coords(filledCoords, rgb)
@@ -572,11 +757,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
     scene = context.scene
     sceneProps = context.scene.MeasureItArchProps
 
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     set_OpenGL_Settings(True,dimProps)
 
@@ -620,7 +801,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
                     try:
                         if myobj.matrix_world.to_quaternion() != Quaternion(dim[rotStr]) or myobj.location != Vector(dim[locStr]) or  myobj.scale !=  Vector(dim[scaleStr]):
                             obverts = get_mesh_vertices(myobj)
-                            worldObverts = [myobj.matrix_world @ coord for coord in obverts]
+                            worldObverts = transform_coords(obverts, myobj.matrix_world)
                             maxX,minX,maxY,minY,maxZ,minZ = get_axis_aligned_bounds(worldObverts)
                             dim[boundsStr] = [maxX,minX,maxY,minY,maxZ,minZ]
                             dim[rotStr] = myobj.matrix_world.to_quaternion()
@@ -630,7 +811,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
                             maxX,minX,maxY,minY,maxZ,minZ = dim[boundsStr]
                     except KeyError:
                         obverts = get_mesh_vertices(myobj)
-                        worldObverts = [myobj.matrix_world @ coord for coord in obverts]
+                        worldObverts = transform_coords(obverts, myobj.matrix_world)
                         maxX,minX,maxY,minY,maxZ,minZ = get_axis_aligned_bounds(worldObverts)
                         dim[boundsStr] = [maxX,minX,maxY,minY,maxZ,minZ]
                         dim[rotStr] = myobj.matrix_world.to_quaternion()
@@ -674,7 +855,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
                 try:
                     if myobj.matrix_world.to_quaternion() != Quaternion(dim['lastRot']):
                         obverts = get_mesh_vertices(myobj)
-                        worldObverts = [myobj.matrix_world @ coord for coord in obverts]
+                        worldObverts = transform_coords(obverts, myobj.matrix_world)
                         maxX,minX,maxY,minY,maxZ,minZ = get_axis_aligned_bounds(worldObverts)
                         dim['bounds'] = [maxX,minX,maxY,minY,maxZ,minZ]
                         dim['lastRot'] = myobj.matrix_world.to_quaternion()
@@ -682,7 +863,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
                         maxX,minX,maxY,minY,maxZ,minZ = dim['bounds']
                 except KeyError:
                     obverts = get_mesh_vertices(myobj)
-                    worldObverts = [myobj.matrix_world @ coord for coord in obverts]
+                    worldObverts = transform_coords(obverts, myobj.matrix_world)
                     maxX,minX,maxY,minY,maxZ,minZ = get_axis_aligned_bounds(worldObverts)
                     dim['bounds'] = [maxX,minX,maxY,minY,maxZ,minZ]
                     dim['lastRot'] = myobj.matrix_world.to_quaternion()
@@ -853,6 +1034,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None):
                 if dimText.text != str(distanceText):
                     dimText.text = str(distanceText)
                     dimText.text_updated = True
+                    queue_text_update(dimText)
                 
                 placementResults = dim_text_placement(dim,dimProps,origin,dist,distVector,offsetDistance,capSize)
                 square = placementResults[0]
@@ -910,11 +1092,7 @@ def draw_axisDimension(context, myobj, measureGen,dim, mat, svg=None):
 
     sceneProps = context.scene.MeasureItArchProps
 
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     set_OpenGL_Settings(True,dimProps)
 
@@ -941,49 +1119,6 @@ def draw_axisDimension(context, myobj, measureGen,dim, mat, svg=None):
         caps = (dimProps.endcapA, dimProps.endcapB)
         capSize = dimProps.endcapSize
 
-        offset = dim.dimOffset
-        geoOffset = dim.dimLeaderOffset
-    
-        # get points positions from indicies
-        aMatrix = mat
-        bMatrix = mat
-        if dim.dimObjectB != dim.dimObjectA:
-            bMatrix = dim.dimObjectB.matrix_world - dim.dimObjectA.matrix_world + mat 
-
-        p1Local = Vector((0,0,0))
-        p2Local = Vector((0,0,0))
-
-        deleteFlag = False
-        try:
-            p1Local = get_mesh_vertex(dim.dimObjectA,dim.dimPointA,dimProps.evalMods)
-        except IndexError:
-            print('p1 excepted for ' + dim.name + ' on ' + myobj.name)
-            deleteFlag = True
-
-        try:
-            p2Local = get_mesh_vertex(dim.dimObjectB,dim.dimPointB,dimProps.evalMods)
-        except IndexError:
-            print('p2 excepted for ' + dim.name + ' on ' + myobj.name)
-            deleteFlag = True
-
-        if deleteFlag:
-            dimGen = myobj.DimensionGenerator[0]
-            wrapTag = get_dim_tag(dim, myobj)
-            wrapper = dimGen.wrappedDimensions[wrapTag]
-            tag = wrapper.itemIndex
-            dimGen.axisDimensions.remove(tag)
-            dimGen.wrappedDimensions.remove(wrapTag)
-            recalc_dimWrapper_index(dimGen)
-            return
-
-        p1 = get_point(p1Local, dim.dimObjectA,aMatrix)
-        p2 = get_point(p2Local, dim.dimObjectB,bMatrix)
-
-        #Sort Points 
-        sortedPoints = sortPoints(p1,p2)
-        p1 = sortedPoints[0]
-        p2 = sortedPoints[1]
-
         #i,j,k as base vectors
         i = Vector((1,0,0))
         j = Vector((0,1,0))
@@ -1042,136 +1177,205 @@ def draw_axisDimension(context, myobj, measureGen,dim, mat, svg=None):
         elif viewAxis[2] < -zThreshold:
             viewSector = (0,0,-1)
 
-        #rotate the axis vector if necessary
+        # Replay the cached geometry if nothing it depends on changed
+        normalAxis = get_dim_view_axis(dim, dimProps)
+        viewKey = (viewSector, tuple(viewAxis))
+        if viewPlane == '99':
+            viewKey = (viewSector, None)
+        if normalAxis is not None:
+            viewKey += (tuple(normalAxis),)
         if dim.dimAxisObject != None:
-            customMat = dim.dimAxisObject.matrix_world
-            rot = customMat.to_quaternion()
-            axisVec.rotate(rot)
+            viewKey += (tuple(map(tuple, dim.dimAxisObject.matrix_world)),)
+        state = get_dim_state(context, myobj, dim, dimProps, mat, viewKey)
+        dimCache = get_dim_cache(dim, state)
+
+        if dimCache is None:
+            offset = dim.dimOffset
+            geoOffset = dim.dimLeaderOffset
+    
+            # get points positions from indicies
+            aMatrix = mat
+            bMatrix = mat
+            if dim.dimObjectB != dim.dimObjectA:
+                bMatrix = dim.dimObjectB.matrix_world - dim.dimObjectA.matrix_world + mat 
 
-        #calculate distance by projecting the distance vector onto the axis vector
+            p1Local = Vector((0,0,0))
+            p2Local = Vector((0,0,0))
 
-        alignedDistVector = Vector(p1)-Vector(p2)
-        distVector = alignedDistVector.project(axisVec)
+            deleteFlag = False
+            try:
+                p1Local = get_mesh_vertex(dim.dimObjectA,dim.dimPointA,dimProps.evalMods)
+            except IndexError:
+                print('p1 excepted for ' + dim.name + ' on ' + myobj.name)
+                deleteFlag = True
+
+            try:
+                p2Local = get_mesh_vertex(dim.dimObjectB,dim.dimPointB,dimProps.evalMods)
+            except IndexError:
+                print('p2 excepted for ' + dim.name + ' on ' + myobj.name)
+                deleteFlag = True
+
+            if deleteFlag:
+                dimGen = myobj.DimensionGenerator[0]
+                wrapTag = get_dim_tag(dim, myobj)
+                wrapper = dimGen.wrappedDimensions[wrapTag]
+                tag = wrapper.itemIndex
+                dimGen.axisDimensions.remove(tag)
+                dimGen.wrappedDimensions.remove(wrapTag)
+                recalc_dimWrapper_index(dimGen)
+                return
+
+            p1 = get_point(p1Local, dim.dimObjectA,aMatrix)
+            p2 = get_point(p2Local, dim.dimObjectB,bMatrix)
+
+            #Sort Points 
+            sortedPoints = sortPoints(p1,p2)
+            p1 = sortedPoints[0]
+            p2 = sortedPoints[1]
+
+            #rotate the axis vector if necessary
+            if dim.dimAxisObject != None:
+                customMat = dim.dimAxisObject.matrix_world
+                rot = customMat.to_quaternion()
+                axisVec.rotate(rot)
+
+            #calculate distance by projecting the distance vector onto the axis vector
+
+            alignedDistVector = Vector(p1)-Vector(p2)
+            distVector = alignedDistVector.project(axisVec)
 
         
-        dist = distVector.length
-        midpoint = interpolate3d(p1, p2, fabs(dist / 2))
-        normDistVector = distVector.normalized()
-        absNormDistVector = Vector((abs(normDistVector[0]),abs(normDistVector[1]),abs(normDistVector[2])))
-
-        # Compute offset vector from face normal and user input
-        rotationMatrix = Matrix.Rotation(dim.dimRotation,4,normDistVector)
-        selectedNormal = Vector(select_normal(myobj,dim,normDistVector,midpoint,dimProps))
-
-        #The Direction of the Dimension Lines
-        dirVector = Vector(viewSector).cross(axisVec)
-        if dirVector.dot(selectedNormal) < 0:
-            dirVector.negate()
-        selectedNormal = dirVector.normalized()
-
-        userOffsetVector = rotationMatrix@selectedNormal
-        offsetDistance = userOffsetVector*offset
-        geoOffsetDistance = offsetDistance.normalized()*geoOffset
+            dist = distVector.length
+            midpoint = interpolate3d(p1, p2, fabs(dist / 2))
+            normDistVector = distVector.normalized()
+            absNormDistVector = Vector((abs(normDistVector[0]),abs(normDistVector[1]),abs(normDistVector[2])))
+
+            # Compute offset vector from face normal and user input
+            rotationMatrix = Matrix.Rotation(dim.dimRotation,4,normDistVector)
+            selectedNormal = Vector(select_normal(myobj,dim,normDistVector,midpoint,dimProps))
+
+            #The Direction of the Dimension Lines
+            dirVector = Vector(viewSector).cross(axisVec)
+            if dirVector.dot(selectedNormal) < 0:
+                dirVector.negate()
+            selectedNormal = dirVector.normalized()
+
+            userOffsetVector = rotationMatrix@selectedNormal
+            offsetDistance = userOffsetVector*offset
+            geoOffsetDistance = offsetDistance.normalized()*geoOffset
         
-        if offsetDistance < geoOffsetDistance:
-            offsetDistance = geoOffsetDistance
+            if offsetDistance < geoOffsetDistance:
+                offsetDistance = geoOffsetDistance
    
-        #Set Gizmo Props
-        dim.gizLoc = midpoint
-        dim.gizRotDir = userOffsetVector
-
-        # Define Lines
-        # get the components of p1 & p1 in the direction zvector
-        p1Dir = Vector((p1[0]*dirVector[0],p1[1]*dirVector[1],p1[2]*dirVector[2]))
-        p2Dir = Vector((p2[0]*dirVector[0],p2[1]*dirVector[1],p2[2]*dirVector[2]))
+            #Set Gizmo Props
+            dim.gizLoc = midpoint
+            dim.gizRotDir = userOffsetVector
+
+            # Define Lines
+            # get the components of p1 & p1 in the direction zvector
+            p1Dir = Vector((p1[0]*dirVector[0],p1[1]*dirVector[1],p1[2]*dirVector[2]))
+            p2Dir = Vector((p2[0]*dirVector[0],p2[1]*dirVector[1],p2[2]*dirVector[2]))
         
-        domAxis = get_dom_axis(p1Dir)
+            domAxis = get_dom_axis(p1Dir)
         
-        if p1Dir[domAxis] >= p2Dir[domAxis]:
-            basePoint = p1
-            secondPoint = p2
-            secondPointAxis = distVector
-            alignedDistVector = Vector(p2)-Vector(p1)
-        else: 
-            basePoint = p2
-            secondPoint = p1
-            secondPointAxis = -distVector
-            alignedDistVector = Vector(p1)-Vector(p2)
-
-
-        # get the difference between the points in the view axis
-        if viewPlane == '99':
-            viewAxis = Vector(viewSector)
-            if viewAxis[0]<0 or viewAxis[1]<0 or viewAxis[2]<0:
-                viewAxis*= -1
-        viewAxisDiff = Vector((alignedDistVector[0]*viewAxis[0],alignedDistVector[1]*viewAxis[1],alignedDistVector[2]*viewAxis[2]))
+            if p1Dir[domAxis] >= p2Dir[domAxis]:
+                basePoint = p1
+                secondPoint = p2
+                secondPointAxis = distVector
+                alignedDistVector = Vector(p2)-Vector(p1)
+            else: 
+                basePoint = p2
+                secondPoint = p1
+                secondPointAxis = -distVector
+                alignedDistVector = Vector(p1)-Vector(p2)
+
+
+            # get the difference between the points in the view axis
+            if viewPlane == '99':
+                viewAxis = Vector(viewSector)
+                if viewAxis[0]<0 or viewAxis[1]<0 or viewAxis[2]<0:
+                    viewAxis*= -1
+            viewAxisDiff = Vector((alignedDistVector[0]*viewAxis[0],alignedDistVector[1]*viewAxis[1],alignedDistVector[2]*viewAxis[2]))
         
-        dim.gizRotAxis = alignedDistVector
+            dim.gizRotAxis = alignedDistVector
 
-        #Lines
-        leadStartA = Vector(basePoint) + geoOffsetDistance
-        leadEndA = Vector(basePoint) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
+            #Lines
+            leadStartA = Vector(basePoint) + geoOffsetDistance
+            leadEndA = Vector(basePoint) + offsetDistance + cap_extension(offsetDistance,capSize,dimProps.endcapArrowAngle)
 
-        leadEndB =  leadEndA - Vector(secondPointAxis)
-        leadStartB = Vector(secondPoint) - viewAxisDiff + geoOffsetDistance
+            leadEndB =  leadEndA - Vector(secondPointAxis)
+            leadStartB = Vector(secondPoint) - viewAxisDiff + geoOffsetDistance
 
-        viewDiffStartB = leadStartB
-        viewDiffEndB = leadStartB + viewAxisDiff
+            viewDiffStartB = leadStartB
+            viewDiffEndB = leadStartB + viewAxisDiff
 
-        dimLineStart = Vector(basePoint) + offsetDistance
-        dimLineEnd = dimLineStart - Vector(secondPointAxis)
-        textLoc = interpolate3d(dimLineStart, dimLineEnd, fabs(dist / 2))
-        origin = Vector(textLoc)
+            dimLineStart = Vector(basePoint) + offsetDistance
+            dimLineEnd = dimLineStart - Vector(secondPointAxis)
+            textLoc = interpolate3d(dimLineStart, dimLineEnd, fabs(dist / 2))
+            origin = Vector(textLoc)
        
-       # Check for text field
-        if len(dim.textFields) == 0:
-            dim.textFields.add()
-
-        dimText = dim.textFields[0]
-
-        # format text and update if necessary
-        distanceText = str(format_distance(textFormat,dist))
-        if dimText.text != str(distanceText):
-            dimText.text = str(distanceText)
-            dimText.text_updated = True
+           # Check for text field
+            if len(dim.textFields) == 0:
+                dim.textFields.add()
+
+            dimText = dim.textFields[0]
+
+            # format text and update if necessary
+            distanceText = str(format_distance(textFormat,dist))
+            if dimText.text != str(distanceText):
+                dimText.text = str(distanceText)
+                dimText.text_updated = True
+                queue_text_update(dimText)
         
-        placementResults = dim_text_placement(dim,dimProps,origin,dist,distVector,offsetDistance,capSize)
-        square = placementResults[0]
-        flipCaps = placementResults[1]
-        dimLineExtension = placementResults[2]
-        origin = placementResults[3]
+            placementResults = dim_text_placement(dim,dimProps,origin,dist,distVector,offsetDistance,capSize)
+            square = placementResults[0]
+            flipCaps = placementResults[1]
+            dimLineExtension = placementResults[2]
+            origin = placementResults[3]
 
             
 
-        # Add the Extension to the dimension line
-        dimLineEndCoord = dimLineEnd - dimLineExtension * secondPointAxis.normalized()
-        dimLineStartCoord = dimLineStart + dimLineExtension * secondPointAxis.normalized()
+            # Add the Extension to the dimension line
+            dimLineEndCoord = dimLineEnd - dimLineExtension * secondPointAxis.normalized()
+            dimLineStartCoord = dimLineStart + dimLineExtension * secondPointAxis.normalized()
         
         
 
-       # end = time.perf_counter()
-        #print(("calc time: "+ "%.3f"%((end-start)*1000)) + ' ms')  
+           # end = time.perf_counter()
+            #print(("calc time: "+ "%.3f"%((end-start)*1000)) + ' ms')  
 
-        #start = time.perf_counter()
-        if sceneProps.show_dim_text:
-            draw_text_3D(context,dimText,dimProps,myobj,square)
+            #start = time.perf_counter()
         
         
 
-        #Collect coords and endcaps
-        coords = [leadStartA,leadEndA,leadStartB,leadEndB,dimLineStartCoord,dimLineEndCoord,viewDiffStartB,viewDiffEndB]
-        filledCoords = []
-        pos = (dimLineStart,dimLineEnd)
-        i=0
-        for cap in caps:
-            capCoords = generate_end_caps(context,dimProps,cap,capSize,pos[i],userOffsetVector,textLoc,i,flipCaps)
-            i += 1 
-            for coord in capCoords[0]:
-                coords.append(coord)
-            for filledCoord in capCoords[1]:
-                filledCoords.append(filledCoord)
+            #Collect coords and endcaps
+            coords = [leadStartA,leadEndA,leadStartB,leadEndB,dimLineStartCoord,dimLineEndCoord,viewDiffStartB,viewDiffEndB]
+            filledCoords = []
+            pos = (dimLineStart,dimLineEnd)
+            i=0
+            for cap in caps:
+                capCoords = generate_end_caps(context,dimProps,cap,capSize,pos[i],userOffsetVector,textLoc,i,flipCaps)
+                i += 1 
+                for coord in capCoords[0]:
+                    coords.append(coord)
+                for filledCoord in capCoords[1]:
+                    filledCoords.append(filledCoord)
+
+            dimCache = set_dim_cache(dim, state, coords, filledCoords, square, origin)
+
+        # Nothing to draw outside of the view
+        if not bounds_in_view(dimCache['bounds']):
+            set_OpenGL_Settings(False)
+            return
 
-        
+        coords = dimCache['coords']
+        filledCoords = dimCache['filledCoords']
+        square = dimCache['square']
+        origin = dimCache['origin']
+        dimText = dim.textFields[0]
+
+        if sceneProps.show_dim_text:
+            draw_text_3D(context,dimText,dimProps,myobj,square)
 
         if len(filledCoords) != 0:
            draw_filled_coords(filledCoords,rgb)
@@ -1189,12 +1393,8 @@ def draw_axisDimension(context, myobj, measureGen,dim, mat, svg=None):
     set_OpenGL_Settings(False)
  
 def draw_angleDimension(context, myobj, DimGen, dim,mat, svg=None):
-    dimProps = dim
     sceneProps = context.scene.MeasureItArchProps
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     set_OpenGL_Settings(True,dimProps)
     
@@ -1264,6 +1464,7 @@ def draw_angleDimension(context, myobj, DimGen, dim,mat, svg=None):
         if dim.textFields[0].text != str(angleText):
             dim.textFields[0].text = str(angleText)
             dim.textFields[0].text_updated = True
+            queue_text_update(dim)
         
         dimText = dim.textFields[0]
         origin = midPoint
@@ -1325,12 +1526,8 @@ def draw_angleDimension(context, myobj, DimGen, dim,mat, svg=None):
 
 def draw_arcDimension(context, myobj, DimGen, dim,mat, svg=None):
     
-    dimProps = dim
     sceneProps = context.scene.MeasureItArchProps
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     set_OpenGL_Settings(True,dimProps)
     
@@ -1510,12 +1707,14 @@ def draw_arcDimension(context, myobj, DimGen, dim,mat, svg=None):
         if lengthText.text != str(lengthStr):
             lengthText.text = str(lengthStr)
             lengthText.text_updated = True
+            queue_text_update(lengthText)
 
         if dim.showRadius:
             radStr = 'r ' + str(format_distance(textFormat,radius))
             if radiusText.text != str(lengthStr):
                 radiusText.text = str(radStr)
                 radiusText.text_updated = True
+                queue_text_update(radiusText)
             
             #make Radius text card        
             midPoint = Vector(interpolate3d(zeroVec,radiusLeader,radius/2))
@@ -1588,14 +1787,10 @@ def draw_arcDimension(context, myobj, DimGen, dim,mat, svg=None):
     set_OpenGL_Settings(False)
 
 def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None):
-    dimProps = dim
     sceneProps = context.scene.MeasureItArchProps
     scene = context.scene
 
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style_props(context, dim, 'alignedDimensions')
 
     set_OpenGL_Settings(True,dimProps)
 
@@ -1670,6 +1865,7 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None):
         if dimText.text != str(areaText):
             dimText.text = str(areaText)
             dimText.text_updated = True
+            queue_text_update(dimText)
         
         # get text location
         # We're using the active face center and normal for 
@@ -1704,9 +1900,8 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None):
         #vecY = mat@ vecY
         #vecX = mat@ vecX
 
-        dimProps.textAlignment = 'C'
-        dimProps.textPosition = 'M'
-        square = generate_text_card(context,dimText,dimProps,basePoint=origin,xDir=vecX,yDir=vecY)
+        square = generate_text_card(context,dimText,dimProps,basePoint=origin,xDir=vecX,yDir=vecY,
+                                    textAlignment='C',textPosition='M')
 
         if sceneProps.show_dim_text:
             draw_text_3D(context,dimText,dimProps,myobj,square)
@@ -1722,46 +1917,30 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None):
             svg_dim = svg.add(svg.g(id=dim.name))
             svg_shaders.svg_line_shader(dim, perimeterCoords, lineWeight, rgb, svg, parent=svg_dim)
             svg_shaders.svg_fill_shader(dim, filledCoords, fillRGB, svg, parent=svg_dim)
-            svg_shaders.svg_text_shader(dimProps, dimText.text, origin, square, textRGB, svg, parent=svg_dim)
+            svg_shaders.svg_text_shader(dimProps, dimText.text, origin, square, textRGB, svg, parent=svg_dim, textAlignment='C')
     
     set_OpenGL_Settings(False)
 
 # takes a set of co-ordinates returns the min and max value for each axis
 def get_axis_aligned_bounds(coords):
-    maxX = None
-    minX = None
-    maxY = None
-    minY = None
-    maxZ = None
-    minZ = None
-    
-    for coord in coords:
-        if maxX == None:
-            maxX = coord[0]
-            minX = coord[0]
-            maxY = coord[1]
-            minY = coord[1]
-            maxZ = coord[2]
-            minZ = coord[2]
-        if coord[0] > maxX: maxX = coord[0]
-        if coord[0] < minX: minX = coord[0]
-        if coord[1] > maxY: maxY = coord[1]
-        if coord[1] < minY: minY = coord[1]
-        if coord[2] > maxZ: maxZ = coord[2]
-        if coord[2] < minZ: minZ = coord[2]
-    
+    if len(coords) == 0:
+        return [None,None,None,None,None,None]
+
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    maxX, maxY, maxZ = coords.max(axis=0).tolist()
+    minX, minY, minZ = coords.min(axis=0).tolist()
     return [maxX,minX,maxY,minY,maxZ,minZ]
 
-def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
-    #Set properties
+# --------------------------------------------------------------------
+# Get the view plane normal used to orient a dimension
+# For automatic view planes this is the world axis closest to the view
+# --------------------------------------------------------------------
+def get_dim_view_axis(dim, dimProps):
     context = bpy.context
     sceneProps = context.scene.MeasureItArchProps
     i = Vector((1,0,0)) # X Unit Vector
     j = Vector((0,1,0)) # Y Unit Vector
     k = Vector((0,0,1)) # Z Unit Vector
-    loc = Vector(get_location(myobj))
-    centerRay = Vector((-1,1,1))
-    badNormals = False 
 
     # Check for View Plane Overides
     if dim.dimViewPlane=='99':
@@ -1789,7 +1968,7 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
                     space3D = space
 
             if space3D == None:
-                return Vector((0,0,0))
+                return None
 
             viewRot = space3D.region_3d.view_rotation
             viewVec = k.copy()
@@ -1807,6 +1986,81 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
         if viewAxis[2] > basicThreshold or viewAxis[2] < -basicThreshold:
             viewAxis = k
 
+    return viewAxis
+
+# --------------------------------------------------------------------
+# Dimension geometry cache
+# --------------------------------------------------------------------
+
+# Snapshot the given properties of a PropertyGroup as a tuple
+def get_prop_snapshot(item, propIds):
+    values = []
+    for propId in propIds:
+        value = getattr(item, propId, None)
+        if isinstance(value, bpy.types.ID):
+            value = value.name
+        elif hasattr(value, '__len__') and not isinstance(value, str):
+            value = tuple(value)
+        values.append(value)
+    return tuple(values)
+
+
+def get_dim_scene_state(context):
+    global dimSceneState
+    if dimSceneState is None:
+        scene = context.scene
+        units = scene.unit_settings
+        dimSceneState = (get_prop_snapshot(scene.MeasureItArchProps, SCENE_STATE_PROPS), get_scale(), get_resolution(),
+                         units.system, units.scale_length, units.length_unit)
+    return dimSceneState
+
+
+# Everything the final geometry of a dimension depends on
+# viewKey: the part of the view the dimension reacts to
+def get_dim_state(context, myobj, dim, dimProps, mat, viewKey):
+    objState = []
+    for obj in (myobj, dim.dimObjectA, dim.dimObjectB, getattr(dim, 'dimAxisObject', None)):
+        if obj is not None:
+            objState.append((obj.name, tuple(map(tuple, obj.matrix_world)), get_geometry_revision(obj)))
+
+    frame = None
+    if dimProps.evalMods:
+        frame = context.scene.frame_current
+
+    textSize = None
+    if len(dim.textFields) > 0:
+        textSize = (dim.textFields[0].textWidth, dim.textFields[0].textHeight)
+
+    return (tuple(objState), tuple(map(tuple, mat)), frame, viewKey, textSize,
+            get_prop_snapshot(dim, DIM_STATE_PROPS), get_prop_snapshot(dimProps, DIM_STATE_PROPS),
+            get_dim_scene_state(context))
+
+
+def get_dim_cache(dim, state):
+    dimCache = dimensionCache.get((dim.as_pointer(), drawInstanceKey))
+    if dimCache is not None and dimCache['state'] == state:
+        return dimCache
+    return None
+
+
+def set_dim_cache(dim, state, coords, filledCoords, square, origin):
+    dimCache = {'state': state, 'coords': coords, 'filledCoords': filledCoords,
+                'square': square, 'origin': origin,
+                'bounds': get_coords_bounds(list(coords) + list(filledCoords) + list(square))}
+    dimensionCache[(dim.as_pointer(), drawInstanceKey)] = dimCache
+    return dimCache
+
+
+def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
+    #Set properties
+    loc = Vector(get_location(myobj))
+    centerRay = Vector((-1,1,1))
+    badNormals = False 
+
+    viewAxis = get_dim_view_axis(dim, dimProps)
+    if viewAxis is None:
+        return Vector((0,0,0))
+
     # Mesh Dimension Behaviour
     if myobj.type == 'MESH':
         try:
@@ -1817,22 +2071,11 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
             
         #get Adjacent Face normals if possible
         possibleNormals = []
-        faces = myobj.data.polygons
-        # Create a Bmesh Instance from the selected object
-        bm = bmesh.new()
-        bm.from_mesh(myobj.data)
-        bm.edges.ensure_lookup_table()
+        topology = get_mesh_topology(myobj)
+        polyNormals = topology['polyNormals']
+        for faceIdx in get_edge_faces(topology, dim.dimPointA, dim.dimPointB):
+            possibleNormals.append(Vector(polyNormals[faceIdx]))
 
-        # For each edge get its linked faces and vertex indicies
-        for edge in bm.edges:
-            bmEdgeIndices = [edge.verts[0].index,edge.verts[1].index]
-            if dim.dimPointA in bmEdgeIndices and dim.dimPointB in bmEdgeIndices:
-                linked_faces = edge.link_faces
-                for face in linked_faces:
-                    possibleNormals.append(face.normal)
-
-        bm.free()
-       
 
         # Check if Face Normals are available
         if len(possibleNormals) != 2: badNormals = True
@@ -1881,19 +2124,266 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
     #Normalize Result
     bestNormal.normalize()
     return bestNormal 
+# --------------------------------------------------------------------
+# Mesh topology & crease detection
+# --------------------------------------------------------------------
+
+# Get the edges, edge-face adjacency and crease angles of an objects mesh
+# evaluated: use the mesh with modifiers & deformation applied
+# The result is cached until the objects geometry changes
+def get_mesh_topology(myobj, evaluated=False):
+    if evaluated:
+        cacheKey = ('EVAL', myobj.name)
+        # Frame changes don't send depsgraph updates
+        frame = None
+        data = myobj.data
+        if len(myobj.modifiers) > 0 or data.shape_keys is not None or data.animation_data is not None:
+            frame = bpy.context.scene.frame_current
+        state = (get_geometry_revision(myobj), frame)
+    else:
+        cacheKey = ('MESH', myobj.data.name)
+        state = (geometryRevisions.get(myobj.data.name, 0), len(myobj.data.vertices),
+                 len(myobj.data.edges), len(myobj.data.polygons))
+
+    topology = meshTopologyCache.get(cacheKey)
+    if topology is not None and topology['state'] == state:
+        return topology
+
+    obj_eval = None
+    if evaluated:
+        deps = bpy.context.view_layer.depsgraph
+        obj_eval = myobj.evaluated_get(deps)
+        mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=deps)
+    else:
+        mesh = myobj.data
+
+    topology = build_mesh_topology(mesh)
+    topology['state'] = state
+
+    if obj_eval is not None:
+        obj_eval.to_mesh_clear()
+
+    meshTopologyCache[cacheKey] = topology
+    return topology
+
+
+def build_mesh_topology(mesh):
+    numEdges = len(mesh.edges)
+    numLoops = len(mesh.loops)
+    numPolys = len(mesh.polygons)
+
+    vertCoords = get_vertex_coords(mesh.vertices)
+
+    edgeVerts = np.empty(numEdges * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edgeVerts)
+    edgeVerts = edgeVerts.reshape(-1, 2)
+
+    loopEdges = np.empty(numLoops, dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loopEdges)
+
+    loopStart = np.empty(numPolys, dtype=np.int32)
+    loopTotal = np.empty(numPolys, dtype=np.int32)
+    polyNormals = np.empty(numPolys * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('loop_start', loopStart)
+    mesh.polygons.foreach_get('loop_total', loopTotal)
+    mesh.polygons.foreach_get('normal', polyNormals)
+    polyNormals = polyNormals.reshape(-1, 3)
+
+    return calc_edge_adjacency(vertCoords, edgeVerts, loopEdges, loopStart, loopTotal, polyNormals)
+
+
+# Edge-face adjacency in CSR form: the faces of edge i are
+# edgeFaces[edgeFaceStart[i]:edgeFaceStart[i] + edgeFaceCount[i]]
+def calc_edge_adjacency(vertCoords, edgeVerts, loopEdges, loopStart, loopTotal, polyNormals):
+    numEdges = len(edgeVerts)
+    numPolys = len(loopStart)
+
+    # Polygon index of every loop
+    polyIdx = np.repeat(np.arange(numPolys, dtype=np.int32), loopTotal)
+    loopOffset = np.arange(len(polyIdx)) - np.repeat(np.cumsum(loopTotal) - loopTotal, loopTotal)
+    loopPolys = np.empty(len(loopEdges), dtype=np.int32)
+    loopPolys[np.repeat(loopStart, loopTotal) + loopOffset] = polyIdx
+
+    # Group the loops by edge
+    loopOrder = np.argsort(loopEdges, kind='stable')
+    edgeFaces = loopPolys[loopOrder]
+    edgeFaceCount = np.bincount(loopEdges, minlength=numEdges).astype(np.int32)
+    edgeFaceStart = (np.cumsum(edgeFaceCount) - edgeFaceCount).astype(np.int32)
+
+    # Dihedral angle of manifold edges, NaN for non manifold ones
+    creaseAngles = np.full(numEdges, np.nan, dtype=np.float32)
+    manifold = np.nonzero(edgeFaceCount == 2)[0]
+    if len(manifold) > 0 and numPolys > 0:
+        lengths = np.linalg.norm(polyNormals, axis=1)
+        lengths[lengths == 0] = 1.0
+        normals = polyNormals / lengths[:, None]
+
+        normalA = normals[edgeFaces[edgeFaceStart[manifold]]]
+        normalB = normals[edgeFaces[edgeFaceStart[manifold] + 1]]
+        dotProd = np.einsum('ij,ij->i', normalA, normalB)
+        creaseAngles[manifold] = np.arccos(np.clip(dotProd, -1.0, 1.0))
+
+    return {
+        'vertCoords': vertCoords,
+        'edgeVerts': edgeVerts,
+        'edgeFaces': edgeFaces,
+        'edgeFaceStart': edgeFaceStart,
+        'edgeFaceCount': edgeFaceCount,
+        'creaseAngles': creaseAngles,
+        'polyNormals': polyNormals,
+        'edgeLookup': None,
+    }
+
+
+# Faces sharing the edge (a, b), the edge lookup table is built
+# on first use and lives as long as the cached topology does
+def get_edge_faces(topology, a, b):
+    edgeLookup = topology['edgeLookup']
+    numVerts = len(topology['vertCoords'])
+    if edgeLookup is None:
+        edgeVerts = np.sort(topology['edgeVerts'], axis=1).astype(np.int64)
+        edgeKeys = edgeVerts[:, 0] * numVerts + edgeVerts[:, 1]
+        edgeLookup = dict(zip(edgeKeys.tolist(), range(len(edgeKeys))))
+        topology['edgeLookup'] = edgeLookup
+
+    # Object origins (9999999) and stale indices aren't edges
+    if not (0 <= a < numVerts and 0 <= b < numVerts):
+        return []
+
+    if a > b:
+        a, b = b, a
+    edgeIdx = edgeLookup.get(a * numVerts + b)
+    if edgeIdx is None:
+        return []
+
+    start = topology['edgeFaceStart'][edgeIdx]
+    return topology['edgeFaces'][start:start + topology['edgeFaceCount'][edgeIdx]].tolist()
+
+
+# Mask of the edges sharper than creaseAngle
+# Any edge with greater or less than 2 linked faces is non manifold
+def get_crease_mask(topology, creaseAngle, includeNonManifold=True):
+    creaseAngles = topology['creaseAngles']
+    manifold = topology['edgeFaceCount'] == 2
+    with np.errstate(invalid='ignore'):
+        mask = manifold & (creaseAngles > creaseAngle)
+    if includeNonManifold:
+        mask |= ~manifold
+    return mask
+
+
+# --------------------------------------------------------------------
+# Get the cached coords, weights and batches of a line group
+# The entry is only rebuilt when the geometry of the object changed
+# (tracked by geometry_update_handler) or the line group settings did
+# --------------------------------------------------------------------
+def get_line_group_cache(myobj, lineGroup, lineProps):
+    sceneProps = bpy.context.scene.MeasureItArchProps
+    evalMods = (lineProps.evalMods or sceneProps.eval_mods) and check_mods(myobj)
+
+    # Handle line groups created with older versions of MeasureIt_ARCH
+    if 'singleLine' in lineGroup and 'lineBuffer' not in lineGroup:
+        toLineBuffer = []
+        for line in lineGroup['singleLine']:
+            toLineBuffer.append(line['pointA'])
+            toLineBuffer.append(line['pointB'])
+        lineGroup['lineBuffer'] = toLineBuffer
+
+    numIndices = 0
+    if 'lineBuffer' in lineGroup:
+        numIndices = len(lineGroup['lineBuffer'])
+
+    frame = None
+    if evalMods:
+        frame = bpy.context.scene.frame_current
+
+    state = (get_geometry_revision(myobj), myobj.mode, evalMods, frame, numIndices,
+             lineGroup.useDynamicCrease, lineGroup.creaseAngle, lineGroup.lineWeightGroup)
+
+    cacheKey = (myobj.name, lineGroup.name)
+    lineCache = lineGroupCache.get(cacheKey)
+    if lineCache is not None and lineCache['state'] == state and myobj.mode != 'WEIGHT_PAINT':
+        return lineCache
+
+    coords, weights = get_line_group_coords(myobj, lineGroup, evalMods)
+    lineCache = {'state': state, 'coords': coords, 'weights': weights, 'batches': {},
+                 'bounds': get_coords_bounds(coords)}
+    lineGroupCache[cacheKey] = lineCache
+    return lineCache
+
+
+# --------------------------------------------------------------------
+# Line coords of all instances of an object in world space, kept with
+# the objects line cache until the line group or the instances change
+# --------------------------------------------------------------------
+def get_instanced_line_cache(lineCache, instances):
+    instancedCache = lineCache.get('instanced')
+    if instancedCache is not None and instancedCache['revision'] == instances['revision']:
+        return instancedCache
+
+    coords = np.asarray(lineCache['coords'], dtype=np.float32).reshape(-1, 3)
+    mats = instances['array']
+    worldCoords = np.einsum('kij,nj->kni', mats[:, :3, :3], coords) + mats[:, None, :3, 3]
+    weights = np.tile(np.asarray(lineCache['weights'], dtype=np.float32), len(mats))
+
+    worldCoords = worldCoords.reshape(-1, 3)
+    instancedCache = {'revision': instances['revision'], 'coords': worldCoords,
+                      'weights': weights, 'batches': {}, 'bounds': get_coords_bounds(worldCoords)}
+    lineCache['instanced'] = instancedCache
+    return instancedCache
+
+
+def get_line_group_coords(myobj, lineGroup, evalMods):
+    coords = np.zeros((0, 3), dtype=np.float32)
+    lineBuffer = None
+    if 'lineBuffer' in lineGroup:
+        lineBuffer = np.array(lineGroup['lineBuffer'], dtype=np.int64)
+
+    ### Calculate dynamic lines
+    if lineGroup.useDynamicCrease and myobj.mode == 'OBJECT':
+        topology = get_mesh_topology(myobj, evaluated=True)
+        creaseMask = get_crease_mask(topology, lineGroup.creaseAngle)
+        edgeVerts = topology['edgeVerts'][creaseMask]
+        coords = topology['vertCoords'][edgeVerts.ravel()]
+
+    elif lineBuffer is not None:
+        # Pull all vertex coords at once and gather the line end points
+        if evalMods:
+            deps = bpy.context.view_layer.depsgraph
+            obj_eval = myobj.evaluated_get(deps)
+            mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=deps)
+            vertCoords = get_vertex_coords(mesh.vertices)
+            obj_eval.to_mesh_clear()
+        else:
+            vertCoords = get_vertex_coords(myobj.data.vertices)
+        coords = get_line_vertices(lineBuffer, vertCoords)
+
+    ### line weight group setup
+    weights = None
+    if lineGroup.lineWeightGroup is not "" and lineBuffer is not None:
+        vertexGroup = myobj.vertex_groups[lineGroup.lineWeightGroup]
+        weights = get_vertex_weights(vertexGroup, lineBuffer)
+
+    if weights is None or len(weights) != len(coords):
+        weights = np.ones(len(coords), dtype=np.float32)
+
+    return coords, weights
+
         
-def draw_line_group(context, myobj, lineGen, mat, svg=None):
+# instances: entry of the instance table, draws the line groups of all
+#            instances of myobj at once (mat should be identity)
+def draw_line_group(context, myobj, lineGen, mat, svg=None, instances=None):
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
+
+    # Line groups draw right away, so geometry collected before them has
+    # to draw first to keep the draw & depth test order
+    drawCollector.flush()
     
     viewport = get_viewport(renderScale=True)
 
     for lineGroup in lineGen.line_groups:
-        lineProps = lineGroup
-        if lineGroup.uses_style:
-            for lineStyle in context.scene.StyleGenerator.line_groups:
-                if lineStyle.name == lineGroup.style:
-                    lineProps= lineStyle
+        lineProps = get_style_props(context, lineGroup, 'line_groups')
 
         set_OpenGL_Settings(True,lineProps)
 
@@ -1905,16 +2395,7 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
 
 
             #set other line properties
-            isOrtho = False
-            if sceneProps.is_render_draw:
-                if scene.camera.data.type == 'ORTHO':
-                    isOrtho = True
-            else:
-                for space in context.area.spaces:
-                    if space.type == 'VIEW_3D':
-                        r3d = space.region_3d
-                if r3d.view_perspective == 'ORTHO':
-                    isOrtho = True
+            isOrtho = get_draw_context().isOrtho
                 
             drawHidden = lineProps.lineDrawHidden
             lineWeight = lineProps.lineWeight
@@ -1930,97 +2411,23 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
 
             
             #Get line data to be drawn
-            evalMods = lineProps.evalMods
-
-            # Flag for re-evaluation of batches & mesh data
-            verts=[]
-            global lastMode
-            recoordFlag = False
-            evalModsGlobal = sceneProps.eval_mods
-            if lastMode != myobj.mode or evalMods or evalModsGlobal:
-                recoordFlag = True
-                lastMode = myobj.mode\
-            
             if myobj.mode == 'EDIT':
                 return
-            else:     
-                if (evalModsGlobal or evalMods) and check_mods(myobj):
-                    deps = bpy.context.view_layer.depsgraph
-                    obj_eval = myobj.evaluated_get(deps)
-                    mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=deps)
-                    verts = mesh.vertices          
-                else:
-                    verts = myobj.data.vertices
-
-            # Get Coords
-            sceneProps = bpy.context.scene.MeasureItArchProps
-            if 'coordBuffer' not in lineGroup or recoordFlag:
-                # Handle line groups created with older versions of MeasureIt_ARCH
-                if 'singleLine' in lineGroup and 'lineBuffer' not in lineGroup:
-                    toLineBuffer = []
-                    for line in lineGroup['singleLine']:
-                        toLineBuffer.append(line['pointA'])
-                        toLineBuffer.append(line['pointB'])
-                    lineGroup['lineBuffer'] = toLineBuffer
-                
-                if 'lineBuffer' in lineGroup:
-                    tempCoords = [get_line_vertex(idx,verts,mat) for idx in lineGroup['lineBuffer']]
-                    lineGroup['coordBuffer'] = tempCoords
-                
-                             ### Calculate dynamic lines
-
-                if lineGroup.useDynamicCrease:
-                    tempCoords = []
-                    # Create a Bmesh Instance from the selected object
-                    bm = bmesh.new()
-                    mesh = myobj.data
-                    if myobj.mode == 'OBJECT':
-                        bm.from_object(myobj,bpy.context.view_layer.depsgraph,deform=True)
-  
 
-                        # For each edge get its linked faces and vertex indicies
-                        for edge in bm.edges:
-                            linked_faces = edge.link_faces
-                            pointA = edge.verts[0].co
-                            pointB = edge.verts[1].co
-                            if len(linked_faces) == 2:
-                                normalA = Vector(linked_faces[0].normal).normalized()
-                                normalB = Vector(linked_faces[1].normal).normalized()
-                                dotProd = (normalA.dot(normalB))
-                                
-                                if dotProd >= -1 and dotProd <= 1:
-                                    creaseAngle = math.acos(dotProd)
-                                    if creaseAngle > lineGroup.creaseAngle:
-                                        tempCoords.append(pointA)
-                                        tempCoords.append(pointB)
-
-                            # Any edge with greater or less 
-                            # than 2 linked faces is non manifold
-                            else:
-                                tempCoords.append(pointA)
-                                tempCoords.append(pointB)
-                            lineGroup['coordBuffer'] = tempCoords
-
-               
-                    
-            coords = []            
-            coords = lineGroup['coordBuffer']
+            lineCache = get_line_group_cache(myobj, lineGroup, lineProps)
+            if instances is not None:
+                lineCache = get_instanced_line_cache(lineCache, instances)
+            coords = lineCache['coords']
+            tempWeights = lineCache['weights']
+            batches = lineCache['batches']
 
             if len(coords) == 0:
                 return
-            
-
 
-            ### line weight group setup
-            tempWeights = []
-            if lineGroup.lineWeightGroup is not "":
-                vertexGroup = myobj.vertex_groups[lineGroup.lineWeightGroup]
-                for idx in lineGroup['lineBuffer']:
-                    tempWeights.append(vertexGroup.weight(idx))
-            else:
-                tempWeights = [1.0] * len(coords)
-
-            
+            # Local bounds, placed with the object matrix
+            if not bounds_in_view(lineCache['bounds'], mat):
+                set_OpenGL_Settings(False)
+                continue
 
             if drawHidden == True:
                 # Invert The Depth test for hidden lines
@@ -2041,14 +2448,12 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
                 dashedLineShader.uniform_float("finalColor", (dashRGB[0], dashRGB[1], dashRGB[2], dashRGB[3]))
                 dashedLineShader.uniform_float("offset", -offset)
     
-                global hiddenBatch3D
-                batchKey = myobj.name + lineGroup.name
-                if  batchKey not in hiddenBatch3D or recoordFlag:
-                    hiddenBatch3D[batchKey] = batch_for_shader(dashedLineShader,'LINES',{"pos":coords}) 
                 if sceneProps.is_render_draw:
                     batchHidden = batch_for_shader(dashedLineShader,'LINES',{"pos":coords}) 
                 else:
-                    batchHidden = hiddenBatch3D[batchKey]
+                    if 'hidden' not in batches:
+                        batches['hidden'] = batch_for_shader(dashedLineShader,'LINES',{"pos":coords})
+                    batchHidden = batches['hidden']
 
                 batchHidden.program_set(dashedLineShader)
                 batchHidden.draw()
@@ -2068,14 +2473,12 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
                 dashedLineShader.uniform_float("offset", -offset)
 
             
-                global dashedBatch3D
-                batchKey = myobj.name + lineGroup.name
-                if batchKey not in dashedBatch3D or recoordFlag:
-                    dashedBatch3D[batchKey] = batch_for_shader(dashedLineShader,'LINES',{"pos":coords}) 
                 if sceneProps.is_render_draw:
                     batchDashed = batch_for_shader(dashedLineShader,'LINES',{"pos":coords}) 
                 else:
-                    batchDashed = dashedBatch3D[batchKey]
+                    if 'dashed' not in batches:
+                        batches['dashed'] = batch_for_shader(dashedLineShader,'LINES',{"pos":coords})
+                    batchDashed = batches['dashed']
 
                 batchDashed.program_set(dashedLineShader)
                 batchDashed.draw()
@@ -2093,15 +2496,12 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
                 
                 #colors = [(rgb[0], rgb[1], rgb[2], rgb[3]) for coord in range(len(coords))]
 
-                global lineBatch3D
-                batchKey = myobj.name + lineGroup.name
-                if batchKey not in lineBatch3D or recoordFlag or myobj.mode == 'WEIGHT_PAINT':
-                    lineBatch3D[batchKey] = batch_for_shader(lineGroupShader, 'LINES', {"pos": coords,"weight":tempWeights})
-                    batch3d = lineBatch3D[batchKey]
                 if sceneProps.is_render_draw:
                     batch3d = batch_for_shader(lineGroupShader, 'LINES', {"pos": coords,"weight":tempWeights})
                 else:
-                    batch3d = lineBatch3D[batchKey]
+                    if 'lines' not in batches:
+                        batches['lines'] = batch_for_shader(lineGroupShader, 'LINES', {"pos": coords,"weight":tempWeights})
+                    batch3d = batches['lines']
 
                 if rgb[3] == 1:
                     bgl.glBlendFunc(bgl.GL_SRC_ALPHA,bgl.GL_ONE_MINUS_SRC_ALPHA)
@@ -2139,27 +2539,22 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None):
 
 def get_color(rawRGB, myobj):
     #undo blenders Default Gamma Correction
-    context = bpy.context
-    sceneProps = bpy.context.scene.MeasureItArchProps
+    drawState = get_draw_context()
     rgb = rgb_gamma_correct(rawRGB)
 
 
-    if not sceneProps.highlight_selected or sceneProps.is_render_draw:
+    if not drawState.highlightSelected:
         return rgb
 
     #overide line color with theme selection colors when selected
-    if myobj in context.selected_objects:
-        rgb[0] = bpy.context.preferences.themes[0].view_3d.object_selected[0]
-        rgb[1] = bpy.context.preferences.themes[0].view_3d.object_selected[1]
-        rgb[2] = bpy.context.preferences.themes[0].view_3d.object_selected[2]
+    if myobj.name in drawState.selectedObjects:
+        rgb[0:3] = drawState.selectedColor
         rgb[3] = 1.0
 
-        if (context.view_layer.objects.active != None
-        and context.view_layer.objects.active.data != None
-        and myobj.data.name == context.view_layer.objects.active.data.name):
-            rgb[0] = bpy.context.preferences.themes[0].view_3d.object_active[0]
-            rgb[1] = bpy.context.preferences.themes[0].view_3d.object_active[1]
-            rgb[2] = bpy.context.preferences.themes[0].view_3d.object_active[2]
+        if (drawState.activeDataName is not None
+        and myobj.data is not None
+        and myobj.data.name == drawState.activeDataName):
+            rgb[0:3] = drawState.activeColor
             rgb[3] = 1.0
     
     return rgb
@@ -2170,11 +2565,7 @@ def draw_annotation(context, myobj, annotationGen, mat, svg=None):
     customCoords = []
     customFilledCoords = []
     for annotation in annotationGen.annotations:
-        annotationProps = annotation
-        if annotation.uses_style:
-            for annotationStyle in context.scene.StyleGenerator.annotations:
-                if annotationStyle.name == annotation.style:
-                    annotationProps= annotationStyle
+        annotationProps = get_style_props(context, annotation, 'annotations')
 
         set_OpenGL_Settings(True,annotationProps)
 
@@ -2322,6 +2713,17 @@ def draw_annotation(context, myobj, annotationGen, mat, svg=None):
                 if view is not None:
                     annotation.textFields[0].text = view.name
 
+            # Text from a custom property of the object, only set when it
+            # changes so the label isn't queued for an update every redraw
+            textSource = annotation.annotationTextSource
+            if textSource != '' and textSource in myobj:
+                sourceTexts = [str(myobj[textSource])]
+                if len(annotation.textFields) > 1:
+                    sourceTexts = [textSource, str(myobj[textSource])]
+                for textField, sourceText in zip(annotation.textFields, sourceTexts):
+                    if textField.text != sourceText:
+                        textField.text = sourceText
+
             for textField in annotation.textFields:
                 origin = p2
                 xDir = rotMatrix @ rotMat @ Vector((1,0,0))
@@ -2447,6 +2849,17 @@ def draw_text_3D(context,textobj,textprops,myobj,card):
     card[1] = Vector(card[1])
     card[2] = Vector(card[2])
     card[3] = Vector(card[3])
+
+    # Labels too small to read, once they have been rasterized so their
+    # card has its real size
+    cardHeight = None
+    if textobj.textHeight > 0 and textobj.text != "":
+        cardHeight = get_card_pixel_height(card)
+    if cardHeight is not None and cardHeight < TEXT_LOD_BAR:
+        if cardHeight >= TEXT_LOD_HIDDEN:
+            rgb = rgb_gamma_correct(textprops.color)
+            draw_lines(1.0, rgb, [(card[0] + card[1]) / 2, (card[3] + card[2]) / 2])
+        return
     uvVal = 1.0
     normalizedDeviceUVs= [(-uvVal,-uvVal),(-uvVal,uvVal),(uvVal,uvVal),(uvVal,-uvVal)]
 
@@ -2556,55 +2969,25 @@ def draw_text_3D(context,textobj,textprops,myobj,card):
         uv = (Vector(normUV) + Vector((1,1)))*0.5
         uvs.append(uv)
 
-    # Gets Texture from Object
-    width = textobj.textWidth
-    height = textobj.textHeight 
-    dim = width * height * 4
-
     # Draw Text card for debug
     if sceneProps.show_text_cards:
         coords=[card[0],card[1],card[1],card[2],card[2],card[3],card[3],card[0]]
         draw_lines(1.0,(0.0, 1.0, 0.0, 1.0), coords)
 
+    # Queue the card, labels are drawn per atlas page at the end of draw3d_loop
+    if textobj.text != "":
+        textKey = get_text_key(textobj, textprops)
+        if not textAtlas.has_label(textKey):
+            rasterize_text(textobj, textprops, context)
 
-    set_OpenGL_Settings(True)
-    if 'texture' in textobj and textobj.text != "":
-        # np.asarray takes advantage of the buffer protocol and solves the bottleneck here!!!
-        texArray = bgl.Buffer(bgl.GL_INT,[1])
-        bgl.glGenTextures(1,texArray)
+        if textAtlas.has_label(textKey):
+            textAtlas.queue_label(textKey, card, uvs)
 
-        bgl.glActiveTexture(bgl.GL_TEXTURE0)
-        bgl.glBindTexture(bgl.GL_TEXTURE_2D, texArray[0])
-
-        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_WRAP_S, bgl.GL_CLAMP_TO_BORDER)
-        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_WRAP_T, bgl.GL_CLAMP_TO_BORDER)
-        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MIN_FILTER, bgl.GL_LINEAR)
-        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MAG_FILTER, bgl.GL_LINEAR)
-
-
-        tex = bgl.Buffer(bgl.GL_BYTE, dim, np.asarray(textobj['texture'], dtype=np.uint8))
-        bgl.glTexImage2D(bgl.GL_TEXTURE_2D, 0, bgl.GL_RGBA, width, height, 0, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, tex)
-       
-
-        textobj.texture_updated=False
-     
-        # Draw Shader
-        textShader.bind()
-        textShader.uniform_float("image", 0)
 
-        
-        # Batch Geometry
-        batch = batch_for_shader(
-            textShader, 'TRI_FAN',
-            {
-                "pos": card,
-                "uv": uvs,
-            },
-        )
-
-
-        batch.draw(textShader)
-        bgl.glDeleteTextures(1,texArray)
+# Draw all labels queued by draw_text_3D
+def draw_text_atlas():
+    set_OpenGL_Settings(True)
+    textAtlas.flush(textShader)
     gpu.shader.unbind()
 
 def generate_end_caps(context,item,capType,capSize,pos,userOffsetVector,midpoint,posflag,flipCaps):
@@ -2689,7 +3072,13 @@ def generate_end_caps(context,item,capType,capSize,pos,userOffsetVector,midpoint
     
     return capCoords, filledCoords
 
-def generate_text_card(context,textobj,textProps,rotation = Vector((0,0,0)), basePoint = Vector((0,0,0)), xDir = Vector((1,0,0)), yDir = Vector((0,1,0)), cardIdx = 0): 
+# textAlignment, textPosition: override the ones of textProps
+def generate_text_card(context,textobj,textProps,rotation = Vector((0,0,0)), basePoint = Vector((0,0,0)), xDir = Vector((1,0,0)), yDir = Vector((0,1,0)), cardIdx = 0, textAlignment = None, textPosition = None): 
+    if textAlignment is None:
+        textAlignment = textProps.textAlignment
+    if textPosition is None:
+        textPosition = textProps.textPosition
+
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
 
@@ -2713,16 +3102,16 @@ def generate_text_card(context,textobj,textProps,rotation = Vector((0,0,0)), bas
     square = [(basePoint-(cardX/2)),(basePoint-(cardX/2)+cardY ),(basePoint+(cardX/2)+cardY ),(basePoint+(cardX/2))]
 
     #pick approprate card based on alignment
-    if textProps.textAlignment == 'R':
+    if textAlignment == 'R':
         aOff = 0.5*cardX
-    elif textProps.textAlignment == 'L':
+    elif textAlignment == 'L':
         aOff = -0.5*cardX
     else:
         aOff = Vector((0.0,0.0,0.0))
 
-    if textProps.textPosition == 'M':
+    if textPosition == 'M':
         pOff = 0.5*cardY
-    elif textProps.textPosition == 'B':
+    elif textPosition == 'B':
         pOff = 1.0*cardY
     else:
         pOff = Vector((0.0,0.0,0.0))
@@ -2797,7 +3186,7 @@ def get_2d_point(region, rv3d, point3d):
     if rv3d is not None and region is not None:
         return view3d_utils.location_3d_to_region_2d(region, rv3d, point3d)
     else:
-        return get_render_location(point3d)
+        return svg_shaders.get_render_location(point3d)
 
 
   
@@ -3069,40 +3458,93 @@ def get_mesh_vertices(myobj):
     sceneProps = bpy.context.scene.MeasureItArchProps
     try:
         obverts = []
-        verts=[]
         if myobj.type == 'MESH':
             if myobj.mode == 'EDIT':
                 bm = bmesh.from_edit_mesh(myobj.data)
-                verts = bm.verts
+                obverts = get_vertex_coords(bm.verts)
             else:
                 eval_res = sceneProps.eval_mods
                 if eval_res or check_mods(myobj):
                     deps = bpy.context.view_layer.depsgraph
                     obj_eval = myobj.evaluated_get(deps)
                     mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=deps)
-                    verts = mesh.vertices
+                    obverts = get_vertex_coords(mesh.vertices)
+                    obj_eval.to_mesh_clear()
                 else:
-                    verts = myobj.data.vertices
-
-            # We're going through every Vertex in the object here
-            # probably excessive, should figure out a better way to
-            # link dims to verts...
+                    obverts = get_vertex_coords(myobj.data.vertices)
 
-            obverts = [vert.co for vert in verts]
-            
             return obverts
         else: return None 
     except AttributeError:
         return None
 
+# --------------------------------------------------------------------
+# View a read back bgl.Buffer as a NumPy array
+# np.asarray uses the buffer protocol, so no copy is made when the
+# element size matches (GL_BYTE data read as GL_UNSIGNED_BYTE)
+# --------------------------------------------------------------------
+def buffer_to_array(buffer, dtype, shape):
+    data = np.asarray(buffer)
+    if data.dtype.itemsize == np.dtype(dtype).itemsize:
+        data = data.view(dtype)
+    else:
+        data = data.astype(dtype)
+    return data.reshape(shape)
+
+# --------------------------------------------------------------------
+# Fill an image datablock from an (height, width, 4) array,
+# uint8 pixels are scaled to [0,1]
+# --------------------------------------------------------------------
+def set_image_pixels(image, pixels):
+    if pixels.dtype == np.uint8:
+        pixels = np.multiply(pixels, 1 / 255, dtype=np.float32)
+    image.pixels.foreach_set(pixels.astype(np.float32, copy=False).ravel())
+
+# --------------------------------------------------------------------
+# Get all vertex coordinates of a mesh as an (N,3) float32 array
+# --------------------------------------------------------------------
+def get_vertex_coords(verts):
+    if not hasattr(verts, 'foreach_get'):
+        # BMesh vertex sequences have no foreach_get
+        return np.array([vert.co for vert in verts], dtype=np.float32).reshape(-1, 3)
+
+    coords = np.empty(len(verts) * 3, dtype=np.float32)
+    verts.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
+# --------------------------------------------------------------------
+# Transform an (N,3) array of coordinates by a 4x4 matrix
+# --------------------------------------------------------------------
+def transform_coords(coords, mat):
+    coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+    mat = np.array(mat, dtype=np.float32)
+    return coords @ mat[:3, :3].T + mat[:3, 3]
+
 ## A streamlined version of get mesh vertex for line drawing
-def get_line_vertex(idx,verts,mat):
-    try:
-        vert = verts[idx].co
-    except:
-        #print("Broken Vertex!!!")
-        vert = Vector((0,0,0))
-    return vert
+## Invalid indices get the origin, like a broken vertex used to
+def get_line_vertices(indices, vertCoords):
+    indices = np.asarray(indices, dtype=np.int64)
+    valid = (indices >= 0) & (indices < len(vertCoords))
+
+    coords = np.zeros((len(indices), 3), dtype=np.float32)
+    coords[valid] = vertCoords[indices[valid]]
+    return coords
+
+# --------------------------------------------------------------------
+# Get the weights of a vertex group for a list of vertex indices
+# Vertices that aren't in the group get a weight of 0
+# --------------------------------------------------------------------
+def get_vertex_weights(vertexGroup, indices):
+    indices = np.asarray(indices, dtype=np.int64)
+    uniqueIndices, inverse = np.unique(indices, return_inverse=True)
+
+    uniqueWeights = np.zeros(len(uniqueIndices), dtype=np.float32)
+    for i, idx in enumerate(uniqueIndices.tolist()):
+        try:
+            uniqueWeights[i] = vertexGroup.weight(idx)
+        except RuntimeError:
+            pass
+    return uniqueWeights[inverse]
 
 def archipack_datablock(o):
     """
@@ -3219,87 +3661,142 @@ def set_OpenGL_Settings(toggleBool,props=None):
 
         bgl.glDisable(bgl.GL_POLYGON_SMOOTH)
 
-def draw_points(lineWeight,rgb,coords,offset = -0.001,depthpass=False):
-    viewport = get_viewport()
-
-    pointShader.bind()
-    pointShader.uniform_float("thickness",lineWeight)
-    pointShader.uniform_float("Viewport",viewport)
-    pointShader.uniform_float("finalColor", (rgb[0], rgb[1], rgb[2], rgb[3]))
-    pointShader.uniform_float("offset", offset)
-    pointShader.uniform_float("depthPass", False)
-    batch = batch_for_shader(pointShader, 'POINTS', {"pos": coords})
-    batch.program_set(pointShader)
-    batch.draw()
-    gpu.shader.unbind()
+# --------------------------------------------------------------------
+# Draw collector
+# Lines, points & fills of dimensions and annotations are gathered
+# while draw3d_loop runs, and drawn with one batch per draw state (depth
+# test, two pass, offset...) before the next line group and at the end.
+# Outside of draw3d_loop geometry is drawn right away.
+# --------------------------------------------------------------------
+class DrawCollector():
+    # Draw order of the primitive types
+    typeOrder = {'TRIS': 0, 'LINES': 1, 'POINTS': 2}
+
+    def __init__(self):
+        self.groups = {}
+        self.depth = 0
+
+    def begin(self):
+        self.depth += 1
+
+    def end(self):
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0:
+            self.flush()
+
+    def add(self, key, coords, rgb, weight=0.0):
+        # Only whole primitives, a stray vertex would pair up with the next call
+        vertsPerPrim = {'TRIS': 3, 'LINES': 2, 'POINTS': 1}[key[0]]
+        numVerts = len(coords) - len(coords) % vertsPerPrim
+        if numVerts > 0:
+            group = self.groups.get(key)
+            if group is None:
+                group = {'pos': [], 'color': [], 'weight': []}
+                self.groups[key] = group
+
+            group['pos'].extend(coords[:numVerts])
+            group['color'].extend([(rgb[0], rgb[1], rgb[2], rgb[3])] * numVerts)
+            group['weight'].extend([weight] * numVerts)
+
+        if self.depth == 0:
+            self.flush()
+
+    def flush(self):
+        if len(self.groups) == 0:
+            return
+
+        sceneProps = bpy.context.scene.MeasureItArchProps
+        viewport = get_viewport()
+        set_OpenGL_Settings(True)
+
+        for key in sorted(self.groups, key=lambda key: self.typeOrder[key[0]]):
+            group = self.groups[key]
+            primType, depthTest = key[0], key[1]
+
+            if depthTest:
+                bgl.glEnable(bgl.GL_DEPTH_TEST)
+            else:
+                bgl.glDisable(bgl.GL_DEPTH_TEST)
+
+            pos = np.array(group['pos'], dtype=np.float32).reshape(-1, 3)
+            color = np.array(group['color'], dtype=np.float32)
+
+            if primType == 'TRIS':
+                offset, polySmooth, opaque = key[2:]
+                draw_tri_batch(pos, color, offset, polySmooth, opaque, sceneProps)
+
+            else:
+                weight = np.array(group['weight'], dtype=np.float32)
+                if primType == 'LINES':
+                    offset, twoPass = key[2:]
+                    shader = lineBatchShader
+                else:
+                    offset, twoPass = key[2], False
+                    shader = pointBatchShader
+
+                batch = batch_for_shader(shader, primType, {"pos": pos, "color": color, "weight": weight})
+                shader.bind()
+                shader.uniform_float("Viewport", viewport)
+                shader.uniform_float("offset", offset)
+
+                if twoPass:
+                    bgl.glDepthMask(True)
+                    shader.uniform_float("depthPass", True)
+                    batch.draw(shader)
+
+                if sceneProps.is_render_draw and primType == 'LINES':
+                    bgl.glBlendEquation(bgl.GL_MAX)
+
+                bgl.glDepthMask(False)
+                shader.uniform_float("depthPass", False)
+                batch.draw(shader)
+                bgl.glBlendEquation(bgl.GL_FUNC_ADD)
+
+        gpu.shader.unbind()
+        self.groups.clear()
+        set_OpenGL_Settings(False)
 
-def draw_filled_coords(filledCoords, rgb, offset = -0.001, polySmooth = True):
-    context = bpy.context
-    scene = context.scene
-    sceneProps = scene.MeasureItArchProps
 
+def draw_tri_batch(pos, color, offset, polySmooth, opaque, sceneProps):
     bgl.glEnable(bgl.GL_POLYGON_SMOOTH)
     if not polySmooth:
         bgl.glDisable(bgl.GL_POLYGON_SMOOTH)
 
-
-    if rgb[3] != 1:
-        bgl.glDepthMask(False)
+    bgl.glDepthMask(opaque)
 
     if sceneProps.is_render_draw:
         bgl.glBlendEquation(bgl.GL_MAX)
-        
-  
-    triShader.bind()
-    triShader.uniform_float("finalColor", (rgb[0], rgb[1], rgb[2], rgb[3]))
-    triShader.uniform_float("offset", offset)
 
-    batch = batch_for_shader(triShader, 'TRIS', {"pos": filledCoords})
-    batch.program_set(triShader)
-    batch.draw()
-    gpu.shader.unbind()
+    triBatchShader.bind()
+    triBatchShader.uniform_float("offset", offset)
+    batch = batch_for_shader(triBatchShader, 'TRIS', {"pos": pos, "color": color})
+    batch.draw(triBatchShader)
 
     bgl.glDisable(bgl.GL_POLYGON_SMOOTH)
     bgl.glBlendEquation(bgl.GL_FUNC_ADD)
 
-def draw_lines(lineWeight, rgb, coords, offset = -0.001, twoPass = False, pointPass = False, pointCoords = None):
-    context = bpy.context
-    scene = context.scene
-    sceneProps = scene.MeasureItArchProps
-    viewport = get_viewport()
-
-    lineShader.bind()
-    lineShader.uniform_float("Viewport",viewport)
-    lineShader.uniform_float("thickness",lineWeight)
-    lineShader.uniform_float("finalColor", (rgb[0], rgb[1], rgb[2], rgb[3]))
-    lineShader.uniform_float("offset",offset)
-    gpu.shader.unbind()
 
-    # batch & Draw Shader   
-    batch3d = batch_for_shader(lineShader, 'LINES', {"pos": coords})
+drawCollector = DrawCollector()
 
-    if rgb[3] == 1 and twoPass:
 
-        bgl.glDepthMask(True)
-        lineShader.uniform_float("depthPass",True)
-        batch3d.program_set(lineShader)
-        batch3d.draw()
+def draw_points(lineWeight,rgb,coords,offset = -0.001,depthpass=False):
+    depthTest = bool(bgl.glIsEnabled(bgl.GL_DEPTH_TEST))
+    drawCollector.add(('POINTS', depthTest, offset), coords, rgb, lineWeight)
 
-    if sceneProps.is_render_draw:
-        bgl.glBlendEquation(bgl.GL_MAX)
+def draw_filled_coords(filledCoords, rgb, offset = -0.001, polySmooth = True):
+    depthTest = bool(bgl.glIsEnabled(bgl.GL_DEPTH_TEST))
+    opaque = rgb[3] == 1
+    drawCollector.add(('TRIS', depthTest, offset, polySmooth, opaque), filledCoords, rgb)
 
-    bgl.glDepthMask(False)
-    lineShader.uniform_float("depthPass",False)
-    batch3d.program_set(lineShader)
-    batch3d.draw()
-    gpu.shader.unbind()
+def draw_lines(lineWeight, rgb, coords, offset = -0.001, twoPass = False, pointPass = False, pointCoords = None):
+    depthTest = bool(bgl.glIsEnabled(bgl.GL_DEPTH_TEST))
+    twoPass = twoPass and rgb[3] == 1
+    drawCollector.add(('LINES', depthTest, offset, twoPass), coords, rgb, lineWeight)
 
     if pointPass:
         if pointCoords == None:
             pointCoords = coords
         draw_points(lineWeight,rgb,pointCoords,offset)
-        
-    bgl.glBlendEquation(bgl.GL_FUNC_ADD)
 
 def cap_extension(dirVec,capSize, capAngle):
     scale = get_scale()
@@ -3314,25 +3811,25 @@ def dim_text_placement(dim, dimProps, origin, dist, distVec, offsetDistance, cap
     context = bpy.context
     sceneProps = context.scene.MeasureItArchProps
     flipCaps = False
-    dimProps.textPosition = 'T'
+    textPosition = 'T'
     dimLineExtension = 0 # add some extension to the line if the dimension is ext
     normDistVector = distVec.normalized()
     dimText = dim.textFields[0]
     
     if dimProps.textAlignment == 'L' :
-        dimProps.textPosition = 'M'
+        textPosition = 'M'
         flipCaps=True
         dimLineExtension = dim_line_extension(capSize)
         origin += Vector((dist/2 + dimLineExtension*1.2)* normDistVector)
         
     elif dimProps.textAlignment == 'R':
         flipCaps=True
-        dimProps.textPosition = 'M'
+        textPosition = 'M'
         dimLineExtension = dim_line_extension(capSize)
         origin -= Vector((dist/2 + dimLineExtension*1.2)* normDistVector)
     
     
-    square = generate_text_card(context,dimText,dimProps,basePoint= origin, xDir= normDistVector, yDir= offsetDistance)
+    square = generate_text_card(context,dimText,dimProps,basePoint= origin, xDir= normDistVector, yDir= offsetDistance, textPosition=textPosition)
     cardX = square[3] - square[0]
     cardY = square[1] - square[0]
 
@@ -3342,16 +3839,31 @@ def dim_text_placement(dim, dimProps, origin, dist, distVec, offsetDistance, cap
             flipCaps=True
             dimLineExtension = dim_line_extension(capSize)
             origin += distVec*-0.5 - (dimLineExtension*normDistVector) - cardX/2 - cardY/2
-            square = generate_text_card(context,dimText,dimProps,basePoint= origin, xDir= normDistVector, yDir= offsetDistance)
+            square = generate_text_card(context,dimText,dimProps,basePoint= origin, xDir= normDistVector, yDir= offsetDistance, textPosition=textPosition)
     
     return (square, flipCaps, dimLineExtension, origin)
 
-def get_viewport(renderScale = True):
+# Tiled renders draw with the viewport of the current tile
+renderViewport = None
+
+def set_render_viewport(viewport):
+    global renderViewport
+    renderViewport = viewport
+    if drawContext is not None:
+        drawContext.viewport = get_viewport(useDrawContext=False)
+
+def get_viewport(renderScale = True, useDrawContext = True):
+    if useDrawContext and drawContext is not None:
+        return list(drawContext.viewport)
+
     context = bpy.context
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
     
-    if sceneProps.is_render_draw:
+    if sceneProps.is_render_draw and renderViewport is not None:
+        viewport = list(renderViewport)
+
+    elif sceneProps.is_render_draw:
         viewport = [context.scene.render.resolution_x, context.scene.render.resolution_y]
     
     else:
@@ -3402,6 +3914,10 @@ def get_view():
     return view
 
 def get_rv3d():
+    # No 3D view when running headless
+    if bpy.context.area is None:
+        return None
+
     spaces = bpy.context.area.spaces
     rv3d = None
     for space in spaces:
@@ -3415,6 +3931,9 @@ def get_rv3d():
     
     
 def get_scale():
+    if drawContext is not None:
+        return drawContext.scale
+
     scene = bpy.context.scene
     sceneProps = scene.MeasureItArchProps
 
@@ -3430,6 +3949,9 @@ def get_scale():
     return scale
 
 def get_resolution():
+    if drawContext is not None:
+        return drawContext.resolution
+
     scene = bpy.context.scene
     sceneProps = scene.MeasureItArchProps
 
@@ -3450,10 +3972,155 @@ def get_lineWeight():
 
 
 
+# --------------------------------------------------------------------
+# Selection, theme & view settings used by the draw functions, read once
+# per redraw instead of once per item
+# --------------------------------------------------------------------
+class DrawContext():
+
+    def __init__(self, context):
+        scene = context.scene
+        sceneProps = scene.MeasureItArchProps
+
+        # Read with the draw context unset, so they come from bpy
+        self.scale = get_scale()
+        self.resolution = get_resolution()
+        self.viewport = get_viewport(useDrawContext=False)
+
+        self.highlightSelected = sceneProps.highlight_selected and not sceneProps.is_render_draw
+        self.selectedObjects = set()
+        self.activeDataName = None
+        self.selectedColor = (0.0, 0.0, 0.0)
+        self.activeColor = (0.0, 0.0, 0.0)
+        if self.highlightSelected:
+            self.selectedObjects = {obj.name for obj in context.selected_objects}
+            active = context.view_layer.objects.active
+            if active is not None and active.data is not None:
+                self.activeDataName = active.data.name
+            theme = context.preferences.themes[0].view_3d
+            self.selectedColor = tuple(theme.object_selected[0:3])
+            self.activeColor = tuple(theme.object_active[0:3])
+
+        self.isOrtho = False
+        self.viewProjection = None
+        self.textLodMatrix = None
+        if sceneProps.is_render_draw:
+            self.isOrtho = scene.camera.data.type == 'ORTHO'
+            self.viewProjection = svg_shaders.get_camera_projection(scene).matrix
+        else:
+            rv3d = get_rv3d()
+            self.isOrtho = rv3d is not None and rv3d.view_perspective == 'ORTHO'
+            if rv3d is not None:
+                self.viewProjection = np.array(rv3d.perspective_matrix, dtype=np.float64)
+                # Renders always get full size labels
+                self.textLodMatrix = rv3d.perspective_matrix.copy()
+
+        # Off while drawing geometry placed by an external matrix
+        # (title blocks & custom shapes), which the cached bounds miss
+        self.culling = self.viewProjection is not None
+
+
+# --------------------------------------------------------------------
+# Text level of detail
+# Labels with cards smaller than TEXT_LOD_BAR pixels are drawn as a bar
+# without rasterizing the text, below TEXT_LOD_HIDDEN they're skipped.
+# Bigger labels are sampled from the downsampled atlas levels by the GPU
+# --------------------------------------------------------------------
+TEXT_LOD_HIDDEN = 1.0
+TEXT_LOD_BAR = 5.0
+
+# return: projected card height in pixels, None without a text LOD
+def get_card_pixel_height(card):
+    drawState = get_draw_context()
+    matrix = drawState.textLodMatrix
+    if matrix is None:
+        return None
+
+    bottom = matrix @ Vector(((card[0][0] + card[3][0]) / 2, (card[0][1] + card[3][1]) / 2,
+                              (card[0][2] + card[3][2]) / 2, 1.0))
+    top = matrix @ Vector(((card[1][0] + card[2][0]) / 2, (card[1][1] + card[2][1]) / 2,
+                           (card[1][2] + card[2][2]) / 2, 1.0))
+    # Cards crossing the view plane are always drawn
+    if bottom[3] <= 1e-6 or top[3] <= 1e-6:
+        return None
+
+    dx = (top[0] / top[3] - bottom[0] / bottom[3]) * drawState.viewport[0] / 2
+    dy = (top[1] / top[3] - bottom[1] / bottom[3]) * drawState.viewport[1] / 2
+    return sqrt(dx * dx + dy * dy)
+
+
+# --------------------------------------------------------------------
+# Conservative culling against the view frustum
+# bounds: (min, max) corners of an axis aligned box, None if empty
+# mat: optional matrix the box is placed with
+# return: False only when the whole box is outside of one clip plane
+# --------------------------------------------------------------------
+CULL_MARGIN = 1.1
+
+def get_coords_bounds(coords):
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    if len(coords) == 0:
+        return None
+    return (coords.min(axis=0), coords.max(axis=0))
+
+
+def bounds_in_view(bounds, mat=None):
+    drawState = get_draw_context()
+    if bounds is None or not drawState.culling:
+        return True
+
+    matrix = drawState.viewProjection
+    if mat is not None:
+        matrix = matrix @ np.array(mat, dtype=np.float64)
+
+    # The sides are widened a little for line widths & text
+    return bool(svg_occlusion.boxes_in_frustum(matrix, bounds[0], bounds[1], CULL_MARGIN)[0])
+
+
+# The current draw context, outside of draw3d_loop a fresh one
+def get_draw_context():
+    if drawContext is not None:
+        return drawContext
+    return DrawContext(bpy.context)
+
+
 def draw3d_loop(context,objlist,svg = None,extMat=None, multMat = False):
+    global dimSceneState
+    global drawContext
+    topLevel = drawCollector.depth == 0
+    if topLevel:
+        # Scene & unit settings are read once per redraw
+        dimSceneState = None
+        drawContext = None
+        drawContext = DrawContext(context)
+    drawCollector.begin()
+    try:
+        draw3d_objects(context,objlist,svg=svg,extMat=extMat,multMat=multMat)
+    finally:
+        # Draw all collected geometry and queued text labels
+        drawCollector.end()
+        if topLevel:
+            draw_text_atlas()
+            drawContext = None
+
+def draw3d_objects(context,objlist,svg = None,extMat=None, multMat = False):
     # ---------------------------------------
     # Generate all OpenGL calls
     # ---------------------------------------
+    drawState = get_draw_context()
+    culling = drawState.culling
+    if extMat is not None:
+        drawState.culling = False
+    try:
+        draw3d_object_list(context,objlist,svg=svg,extMat=extMat,multMat=multMat)
+    finally:
+        drawState.culling = culling
+
+    # Draw Instanced Objects
+    draw_instances(context, svg=svg)
+
+
+def draw3d_object_list(context,objlist,svg = None,extMat=None, multMat = False):
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
 
@@ -3522,32 +4189,101 @@ def draw3d_loop(context,objlist,svg = None,extMat=None, multMat = False):
             endTime = time.time()
             print("Time: " + str(endTime -startTime))
         idx += 1    
-    # Draw Instanced Objects
-    if True:
-        deps = bpy.context.view_layer.depsgraph
-        for obj_int in deps.object_instances:
-            if obj_int.is_instance:
-                myobj = obj_int.object
-                
-                if 'LineGenerator' in myobj or 'AnnotationGenerator' in myobj or 'DimensionGenerator' in myobj:
-                    mat = obj_int.matrix_world
 
-                if 'LineGenerator' in myobj and myobj.LineGenerator[0].line_num != 0:
-                    lineGen = myobj.LineGenerator[0]
-                    draw_line_group(context,myobj,lineGen,mat,svg=svg)
-                
+
+# --------------------------------------------------------------------
+# Instanced objects
+# --------------------------------------------------------------------
+def invalidate_instances():
+    global instanceTable
+    instanceTable = None
+
+
+# --------------------------------------------------------------------
+# Group the depsgraph instances of objects with generators by the object
+# they instance, so line groups can be drawn for all instances at once.
+# object_instances is only walked again after objects or collections
+# were updated or the frame changed
+# return: {object name: {'matrices', 'array' (K,4,4), 'keys', 'revision'}}
+# --------------------------------------------------------------------
+def get_instance_table():
+    global instanceTable
+    global instanceRevision
+    global instanceTableKey
+
+    # Switching scenes or view layers, or rendering another scene,
+    # doesn't send object updates
+    viewLayer = bpy.context.view_layer
+    tableKey = (bpy.context.scene.as_pointer(), viewLayer.as_pointer())
+    if instanceTable is not None and instanceTableKey == tableKey:
+        return instanceTable
+
+    instanceRevision += 1
+    table = {}
+    deps = viewLayer.depsgraph
+    for obj_int in deps.object_instances:
+        if not obj_int.is_instance:
+            continue
+        myobj = obj_int.object
+        if 'LineGenerator' not in myobj and 'AnnotationGenerator' not in myobj and 'DimensionGenerator' not in myobj:
+            continue
+
+        instances = table.get(myobj.name)
+        if instances is None:
+            instances = {'matrices': [], 'keys': [], 'revision': instanceRevision}
+            table[myobj.name] = instances
+
+        parentName = ''
+        if obj_int.parent is not None:
+            parentName = obj_int.parent.name
+        instances['matrices'].append(obj_int.matrix_world.copy())
+        instances['keys'].append((parentName, tuple(obj_int.persistent_id)))
+
+    for instances in table.values():
+        instances['array'] = np.array([np.array(mat) for mat in instances['matrices']], dtype=np.float32)
+
+    # Drop cached dimensions of instances that are gone
+    instanceKeys = {None}
+    for instances in table.values():
+        instanceKeys.update(instances['keys'])
+    for key in [key for key in dimensionCache if key[1] not in instanceKeys]:
+        del dimensionCache[key]
+
+    instanceTable = table
+    instanceTableKey = tableKey
+    return table
+
+
+def draw_instances(context, svg=None):
+    global drawInstanceKey
+    sceneProps = context.scene.MeasureItArchProps
+
+    for name, instances in get_instance_table().items():
+        myobj = bpy.data.objects.get(name)
+        if myobj is None:
+            continue
+
+        # One batch per line group for all instances
+        if 'LineGenerator' in myobj and myobj.LineGenerator[0].line_num != 0:
+            lineGen = myobj.LineGenerator[0]
+            draw_line_group(context,myobj,lineGen,Matrix.Identity(4),svg=svg,instances=instances)
+
+        # Annotations & dimensions depend on the view, so they're placed
+        # per instance, their cache entries are kept per instance
+        try:
+            for mat, drawInstanceKey in zip(instances['matrices'], instances['keys']):
                 if 'AnnotationGenerator' in myobj and myobj.AnnotationGenerator[0].num_annotations != 0:
                     annotationGen = myobj.AnnotationGenerator[0]
                     draw_annotation(context,myobj,annotationGen,mat,svg=svg)
-                    
+
                 if sceneProps.instance_dims:
                     if 'DimensionGenerator' in myobj and myobj.DimensionGenerator[0].measureit_arch_num != 0:
                         DimGen = myobj.DimensionGenerator[0]
-                        mat = obj_int.matrix_world
                         for alignedDim in DimGen.alignedDimensions:
                             draw_alignedDimension(context, myobj, DimGen, alignedDim,mat,svg=svg)
                         for angleDim in DimGen.angleDimensions:
                             draw_angleDimension(context, myobj, DimGen, angleDim,mat,svg=svg)
                         for axisDim in DimGen.axisDimensions:
                             draw_axisDimension(context,myobj,DimGen,axisDim,mat,svg=svg)
-    
+        finally:
+            drawInstanceKey = None
@@ -32,6 +32,95 @@ from bpy.types import (
     Gizmo,
     Scene
 )
+import numpy as np
+from .measureit_arch_baseclass import get_style_props
+from . import svg_occlusion
+
+# Anchors per side of the gizmo grid
+GIZMO_GRID_CELLS = 16
+
+
+# --------------------------------------------------------------------
+# Uniform grid over the gizmo anchors (gizLoc), whole cells outside of
+# the view are skipped when picking the gizmos to show
+# --------------------------------------------------------------------
+class AnchorGrid():
+
+    def __init__(self, keys, locations):
+        self.keys = keys
+        self.cells = {}
+        self.origin = np.zeros(3)
+        self.cellSize = 1.0
+
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        if len(locations) == 0:
+            return
+
+        self.origin = locations.min(axis=0)
+        extent = (locations.max(axis=0) - self.origin).max()
+        self.cellSize = max(extent / GIZMO_GRID_CELLS, 1e-3)
+        cellIndices = np.floor((locations - self.origin) / self.cellSize).astype(np.int64)
+        for idx, cell in enumerate(map(tuple, cellIndices.tolist())):
+            self.cells.setdefault(cell, []).append(idx)
+
+    # Keys of the anchors in cells that touch the view
+    def query(self, viewProjection):
+        if len(self.cells) == 0:
+            return set()
+
+        cells = list(self.cells)
+        cellMins = self.origin + np.array(cells, dtype=np.float64) * self.cellSize
+        inView = svg_occlusion.boxes_in_frustum(viewProjection, cellMins, cellMins + self.cellSize, 1.1)
+
+        visible = set()
+        for cell, show in zip(cells, inView.tolist()):
+            if show:
+                visible.update(self.keys[idx] for idx in self.cells[cell])
+        return visible
+
+
+# --------------------------------------------------------------------
+# Gizmos of the group, reused between refreshes
+# Gizmos of items that aren't shown are hidden and kept per role, so
+# the next item needing one only has to set it up again
+# --------------------------------------------------------------------
+class GizmoPool():
+
+    def __init__(self, group):
+        self.group = group
+        self.free = {}
+        self.items = {}
+
+    # Gizmo for the item being set up
+    def acquire(self, gizType, role):
+        free = self.free.get(role)
+        if free:
+            giz = free.pop()
+            giz.hide = False
+        else:
+            giz = self.group.gizmos.new(gizType)
+        self.building.append((role, giz))
+        return giz
+
+    def release(self, key):
+        item = self.items.pop(key, None)
+        if item is None:
+            return
+        for role, giz in item['gizmos']:
+            giz.hide = True
+            self.free.setdefault(role, []).append(giz)
+
+    # Set up the gizmos of an item unless it's unchanged
+    def update(self, key, state, create):
+        item = self.items.get(key)
+        if item is not None and item['state'] == state:
+            return
+        self.release(key)
+        self.building = []
+        create(self)
+        self.items[key] = {'state': state, 'gizmos': self.building}
+        self.building = None
+
 
 class mArchGizmoGroup(GizmoGroup):
     bl_idname = "OBJECT_GG_mArch"
@@ -52,45 +141,98 @@ class mArchGizmoGroup(GizmoGroup):
                 if 'AnnotationGenerator' in obj:
                     return (obj)
 
-    def createGiz(self,obj):
-        objIndex = 0
-        for obj in bpy.context.selected_objects:    
+    # Anchors of every item on the selected objects that gets gizmos
+    def collectAnchors(self, context):
+        anchors = {}
+        for objIndex, obj in enumerate(context.selected_objects):
             if 'DimensionGenerator' in obj:
                 dimGen = obj.DimensionGenerator[0]
-                idx = 0
-                for dim in dimGen.alignedDimensions:
-                    createDimOffsetGiz(self,dim,objIndex,idx,"DimensionGenerator[0].alignedDimensions[self.idx]")
-                    idx += 1
-                idx = 0
-                for dim in dimGen.axisDimensions:
-                    createDimOffsetGiz(self,dim,objIndex,idx,"DimensionGenerator[0].axisDimensions[self.idx]")
-                    idx += 1
+                for dimType in ('alignedDimensions', 'axisDimensions'):
+                    for idx, dim in enumerate(getattr(dimGen, dimType)):
+                        anchors[('DIM', obj.name, dimType, idx, objIndex)] = tuple(dim.gizLoc)
             if 'AnnotationGenerator' in obj:
                 annotationGen = obj.AnnotationGenerator[0]
-                createAnnotationTranslateGiz(self,annotationGen,objIndex)
-                createAnnotationRotateGiz(self,annotationGen,objIndex)
-            objIndex += 1
+                for idx, anno in enumerate(annotationGen.annotations):
+                    anchors[('ANNO', obj.name, 'annotations', idx, objIndex)] = tuple(anno.gizLoc)
+        return anchors
+
+    # Set up the gizmos of an item, if it still exists
+    def updateGiz(self, context, key):
+        itemType, objName, collection, idx, objIndex = key
+        obj = bpy.data.objects.get(objName)
+        if itemType == 'DIM':
+            if obj is None or 'DimensionGenerator' not in obj:
+                return
+            dims = getattr(obj.DimensionGenerator[0], collection)
+            if idx >= len(dims):
+                return
+            dim = dims[idx]
+            dimProps = get_style_props(context, dim, 'alignedDimensions')
+            state = (tuple(dim.gizLoc), tuple(dim.gizRotDir), tuple(dimProps.color))
+            dimStr = "DimensionGenerator[0]." + collection + "[self.idx]"
+            self.pool.update(key, state, lambda pool: createDimOffsetGiz(pool,dim,dimProps,objIndex,idx,dimStr))
+        else:
+            if obj is None or 'AnnotationGenerator' not in obj:
+                return
+            annos = obj.AnnotationGenerator[0].annotations
+            if idx >= len(annos):
+                return
+            anno = annos[idx]
+            mat = obj.matrix_world
+            # The move gizmo is bound to the annotation itself, set it up
+            # again when adding or removing annotations moved it
+            state = (anno.as_pointer(), len(annos), tuple(anno.gizLoc), tuple(anno.annotationOffset),
+                     tuple(v for row in mat for v in row))
+
+            def create(pool):
+                createAnnotationTranslateGiz(pool,anno,mat,objIndex,idx)
+                createAnnotationRotateGiz(pool,anno,mat,objIndex,idx)
+            self.pool.update(key, state, create)
+
+    # Only items with anchors in view get gizmos
+    # checkChanged: also set up again items whose gizmos are shown
+    def updateVisible(self, context, checkChanged):
+        rv3d = context.region_data
+        if rv3d is None:
+            visible = set(self.anchors)
+        else:
+            visible = self.anchorGrid.query(np.array(rv3d.perspective_matrix))
+
+        for key in list(self.pool.items):
+            if key not in visible:
+                self.pool.release(key)
+        for key in visible:
+            if checkChanged or key not in self.pool.items:
+                self.updateGiz(context, key)
 
     def setup(self, context):
-        obj = context.object
-        self.createGiz(obj)
+        self.pool = GizmoPool(self)
+        self.anchors = {}
+        self.anchorGrid = AnchorGrid([], [])
+        self.viewKey = None
+        self.refresh(context)
 
     def refresh(self, context):
-        obj = context.object
-        self.gizmos.clear()
-        self.createGiz(obj)
+        self.anchors = self.collectAnchors(context)
+        self.anchorGrid = AnchorGrid(list(self.anchors), list(self.anchors.values()))
+        for key in list(self.pool.items):
+            if key not in self.anchors:
+                self.pool.release(key)
+        self.updateVisible(context, True)
+
+    def draw_prepare(self, context):
+        # The view moved, show the gizmos that came into it
+        rv3d = context.region_data
+        if rv3d is None:
+            return
+        viewKey = tuple(v for row in rv3d.perspective_matrix for v in row)
+        if viewKey != self.viewKey:
+            self.viewKey = viewKey
+            self.updateVisible(context, False)
 
 bpy.utils.register_class(mArchGizmoGroup)
 
-def createDimOffsetGiz(group,dim,objIndex,idx,dimStr):
-    context = bpy.context
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
-
-
+def createDimOffsetGiz(pool,dim,dimProps,objIndex,idx,dimStr):
     #Set Matrix
     k = Vector((0,0,1))
     basisMatrix = Matrix.Translation(Vector((0,0,0)))
@@ -102,7 +244,7 @@ def createDimOffsetGiz(group,dim,objIndex,idx,dimStr):
     basisMatrix = basisMatrix @ rotMatrix
     
     #Offset Gizmo
-    dimOffsetGiz = group.gizmos.new("GIZMO_GT_arrow_3d")
+    dimOffsetGiz = pool.acquire("GIZMO_GT_arrow_3d", 'DIM_OFFSET')
     op = dimOffsetGiz.target_set_operator("measureit_arch.dimesnion_offset")
     op.objIndex = objIndex
     op.idx = idx
@@ -123,231 +265,204 @@ def createDimOffsetGiz(group,dim,objIndex,idx,dimStr):
     
 
     #Button Gizmo
-    #dimButton = group.gizmos.new("GIZMO_GT_button_2d")
+    #dimButton = pool.acquire("GIZMO_GT_button_2d", 'DIM_BUTTON')
     #dimButton.icon = 'PREFERENCES'
     #dimButton.scale_basis = 0.2
     #dimButton.matrix_basis = basisMatrix
 
-    # Add Gizmos to group
-    group.offset_widget = dimOffsetGiz
-    #group.settings_widget = dimButton
-    #self.rotate_widget = rotateGiz
-
-def createAnnotationTranslateGiz(group,annotationGen,objIndex):
+def createAnnotationTranslateGiz(pool,anno,mat,objIndex,idx):
     # Set Basis Matrix
-    idx = 0
-    for anno in annotationGen.annotations:
-        basisMatrix = Matrix.Translation(Vector((0,0,0)))
-        obj = bpy.context.selected_objects[objIndex]
-        mat = obj.matrix_world
-        objrot = mat.to_quaternion()
-        basisMatrix.translation = Vector(anno.gizLoc) - Vector(anno.annotationOffset) 
-        scale = 1
-        lineweight = 2
-        length = 0.6
-        offset = 0.05
-        baseAlpha = 0.15
+    basisMatrix = Matrix.Translation(Vector((0,0,0)))
+    objrot = mat.to_quaternion()
+    basisMatrix.translation = Vector(anno.gizLoc) - Vector(anno.annotationOffset) 
+    scale = 1
+    lineweight = 2
+    length = 0.6
+    offset = 0.05
+    baseAlpha = 0.15
 
      
 
-        # Basic Move Gizmo
-        annotationMove = group.gizmos.new("GIZMO_GT_move_3d")
-        annotationMove.target_set_prop("offset", anno, "annotationOffset")
-
-        annotationMove.matrix_basis = basisMatrix
-        annotationMove.scale_basis = 0.15
-        annotationMove.draw_style = 'RING_2D'
-        annotationMove.draw_options= {'ALIGN_VIEW'}
-        annotationMove.line_width = lineweight
-        annotationMove.color = 0.8, 0.8, 0.8
-        annotationMove.alpha = 0.5
-        annotationMove.use_draw_modal = True 
-
-        annotationMove.color_highlight = 1.0, 1.0, 1.0
-        annotationMove.alpha_highlight = 1
-
-        #Translate Op Gizmos
-        #X
-        annotationOffsetX = group.gizmos.new("GIZMO_GT_arrow_3d")
-        opX = annotationOffsetX.target_set_operator("measureit_arch.translate_annotation")
-        opX.constrainAxis = (True,False,False)
-        opX.objIndex = objIndex
-        opX.idx = idx
-
-        XbasisMatrix = basisMatrix.to_3x3()
-        rot = Quaternion(Vector((0,1,0)),radians(90))
-        XbasisMatrix.rotate(rot)
-        XbasisMatrix.rotate(objrot)
-        XbasisMatrix.resize_4x4()
-        offsetVec = Vector((offset,0,0))
-        offsetVec.rotate(objrot)
-        XbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
-
-        annotationOffsetX.matrix_basis = XbasisMatrix
-        annotationOffsetX.use_draw_modal = False
-        annotationOffsetX.scale_basis = scale
-        annotationOffsetX.length = length
-        annotationOffsetX.line_width = lineweight
-
-        annotationOffsetX.color = 0.96, 0.2, 0.31
-        annotationOffsetX.alpha = baseAlpha
-
-        annotationOffsetX.color_highlight = 0.96, 0.2, 0.31
-        annotationOffsetX.alpha_highlight = 1
-
-        #Y
-        annotationOffsetY = group.gizmos.new("GIZMO_GT_arrow_3d")
-        opY = annotationOffsetY.target_set_operator("measureit_arch.translate_annotation")
-        opY.constrainAxis = (False,True,False)
-        opY.objIndex = objIndex
-        opY.idx = idx
-
-        YbasisMatrix = basisMatrix.to_3x3()
-        rot = Quaternion(Vector((1,0,0)),radians(-90))
-        YbasisMatrix.rotate(rot)
-        YbasisMatrix.rotate(objrot)
-        YbasisMatrix.resize_4x4()
-        offsetVec = Vector((0,offset,0))
-        offsetVec.rotate(objrot)
-        YbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
-
-        annotationOffsetY.matrix_basis = YbasisMatrix
-        annotationOffsetY.use_draw_modal = False
-        annotationOffsetY.scale_basis = scale
-        annotationOffsetY.length = length
-        annotationOffsetY.line_width = lineweight
-
-        annotationOffsetY.color = 0.54, 0.86, 0
-        annotationOffsetY.alpha = baseAlpha
-
-        annotationOffsetY.color_highlight = 0.54, 0.86, 0
-        annotationOffsetY.alpha_highlight = 1
-
-        #Z
-        annotationOffsetZ = group.gizmos.new("GIZMO_GT_arrow_3d")
-        opZ = annotationOffsetZ.target_set_operator("measureit_arch.translate_annotation")
-        opZ.constrainAxis = (False,False,True)
-        opZ.objIndex = objIndex
-        opZ.idx = idx
-
-        ZbasisMatrix = basisMatrix.to_3x3()
-        ZbasisMatrix.rotate(objrot)
-        ZbasisMatrix.resize_4x4()
-        offsetVec = Vector((0,0,offset))
-        offsetVec.rotate(objrot)
-        ZbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
-
-        annotationOffsetZ.matrix_basis = ZbasisMatrix
-        annotationOffsetZ.use_draw_modal = False
-        annotationOffsetZ.scale_basis = scale
-        annotationOffsetZ.length = length
-        annotationOffsetZ.line_width = lineweight
-
-        annotationOffsetZ.color = 0.15, 0.56, 1
-        annotationOffsetZ.alpha = baseAlpha
-
-        annotationOffsetZ.color_highlight = 0.15, 0.56, 1
-        annotationOffsetZ.alpha_highlight = 1
-        
-        #add to group
-        group.move_widget = annotationMove
-        group.X_widget = annotationOffsetX
-        group.Y_widget = annotationOffsetY
-        group.Z_widget = annotationOffsetZ
-        idx += 1
-
-def createAnnotationRotateGiz(group,annotationGen,objIndex):
+    # Basic Move Gizmo
+    annotationMove = pool.acquire("GIZMO_GT_move_3d", 'ANNO_MOVE')
+    annotationMove.target_set_prop("offset", anno, "annotationOffset")
+
+    annotationMove.matrix_basis = basisMatrix
+    annotationMove.scale_basis = 0.15
+    annotationMove.draw_style = 'RING_2D'
+    annotationMove.draw_options= {'ALIGN_VIEW'}
+    annotationMove.line_width = lineweight
+    annotationMove.color = 0.8, 0.8, 0.8
+    annotationMove.alpha = 0.5
+    annotationMove.use_draw_modal = True 
+
+    annotationMove.color_highlight = 1.0, 1.0, 1.0
+    annotationMove.alpha_highlight = 1
+
+    #Translate Op Gizmos
+    #X
+    annotationOffsetX = pool.acquire("GIZMO_GT_arrow_3d", 'ANNO_TRANSLATE')
+    opX = annotationOffsetX.target_set_operator("measureit_arch.translate_annotation")
+    opX.constrainAxis = (True,False,False)
+    opX.objIndex = objIndex
+    opX.idx = idx
+
+    XbasisMatrix = basisMatrix.to_3x3()
+    rot = Quaternion(Vector((0,1,0)),radians(90))
+    XbasisMatrix.rotate(rot)
+    XbasisMatrix.rotate(objrot)
+    XbasisMatrix.resize_4x4()
+    offsetVec = Vector((offset,0,0))
+    offsetVec.rotate(objrot)
+    XbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
+
+    annotationOffsetX.matrix_basis = XbasisMatrix
+    annotationOffsetX.use_draw_modal = False
+    annotationOffsetX.scale_basis = scale
+    annotationOffsetX.length = length
+    annotationOffsetX.line_width = lineweight
+
+    annotationOffsetX.color = 0.96, 0.2, 0.31
+    annotationOffsetX.alpha = baseAlpha
+
+    annotationOffsetX.color_highlight = 0.96, 0.2, 0.31
+    annotationOffsetX.alpha_highlight = 1
+
+    #Y
+    annotationOffsetY = pool.acquire("GIZMO_GT_arrow_3d", 'ANNO_TRANSLATE')
+    opY = annotationOffsetY.target_set_operator("measureit_arch.translate_annotation")
+    opY.constrainAxis = (False,True,False)
+    opY.objIndex = objIndex
+    opY.idx = idx
+
+    YbasisMatrix = basisMatrix.to_3x3()
+    rot = Quaternion(Vector((1,0,0)),radians(-90))
+    YbasisMatrix.rotate(rot)
+    YbasisMatrix.rotate(objrot)
+    YbasisMatrix.resize_4x4()
+    offsetVec = Vector((0,offset,0))
+    offsetVec.rotate(objrot)
+    YbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
+
+    annotationOffsetY.matrix_basis = YbasisMatrix
+    annotationOffsetY.use_draw_modal = False
+    annotationOffsetY.scale_basis = scale
+    annotationOffsetY.length = length
+    annotationOffsetY.line_width = lineweight
+
+    annotationOffsetY.color = 0.54, 0.86, 0
+    annotationOffsetY.alpha = baseAlpha
+
+    annotationOffsetY.color_highlight = 0.54, 0.86, 0
+    annotationOffsetY.alpha_highlight = 1
+
+    #Z
+    annotationOffsetZ = pool.acquire("GIZMO_GT_arrow_3d", 'ANNO_TRANSLATE')
+    opZ = annotationOffsetZ.target_set_operator("measureit_arch.translate_annotation")
+    opZ.constrainAxis = (False,False,True)
+    opZ.objIndex = objIndex
+    opZ.idx = idx
+
+    ZbasisMatrix = basisMatrix.to_3x3()
+    ZbasisMatrix.rotate(objrot)
+    ZbasisMatrix.resize_4x4()
+    offsetVec = Vector((0,0,offset))
+    offsetVec.rotate(objrot)
+    ZbasisMatrix.translation = Vector(anno.gizLoc) + offsetVec
+
+    annotationOffsetZ.matrix_basis = ZbasisMatrix
+    annotationOffsetZ.use_draw_modal = False
+    annotationOffsetZ.scale_basis = scale
+    annotationOffsetZ.length = length
+    annotationOffsetZ.line_width = lineweight
+
+    annotationOffsetZ.color = 0.15, 0.56, 1
+    annotationOffsetZ.alpha = baseAlpha
+
+    annotationOffsetZ.color_highlight = 0.15, 0.56, 1
+    annotationOffsetZ.alpha_highlight = 1
+    
+
+def createAnnotationRotateGiz(pool,anno,mat,objIndex,idx):
     # Set Basis Matrix
-    idx = 0
     rotateGizScale = 0.5
-    for anno in annotationGen.annotations:
-        basisMatrix = Matrix.Translation(Vector((0,0,0)))
-        basisMatrix.translation = Vector(anno.gizLoc)
-        obj = bpy.context.selected_objects[objIndex]
-        mat = obj.matrix_world
-        objrot = mat.to_quaternion()
-        lineweight = 2
-        baseAlpha = 0.15
-
-        #Translate Op Gizmos
-        #X
-        annotationRotateX = group.gizmos.new("GIZMO_GT_move_3d")
-        annotationRotateX.use_draw_modal = True
-        opX = annotationRotateX.target_set_operator("measureit_arch.rotate_annotation")
-        opX.constrainAxis = (True,False,False)
-        opX.objIndex = objIndex
-        opX.idx = idx
-
-        XbasisMatrix = basisMatrix.to_3x3()
-        rot = Quaternion(Vector((0,1,0)),radians(90))
-        XbasisMatrix.rotate(rot)
-        XbasisMatrix.rotate(objrot)
-        XbasisMatrix.resize_4x4()
-        XbasisMatrix.translation = Vector(anno.gizLoc)
-        
-
-        annotationRotateX.matrix_basis = XbasisMatrix
-        annotationRotateX.scale_basis = rotateGizScale
-        annotationRotateX.line_width = lineweight
-
-        annotationRotateX.color = 0.96, 0.2, 0.31
-        annotationRotateX.alpha = baseAlpha
-
-        annotationRotateX.color_highlight = 0.96, 0.2, 0.31
-        annotationRotateX.alpha_highlight = 1
-
-        #Y
-        annotationRotateY = group.gizmos.new("GIZMO_GT_move_3d")
-        annotationRotateY.use_draw_modal = True
-        opY = annotationRotateY.target_set_operator("measureit_arch.rotate_annotation")
-        opY.constrainAxis = (False,True,False)
-        opY.objIndex = objIndex
-        opY.idx = idx
-
-        YbasisMatrix = basisMatrix.to_3x3()
-        rot = Quaternion(Vector((1,0,0)),radians(-90))
-        YbasisMatrix.rotate(rot)
-        YbasisMatrix.rotate(objrot)
-        YbasisMatrix.resize_4x4()
-        YbasisMatrix.translation = Vector(anno.gizLoc)
-
-        annotationRotateY.matrix_basis = YbasisMatrix
-        annotationRotateY.scale_basis = rotateGizScale
-        annotationRotateY.line_width = lineweight
-
-        annotationRotateY.color = 0.54, 0.86, 0
-        annotationRotateY.alpha = baseAlpha
-
-        annotationRotateY.color_highlight = 0.54, 0.86, 0
-        annotationRotateY.alpha_highlight = 1
-
-        #Z
-        annotationRotateZ = group.gizmos.new("GIZMO_GT_move_3d")
-        annotationRotateZ.use_draw_modal = True
-        opZ = annotationRotateZ.target_set_operator("measureit_arch.rotate_annotation")
-        opZ.constrainAxis = (False,False,True)
-        opZ.objIndex = objIndex
-        opZ.idx = idx
-
-        ZbasisMatrix = basisMatrix.to_3x3()
-        ZbasisMatrix.rotate(objrot)
-        ZbasisMatrix.resize_4x4()
-        ZbasisMatrix.translation = Vector(anno.gizLoc)
-
-        annotationRotateZ.matrix_basis = ZbasisMatrix
-        annotationRotateZ.scale_basis = rotateGizScale
-        annotationRotateZ.line_width = lineweight
-
-        annotationRotateZ.color = 0.15, 0.56, 1
-        annotationRotateZ.alpha = baseAlpha
-
-        annotationRotateZ.color_highlight = 0.15, 0.56, 1
-        annotationRotateZ.alpha_highlight = 1
-        
-        #add to group
-
-        group.X_widget = annotationRotateX
-        group.Y_widget = annotationRotateY
-        group.Z_widget = annotationRotateZ
-        idx += 1
+    basisMatrix = Matrix.Translation(Vector((0,0,0)))
+    basisMatrix.translation = Vector(anno.gizLoc)
+    objrot = mat.to_quaternion()
+    lineweight = 2
+    baseAlpha = 0.15
+
+    #Translate Op Gizmos
+    #X
+    annotationRotateX = pool.acquire("GIZMO_GT_move_3d", 'ANNO_ROTATE')
+    annotationRotateX.use_draw_modal = True
+    opX = annotationRotateX.target_set_operator("measureit_arch.rotate_annotation")
+    opX.constrainAxis = (True,False,False)
+    opX.objIndex = objIndex
+    opX.idx = idx
+
+    XbasisMatrix = basisMatrix.to_3x3()
+    rot = Quaternion(Vector((0,1,0)),radians(90))
+    XbasisMatrix.rotate(rot)
+    XbasisMatrix.rotate(objrot)
+    XbasisMatrix.resize_4x4()
+    XbasisMatrix.translation = Vector(anno.gizLoc)
+    
 
+    annotationRotateX.matrix_basis = XbasisMatrix
+    annotationRotateX.scale_basis = rotateGizScale
+    annotationRotateX.line_width = lineweight
+
+    annotationRotateX.color = 0.96, 0.2, 0.31
+    annotationRotateX.alpha = baseAlpha
+
+    annotationRotateX.color_highlight = 0.96, 0.2, 0.31
+    annotationRotateX.alpha_highlight = 1
+
+    #Y
+    annotationRotateY = pool.acquire("GIZMO_GT_move_3d", 'ANNO_ROTATE')
+    annotationRotateY.use_draw_modal = True
+    opY = annotationRotateY.target_set_operator("measureit_arch.rotate_annotation")
+    opY.constrainAxis = (False,True,False)
+    opY.objIndex = objIndex
+    opY.idx = idx
+
+    YbasisMatrix = basisMatrix.to_3x3()
+    rot = Quaternion(Vector((1,0,0)),radians(-90))
+    YbasisMatrix.rotate(rot)
+    YbasisMatrix.rotate(objrot)
+    YbasisMatrix.resize_4x4()
+    YbasisMatrix.translation = Vector(anno.gizLoc)
+
+    annotationRotateY.matrix_basis = YbasisMatrix
+    annotationRotateY.scale_basis = rotateGizScale
+    annotationRotateY.line_width = lineweight
+
+    annotationRotateY.color = 0.54, 0.86, 0
+    annotationRotateY.alpha = baseAlpha
+
+    annotationRotateY.color_highlight = 0.54, 0.86, 0
+    annotationRotateY.alpha_highlight = 1
+
+    #Z
+    annotationRotateZ = pool.acquire("GIZMO_GT_move_3d", 'ANNO_ROTATE')
+    annotationRotateZ.use_draw_modal = True
+    opZ = annotationRotateZ.target_set_operator("measureit_arch.rotate_annotation")
+    opZ.constrainAxis = (False,False,True)
+    opZ.objIndex = objIndex
+    opZ.idx = idx
+
+    ZbasisMatrix = basisMatrix.to_3x3()
+    ZbasisMatrix.rotate(objrot)
+    ZbasisMatrix.resize_4x4()
+    ZbasisMatrix.translation = Vector(anno.gizLoc)
+
+    annotationRotateZ.matrix_basis = ZbasisMatrix
+    annotationRotateZ.scale_basis = rotateGizScale
+    annotationRotateZ.line_width = lineweight
+
+    annotationRotateZ.color = 0.15, 0.56, 1
+    annotationRotateZ.alpha = baseAlpha
+
+    annotationRotateZ.color_highlight = 0.15, 0.56, 1
+    annotationRotateZ.alpha_highlight = 1
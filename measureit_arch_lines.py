@@ -25,7 +25,6 @@
 # ----------------------------------------------------------
 
 import bpy
-import bmesh
 import bgl
 import gpu
 from bmesh import from_edit_mesh
@@ -196,6 +195,7 @@ class AddLineButton(Operator):
 
                 lGroup['lineBuffer'] = mylist
                 lineGen.line_num += 1
+                invalidate_line_groups(mainobject)
 
 
                 # redraw
@@ -478,16 +478,21 @@ class AddToLineGroup(Operator):
                         lineGen = mainobject.LineGenerator[0]
                         lGroup = lineGen.line_groups[self.tag]
                         
+                        # Only add edges that aren't in the group yet
                         bufferList = lGroup['lineBuffer'].to_list()
+                        lineKeys = get_edge_keys(bufferList)
                         for x in range (0, len(mylist)-1, 2):
-                            #if lineExists(lGroup,mylist[x],mylist[x+1]) is False:
-                            bufferList.append(mylist[x])
-                            bufferList.append(mylist[x+1])
-                            lGroup.numLines +=1
+                            key = get_edge_key(mylist[x],mylist[x+1])
+                            if key not in lineKeys:
+                                lineKeys.add(key)
+                                bufferList.append(mylist[x])
+                                bufferList.append(mylist[x+1])
+                                lGroup.numLines +=1
                     
 
                         # redraw
                         lGroup['lineBuffer'] = bufferList
+                        invalidate_line_groups(mainobject)
                         context.area.tag_redraw()
                         return {'FINISHED'}
 
@@ -551,41 +556,16 @@ class AddLineByProperty(Operator):
                         lGroup.lineColor = sceneProps.default_color
                         lGroup.name = 'Line ' + str(len(lineGen.line_groups))
                         angle = self.creaseAngle
-                        vertsToAdd=[]
-                        
-                        # Create a Bmesh Instance from the selected object
-                        bm = bmesh.new()
-                        bm.from_mesh(obj.data)
-                        bm.edges.ensure_lookup_table()
-
-                        # For each edge get its linked faces and vertex indicies
-                        for edge in bm.edges:
-                            linked_faces = edge.link_faces
-                            pointA = edge.verts[0].index
-                            pointB = edge.verts[1].index
-                            if len(linked_faces) == 2:
-                                normalA = Vector(linked_faces[0].normal).normalized()
-                                normalB = Vector(linked_faces[1].normal).normalized()
-                                dotProd = (normalA.dot(normalB))
-                                
-                                if dotProd >= -1 and dotProd <= 1:
-                                    creaseAngle = math.acos(dotProd)
-                                    if creaseAngle > angle:
-                                        vertsToAdd.append(pointA)
-                                        vertsToAdd.append(pointB)
-
-                            # Any edge with greater or less 
-                            # than 2 linked faces is non manifold
-                            else:
-                                if self.includeNonManifold: 
-                                    vertsToAdd.append(pointA)
-                                    vertsToAdd.append(pointB)
 
-                        # Free the Bmesh instance and add the 
-                        # vertex indicies to the line groups line buffer            
-                        bm.free()
+                        # Get the edges sharper than the crease angle
+                        topology = get_mesh_topology(obj)
+                        creaseMask = get_crease_mask(topology, angle, self.includeNonManifold)
+
+                        # Add the vertex indicies to the line groups line buffer
+                        vertsToAdd = topology['edgeVerts'][creaseMask].ravel().tolist()
                         lGroup['lineBuffer'] = vertsToAdd
                         lineGen.line_num += 1
+                        invalidate_line_groups(obj)
                     return {'FINISHED'}
     
     def invoke(self, context, event):
@@ -646,21 +626,20 @@ class RemoveFromLineGroup(Operator):
 
                         lineGen = mainobject.LineGenerator[0]
                         lGroup = lineGen.line_groups[self.tag]
-                        idx = 0
-                        bufferList = lGroup['lineBuffer'].to_list()
-                        for x in range (0, len(lGroup['lineBuffer']), 2):
-                            pointA = lGroup['lineBuffer'][x]
-                            pointB = lGroup['lineBuffer'][x+1]
-                            for y in range (0, len(mylist), 2):
-                                if sLineExists(pointA,pointB,mylist[y],mylist[y+1]):
-                                    #print("checked Pair: (" + str(mylist[y]) +   "," + str(mylist[y+1]) + ")" )
-                                    #print("A:" + str(pointA) + "B:" + str(pointB) ) 
-                                    del bufferList[x] 
-                                    del bufferList[x] 
-                                    lGroup.numLines -= 1 
+                        # Keep every edge that isn't selected
+                        removeKeys = get_edge_keys(mylist)
+                        oldBuffer = lGroup['lineBuffer'].to_list()
+                        bufferList = []
+                        for x in range (0, len(oldBuffer)-1, 2):
+                            if get_edge_key(oldBuffer[x],oldBuffer[x+1]) in removeKeys:
+                                lGroup.numLines -= 1
+                            else:
+                                bufferList.append(oldBuffer[x])
+                                bufferList.append(oldBuffer[x+1])
 
                         # redraw      
                         lGroup['lineBuffer'] = bufferList
+                        invalidate_line_groups(mainobject)
                         context.area.tag_redraw()
                         return {'FINISHED'}
 
@@ -694,20 +673,15 @@ class RemoveFromLineGroup(Operator):
 
 #         return {'FINISHED'}
 
-def sLineExists(pointA,pointB,a,b):
-    if (pointA == a and pointB == b):
-        return True
-    elif (pointA == b and pointB == a):
-        return True
-    else:
-        return False
-
-def lineExists(lGroup,a,b):
-    for x in range (0, len(lGroup['lineBuffer']), 2):
-        pointA = lGroup['lineBuffer'][x]
-        pointB = lGroup['lineBuffer'][x+1]
-        if (pointA == a and pointB == b):
-            return True
-        elif (pointA == b and pointB == a):
-            return True
-    return False
+# --------------------------------------------------------------------
+# Line groups store undirected edges, (a, b) and (b, a) are the same
+# line. Edges are compared on a sorted index pair so that lookups in a
+# set are constant time.
+# --------------------------------------------------------------------
+def get_edge_key(a,b):
+    if a > b:
+        return (b, a)
+    return (a, b)
+
+def get_edge_keys(lineBuffer):
+    return {get_edge_key(lineBuffer[x],lineBuffer[x+1]) for x in range(0, len(lineBuffer)-1, 2)}
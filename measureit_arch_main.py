@@ -41,8 +41,7 @@ from bpy.app.handlers import persistent
 from .measureit_arch_geometry import clear_batches, draw_annotation, draw_arcDimension, draw_areaDimension, \
                         draw_alignedDimension, draw_line_group, draw_angleDimension, update_text, draw_axisDimension, draw_boundsDimension, \
                         get_mesh_vertices, printTime, draw_sheet_views, preview_dual, get_view, draw_hatches, draw3d_loop, get_rv3d
-
-draw_instanced = True
+from .measureit_arch_baseclass import get_style_props, textUpdateQueue
 
 # ------------------------------------------------------
 # Handler to detect new Blend load
@@ -359,173 +358,47 @@ def draw_main(context):
 
         rv3d = context.space_data.region_quadviews[i]
 
-    scene = bpy.context.scene
-    sceneProps = scene.MeasureItArchProps
-
-    # Get visible collections
-    viewLayer = bpy.context.view_layer
-
-    # Display selected or all
-    if sceneProps.show_all is False:
-        objlist = context.selected_objects
-    else:
-        objlist = context.view_layer.objects
-
     # Enable GL drawing
     bgl.glEnable(bgl.GL_BLEND)
     # ---------------------------------------
-    # Generate all OpenGL calls for measures
+    # Redraw the text of changed items
     # ---------------------------------------
-    text_update_loop(context,objlist)
+    process_text_queue(context)
 
-    view = get_view()
-    if view != None and view.titleBlock != "":
-        camera = view.camera
-        titleblockScene = bpy.data.scenes[view.titleBlock]
-        objlist = titleblockScene.objects
-        text_update_loop(context,objlist)
-
-    # Reset Style & Scene Update Flags
-    StyleGen = context.scene.StyleGenerator
-    dimStyles = StyleGen.alignedDimensions
-    annoStyles = StyleGen.annotations
-    for style in annoStyles:
-        style.text_updated = False
-    for style in dimStyles:
-        style.text_updated = False
-    
-    sceneProps = scene.MeasureItArchProps
-    sceneProps.text_updated = False
-
-def text_update_loop(context,objlist):
-
-    for myobj in objlist:
-        if myobj.hide_get() is False:
-            if 'DimensionGenerator' in myobj:
-                DimGen = myobj.DimensionGenerator[0]
-                for alignedDim in DimGen.alignedDimensions:
-                    
-                    alignedDimProps = alignedDim
-                    if alignedDim.uses_style:
-                        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if alignedDimStyle.name == alignedDim.style:
-                                alignedDimProps= alignedDimStyle
-
-                    update_text(textobj=alignedDim,props=alignedDimProps,context=context)
-                
-                for angleDim in DimGen.angleDimensions: 
-                    dimProps = angleDim
-                    if angleDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == angleDim.style:
-                                dimProps= dimStyle
-                    update_text(textobj=angleDim,props=dimProps,context=context)
-                
-                for axisDim in DimGen.axisDimensions: 
-                    dimProps = axisDim
-                    if axisDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == axisDim.style:
-                                dimProps= dimStyle
-                    update_text(textobj=axisDim,props=dimProps,context=context)
-
-                for boundsDim in DimGen.boundsDimensions: 
-                    dimProps = boundsDim
-                    if boundsDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == boundsDim.style:
-                                dimProps= dimStyle
-                    update_text(textobj=boundsDim,props=dimProps,context=context)
-                
-                for arcDim in DimGen.arcDimensions: 
-                    dimProps = arcDim
-                    if arcDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == arcDim.style:
-                                dimProps= dimStyle
-                    update_text(textobj=arcDim,props=dimProps,context=context)
-
-                for areaDim in DimGen.areaDimensions: 
-                    dimProps = areaDim
-                    if areaDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == areaDim.style:
-                                dimProps= dimStyle
-                    update_text(textobj=areaDim,props=dimProps,context=context)
-        
-            if 'AnnotationGenerator' in myobj:
-                annotationGen = myobj.AnnotationGenerator[0]
-                for annotation in annotationGen.annotations:
-                    annotationProps = annotation
-                    if annotation.uses_style:
-                        for annotationStyle in context.scene.StyleGenerator.annotations:
-                            if annotationStyle.name == annotation.style:
-                                annotationProps = annotationStyle
-                    if annotation.annotationTextSource is not '':
-                        try:
-                            if len(annotation.textFields)>1:
-                                annotation.textFields[0].text = annotation.annotationTextSource
-                                annotation.textFields[1].text = str(myobj[annotation.annotationTextSource])
-                            else:  
-                                 annotation.textFields[0].text = str(myobj[annotation.annotationTextSource])
-
-                        except:
-                            pr = scene.measureit_arch_gl_precision
-                            fmt = "%1." + str(pr) + "f"
-                            annotation.text = fmt % myobj[annotation.annotationTextSource]
-                    update_text(textobj=annotation,props=annotationProps,context=context)
-
-                # Draw Instanced Objects
-
-    if draw_instanced:
-        deps = bpy.context.view_layer.depsgraph
-        for obj_int in deps.object_instances:
-            if obj_int.is_instance:
-                myobj = obj_int.object
-
-                if 'DimensionGenerator' in myobj:
-                    DimGen = myobj.DimensionGenerator[0]
-                    for alignedDim in DimGen.alignedDimensions:
-                        
-                        alignedDimProps = alignedDim
-                        if alignedDim.uses_style:
-                            for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-                                if alignedDimStyle.name == alignedDim.style:
-                                    alignedDimProps= alignedDimStyle
-
-                        update_text(textobj=alignedDim,props=alignedDimProps,context=context)
-                    
-                    for angleDim in DimGen.angleDimensions: 
-                        dimProps = angleDim
-                        if angleDim.uses_style:
-                            for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                                if dimStyle.name == angleDim.style:
-                                    dimProps= dimStyle
-                        update_text(textobj=angleDim,props=dimProps,context=context)
-                    
-                    for axisDim in DimGen.axisDimensions: 
-                        dimProps = axisDim
-                        if axisDim.uses_style:
-                            for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                                if dimStyle.name == axisDim.style:
-                                    dimProps= dimStyle
-                        update_text(textobj=axisDim,props=dimProps,context=context)
-
-                    for boundsDim in DimGen.boundsDimensions: 
-                        dimProps = boundsDim
-                        if boundsDim.uses_style:
-                            for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                                if dimStyle.name == boundsDim.style:
-                                    dimProps= dimStyle
-                        update_text(textobj=boundsDim,props=dimProps,context=context)
-                    
-                    for arcDim in DimGen.arcDimensions: 
-                        dimProps = arcDim
-                        if arcDim.uses_style:
-                            for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                                if dimStyle.name == arcDim.style:
-                                    dimProps= dimStyle
-                        update_text(textobj=arcDim,props=dimProps,context=context)
+
+# -------------------------------------------------------------
+# Redraw the text of the items queued by queue_text_update
+# -------------------------------------------------------------
+def process_text_queue(context):
+    queued = list(textUpdateQueue)
+    textUpdateQueue.clear()
+
+    for idType, idName, path in queued:
+        if idType == 'OBJECT':
+            idData = bpy.data.objects.get(idName)
+        elif idType == 'SCENE':
+            idData = bpy.data.scenes.get(idName)
+        else:
+            continue
+        if idData is None:
+            continue
+
+        # The item may have been removed since it was queued
+        try:
+            item = idData.path_resolve(path)
+        except ValueError:
+            continue
+
+        # Styles and scene settings are part of the text atlas keys, the
+        # labels using them are redrawn the next time they're drawn
+        if not hasattr(item, 'textFields') or item.is_style:
+            item.text_updated = False
+            continue
+
+        collectionName = 'alignedDimensions'
+        if '.annotations[' in path:
+            collectionName = 'annotations'
+        update_text(textobj=item, props=get_style_props(context, item, collectionName), context=context)
 
 
 def draw_main_3d (context):
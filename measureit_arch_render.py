@@ -28,11 +28,11 @@ import bpy
 import bgl
 import gpu
 import os
+import tempfile
 
 import blf
 from os import path, remove
 from sys import exc_info
-import svgwrite
 
 import bpy_extras.image_utils as img_utils
 
@@ -40,14 +40,21 @@ import bpy_extras.object_utils as object_utils
 # noinspection PyUnresolvedReferences
 from bpy_extras import view3d_utils
 from math import ceil
+from mathutils import Matrix
 
 from gpu_extras.presets import draw_texture_2d
 from bgl import *
 import numpy as np
 import bmesh
 from .measureit_arch_geometry import *
+from . import svg_shaders
+from . import svg_writer
+from . import svg_export
+from .png_writer import write_png, PNGWriter
+from . import svg_occlusion
 from .measureit_arch_main import draw_main, draw_main_3d, draw_titleblock
 from bpy.props import IntProperty
+from bpy.app.handlers import persistent
 from bpy.types import PropertyGroup, Panel, Object, Operator, SpaceView3D
 depthOnlyshader = gpu.types.GPUShader(Base_Shader_3D.vertex_shader, DepthOnlyFrag.fragment_shader)
 
@@ -87,12 +94,21 @@ class MeasureitArchRenderPanel(Panel):
         col.operator("measureit_arch.render_image", icon='RENDER_STILL', text= "MeasureIt_ARCH Image")
         col.operator("measureit_arch.render_anim", icon='RENDER_ANIMATION', text= "MeasureIt_ARCH Animation")
         col.operator("measureit_arch.rendersvgbutton", icon='DOCUMENTS', text= "MeasureIt_ARCH Vector")
+        col.operator("measureit_arch.batch_export", icon='RENDERLAYERS', text= "MeasureIt_ARCH Export Views")
         if sceneProps.enable_experimental:
             col = layout.column()
             col.prop(sceneProps, "vector_depthtest", text="Use Vector DepthTest")
         col = layout.column()
         
         col.prop(sceneProps, "embed_scene_render", text="Embed Scene Render")
+        col.prop(sceneProps, "svg_pretty_print", text="Indent SVG")
+        col.prop(sceneProps, "svg_merge_paths", text="Merge SVG Paths")
+        if sceneProps.svg_merge_paths:
+            col.prop(sceneProps, "svg_precision", text="SVG Precision")
+        col.prop(sceneProps, "write_png_direct", text="Write PNG Directly")
+        col.prop(sceneProps, "use_tiled_render", text="Tiled Render")
+        if sceneProps.use_tiled_render:
+            col.prop(sceneProps, "render_tile_size", text="Tile Size")
         #col.prop(sceneProps, "measureit_arch_render", text="Save Render to Output")
 
 
@@ -256,68 +272,219 @@ def render_main(self, context, animation=False):
     height = int(scene.render.resolution_y * render_scale)
 
 
-    # Draw all lines in Offsecreen
-    renderoffscreen = gpu.types.GPUOffScreen(width, height)
-    
     view_matrix_3d = scene.camera.matrix_world.inverted()
     projection_matrix = scene.camera.calc_matrix_camera(context.view_layer.depsgraph, x=width, y=height)
 
-    set_OpenGL_Settings(True)
-    with renderoffscreen.bind():
-
-        # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
-        bgl.glClear(bgl.GL_DEPTH_BUFFER_BIT)
-        bgl.glClearDepth(clipdepth) 
+    if use_tiles(sceneProps, width, height):
+        render_tiled(self, context, view_matrix_3d, projection_matrix, width, height)
+        sceneProps.is_render_draw = False
+        return True, None
 
-        gpu.matrix.reset()
-        gpu.matrix.load_matrix(view_matrix_3d)
-        gpu.matrix.load_projection_matrix(projection_matrix)
-
-
-        # Draw Scene for the depth buffer
-        draw_scene(self, context, projection_matrix) 
-
-        
-        # Clear Color Buffer, we only need the depth info
-        bgl.glClearColor(0,0,0,0)
-        bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
+    # Draw all lines in Offsecreen
+    renderoffscreen = gpu.types.GPUOffScreen(width, height)
 
-        # -----------------------------
-        # Loop to draw all objects
-        # -----------------------------
-        draw3d_loop(context,objlist)
-        draw_titleblock(context)
+    set_OpenGL_Settings(True)
+    with renderoffscreen.bind():
+        draw_render_pass(self, context, objlist, view_matrix_3d, projection_matrix, clipdepth)
         
         buffer = bgl.Buffer(bgl.GL_BYTE, width * height * 4)
         bgl.glReadBuffer(bgl.GL_COLOR_ATTACHMENT0)
         bgl.glReadPixels(0, 0, width, height, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, buffer)
     
 
+    renderoffscreen.free()
+    pixels = buffer_to_array(buffer, np.uint8, (height, width, 4))
+
     # -----------------------------
     # Create image
     # -----------------------------
-    image_name = "measureit_arch_output"
-    if image_name not in bpy.data.images:
-        image = bpy.data.images.new(image_name, width, height)
+    image = None
+    if not sceneProps.write_png_direct:
+        image_name = "measureit_arch_output"
+        if image_name not in bpy.data.images:
+            image = bpy.data.images.new(image_name, width, height)
 
-    image = bpy.data.images[image_name]
+        image = bpy.data.images[image_name]
 
-    image.scale(width, height)
-    image.pixels = [v / 255 for v in buffer]
+        image.scale(width, height)
+        set_image_pixels(image, pixels)
 
-    renderoffscreen.free()
     # Saves image
-    if image is not None and animation is True:
-        ren_path = bpy.context.scene.render.filepath
-        filename = "mit_frame"
-        ftxt = "%04d" % scene.frame_current
-        outpath = (ren_path + filename + ftxt + '.png')
-        save_image(self, outpath, image)
+    if animation is True or image is None:
+        outpath = get_frame_outpath(scene)
+        if image is None:
+            write_png(outpath, pixels)
+            print("MeasureIt_ARCH: Image " + outpath + " saved")
+        else:
+            save_image(self, outpath, image)
 
     # restore default value
     set_OpenGL_Settings(False)
     sceneProps.is_render_draw = False
     return True, buffer
+def get_frame_outpath(scene):
+    ren_path = bpy.path.abspath(scene.render.filepath)
+    filename = "mit_frame"
+    ftxt = "%04d" % scene.frame_current
+    return ren_path + filename + ftxt + '.png'
+
+# -------------------------------------
+# Draw the depth prepass & all MeasureIt_ARCH items
+# into the bound offscreen
+# -------------------------------------
+def draw_render_pass(self, context, objlist, view_matrix_3d, projection_matrix, clipdepth):
+    # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
+    bgl.glClear(bgl.GL_DEPTH_BUFFER_BIT)
+    bgl.glClearDepth(clipdepth) 
+
+    gpu.matrix.reset()
+    gpu.matrix.load_matrix(view_matrix_3d)
+    gpu.matrix.load_projection_matrix(projection_matrix)
+
+
+    # Draw Scene for the depth buffer
+    draw_scene(self, context, projection_matrix) 
+
+    
+    # Clear Color Buffer, we only need the depth info
+    bgl.glClearColor(0,0,0,0)
+    bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
+
+    # -----------------------------
+    # Loop to draw all objects
+    # -----------------------------
+    draw3d_loop(context,objlist)
+    draw_titleblock(context)
+
+# -------------------------------------
+# Tiled rendering
+# Large sheets are split into tiles, each tile is drawn with a
+# sub-projection of the camera, so GPU & host memory only depend on
+# the tile size.
+# -------------------------------------
+def use_tiles(sceneProps, width, height):
+    tileSize = sceneProps.render_tile_size
+    return sceneProps.use_tiled_render and (width > tileSize or height > tileSize)
+
+# Rows of (x, y, width, height) tiles, top row first,
+# y is measured from the bottom like the GL framebuffer
+def get_tiles(width, height, tileSize):
+    rows = []
+    for top in range(height, 0, -tileSize):
+        y = max(top - tileSize, 0)
+        rows.append([(x, y, min(tileSize, width - x), top - y) for x in range(0, width, tileSize)])
+    return rows
+
+# Map the tile's part of the camera frustum onto the whole clip space
+def get_tile_projection(projection_matrix, width, height, x, y, tileWidth, tileHeight):
+    scaleX = width / tileWidth
+    scaleY = height / tileHeight
+    offsetX = (2 * x + tileWidth - width) / tileWidth
+    offsetY = (2 * y + tileHeight - height) / tileHeight
+    tileMatrix = Matrix((
+        (scaleX, 0, 0, -offsetX),
+        (0, scaleY, 0, -offsetY),
+        (0, 0, 1, 0),
+        (0, 0, 0, 1)))
+    return tileMatrix @ projection_matrix
+
+# Line widths are given relative to the viewport, scale it down to
+# the tile so that tiles match an untiled render
+def set_tile_viewport(scene, width, height, tileWidth, tileHeight):
+    set_render_viewport((tileWidth * scene.render.resolution_x / width,
+                         tileHeight * scene.render.resolution_y / height))
+
+def get_tile_offscreen(offscreens, tileWidth, tileHeight):
+    offscreen = offscreens.get((tileWidth, tileHeight))
+    if offscreen is None:
+        offscreen = gpu.types.GPUOffScreen(tileWidth, tileHeight)
+        offscreens[(tileWidth, tileHeight)] = offscreen
+    return offscreen
+
+def render_tiled(self, context, view_matrix_3d, projection_matrix, width, height):
+    scene = context.scene
+    tileSize = scene.MeasureItArchProps.render_tile_size
+    clipdepth = scene.camera.data.clip_end
+    objlist = context.view_layer.objects
+
+    outpath = get_frame_outpath(scene)
+    writer = PNGWriter(outpath, width, height)
+    offscreens = {}
+
+    set_OpenGL_Settings(True)
+    try:
+        for row in get_tiles(width, height, tileSize):
+            # One strip of tiles is kept, the PNG is written a strip at a time
+            rowHeight = row[0][3]
+            strip = np.empty((rowHeight, width, 4), dtype=np.uint8)
+
+            for x, y, tileWidth, tileHeight in row:
+                print("MeasureIt_ARCH: Rendering tile " + str(x) + ", " + str(y))
+                tileProjection = get_tile_projection(projection_matrix, width, height, x, y, tileWidth, tileHeight)
+                set_tile_viewport(scene, width, height, tileWidth, tileHeight)
+
+                offscreen = get_tile_offscreen(offscreens, tileWidth, tileHeight)
+                with offscreen.bind():
+                    draw_render_pass(self, context, objlist, view_matrix_3d, tileProjection, clipdepth)
+
+                    buffer = bgl.Buffer(bgl.GL_BYTE, tileWidth * tileHeight * 4)
+                    bgl.glReadBuffer(bgl.GL_COLOR_ATTACHMENT0)
+                    bgl.glReadPixels(0, 0, tileWidth, tileHeight, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, buffer)
+
+                strip[:, x:x + tileWidth] = buffer_to_array(buffer, np.uint8, (tileHeight, tileWidth, 4))
+
+            writer.write_rows(strip[::-1])
+    finally:
+        writer.close()
+        set_render_viewport(None)
+        for offscreen in offscreens.values():
+            offscreen.free()
+        set_OpenGL_Settings(False)
+
+    print("MeasureIt_ARCH: Image " + outpath + " saved")
+
+# Depth buffer of the vector render, read back tile by tile into a
+# memory mapped array of linear depth values
+def render_depth_tiled(self, context, view_matrix_3d, projection_matrix, width, height):
+    scene = context.scene
+    camera = scene.camera.data
+    tileSize = scene.MeasureItArchProps.render_tile_size
+
+    depth = np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode='w+', shape=(height, width))
+    offscreens = {}
+
+    set_OpenGL_Settings(True)
+    try:
+        for row in get_tiles(width, height, tileSize):
+            for x, y, tileWidth, tileHeight in row:
+                tileProjection = get_tile_projection(projection_matrix, width, height, x, y, tileWidth, tileHeight)
+                offscreen = get_tile_offscreen(offscreens, tileWidth, tileHeight)
+                with offscreen.bind():
+                    bgl.glClear(bgl.GL_DEPTH_BUFFER_BIT)
+                    bgl.glClearDepth(camera.clip_end)
+                    bgl.glEnable(bgl.GL_DEPTH_TEST)
+                    bgl.glDepthFunc(bgl.GL_LEQUAL)
+
+                    gpu.matrix.reset()
+                    gpu.matrix.load_matrix(view_matrix_3d)
+                    gpu.matrix.load_projection_matrix(tileProjection)
+
+                    draw_scene(self, context, tileProjection)
+
+                    buffer = bgl.Buffer(bgl.GL_FLOAT, tileWidth * tileHeight)
+                    bgl.glReadBuffer(bgl.GL_BACK)
+                    bgl.glReadPixels(0, 0, tileWidth, tileHeight, bgl.GL_DEPTH_COMPONENT, bgl.GL_FLOAT, buffer)
+
+                zValues = buffer_to_array(buffer, np.float32, (tileHeight, tileWidth))
+                depth[y:y + tileHeight, x:x + tileWidth] = svg_occlusion.linearize_depth(
+                    zValues, camera.type, camera.clip_start, camera.clip_end)
+    finally:
+        for offscreen in offscreens.values():
+            offscreen.free()
+        set_OpenGL_Settings(False)
+
+    svg_shaders.set_linear_depth_buffer(depth)
+
 # -------------------------------------
 # Save image to file
 # -------------------------------------
@@ -350,36 +517,94 @@ def save_image(self, filepath, myimage):
 # Draw Scene Geometry for Depth Buffer
 #--------------------------------------
 
+# --------------------------------------------------------------------
+# Depth prepass batches
+# Batches hold object space positions and are shared by every instance
+# of the same mesh, the object transform is applied through the matrix
+# stack. Entries are reused across renders & animation frames until the
+# geometry changes.
+# --------------------------------------------------------------------
+sceneBatchCache = {}
+
+
+@persistent
+def scene_batch_load_handler(dummy):
+    sceneBatchCache.clear()
+
+
+bpy.app.handlers.load_post.append(scene_batch_load_handler)
+
+
+def get_scene_batch_key(obj):
+    original = obj.original
+    deformed = len(original.modifiers) > 0 or original.data.shape_keys is not None
+
+    # Evaluated meshes belong to their object, plain ones can be shared
+    # and only depend on the mesh revision
+    if deformed:
+        key = ('EVAL', original.name)
+        revision = get_geometry_revision(original)
+    else:
+        key = ('MESH', original.data.name)
+        revision = geometryRevisions.get(original.data.name, 0)
+
+    frame = None
+    if deformed or original.data.animation_data is not None:
+        frame = bpy.context.scene.frame_current
+
+    state = (revision, frame,
+             len(obj.data.vertices), len(obj.data.polygons))
+    return key, state
+
+
+def get_scene_batch(obj, deps):
+    key, state = get_scene_batch_key(obj)
+    entry = sceneBatchCache.get(key)
+    if entry is not None and entry['state'] == state:
+        entry['used'] = True
+        return entry['batch']
+
+    mesh = obj.to_mesh(preserve_all_data_layers=True, depsgraph=deps)
+    mesh.calc_loop_triangles()
+
+    vertices = get_vertex_coords(mesh.vertices)
+    indices = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', indices)
+    obj.to_mesh_clear()
+
+    batch = None
+    if len(indices) > 0:
+        batch = batch_for_shader(depthOnlyshader, 'TRIS', {"pos": vertices}, indices=indices.reshape(-1, 3))
+        batch.program_set(depthOnlyshader)
+
+    sceneBatchCache[key] = {'state': state, 'batch': batch, 'used': True}
+    return batch
+
+
 def draw_scene(self, context, projection_matrix):
 
     set_OpenGL_Settings(True)
+    for entry in sceneBatchCache.values():
+        entry['used'] = False
+
     # Get List of Mesh Objects
     deps = bpy.context.view_layer.depsgraph
     for obj_int in deps.object_instances:
         obj = obj_int.object
         if obj.type == 'MESH' and obj.hide_render == False :
+            batch = get_scene_batch(obj, deps)
+            if batch is None:
+                continue
 
-            mat = obj_int.matrix_world
-            obj_eval = obj.evaluated_get(deps)
-            mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=bpy.context.view_layer.depsgraph)
-            mesh.calc_loop_triangles()
-            tris = mesh.loop_triangles
-            vertices = []
-            indices = []
-
-            for vert in mesh.vertices:
-                # Multipy vertex Position by Object Transform Matrix
-                vertices.append(mat @ vert.co)
+            # Object Transform is applied by the shader
+            with gpu.matrix.push_pop():
+                gpu.matrix.multiply_matrix(obj_int.matrix_world)
+                batch.draw()
+    gpu.shader.unbind()
 
-            for tri in tris:
-                indices.append(tri.vertices)      
-
-           
-            batch = batch_for_shader(depthOnlyshader, 'TRIS', {"pos": vertices}, indices=indices)
-            batch.program_set(depthOnlyshader)
-            batch.draw()
-            obj_eval.to_mesh_clear()
-            gpu.shader.unbind()
+    # Drop batches of meshes that are gone
+    for key in [key for key, entry in sceneBatchCache.items() if not entry['used']]:
+        del sceneBatchCache[key]
 
     #Write to Image for Debug
     debug=False
@@ -399,11 +624,16 @@ def draw_scene(self, context, projection_matrix):
 
         image = bpy.data.images[image_name]
         image.scale(width, height)
-        image.pixels = [v / 255 for v in buffer]
+        set_image_pixels(image, buffer_to_array(buffer, np.uint8, (height, width, 4)))
 
     set_OpenGL_Settings(False)
 
-def render_main_svg(self, context, animation=False):
+# --------------------------------------------------------------------
+# jobDir: record the drawing instead of writing it, the depth buffer
+#         is saved in jobDir and the export job for svg_export is
+#         returned
+# --------------------------------------------------------------------
+def render_main_svg(self, context, animation=False, jobDir=None):
 
     # Save old info
     scene = context.scene
@@ -423,14 +653,16 @@ def render_main_svg(self, context, animation=False):
     width = int(scene.render.resolution_x * render_scale)
     height = int(scene.render.resolution_y * render_scale)
     
-    offscreen = gpu.types.GPUOffScreen(width, height)
-    
     view_matrix_3d = scene.camera.matrix_world.inverted()
     projection_matrix = scene.camera.calc_matrix_camera(context.view_layer.depsgraph, x=width, y=height)
 
     # Render Depth Buffer
     print("Rendering Depth Buffer")
-    if sceneProps.vector_depthtest:
+    if sceneProps.vector_depthtest and use_tiles(sceneProps, width, height):
+        render_depth_tiled(self, context, view_matrix_3d, projection_matrix, width, height)
+
+    elif sceneProps.vector_depthtest:
+        offscreen = gpu.types.GPUOffScreen(width, height)
         with offscreen.bind():
             # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
             set_OpenGL_Settings(True)
@@ -450,9 +682,7 @@ def render_main_svg(self, context, animation=False):
             bgl.glReadBuffer(bgl.GL_BACK)
             bgl.glReadPixels(0, 0, width, height, bgl.GL_DEPTH_COMPONENT, bgl.GL_FLOAT, texture_buffer)
 
-            if 'depthbuffer' in sceneProps:
-                del sceneProps['depthbuffer']
-            sceneProps['depthbuffer'] = texture_buffer
+            svg_shaders.set_depth_buffer(texture_buffer, width, height, scene.camera.data)
         offscreen.free()
         set_OpenGL_Settings(False)
 
@@ -463,7 +693,8 @@ def render_main_svg(self, context, animation=False):
             image = bpy.data.images[imageName]
 
             image.scale(width, height)
-            image.pixels = [v for v in texture_buffer]
+            depth = buffer_to_array(texture_buffer, np.float32, (height, width, 1))
+            set_image_pixels(image, np.concatenate((depth, depth, depth, np.ones_like(depth)), axis=2))
 
 
 
@@ -485,11 +716,14 @@ def render_main_svg(self, context, animation=False):
     except:
         print('No View Present, using default resolution')
 
-    # Setup basic svg
-    svg = svgwrite.Drawing(
+    # Setup basic svg, elements are written to the file as they're drawn
+    drawingType = svg_writer.Drawing
+    if jobDir is not None:
+        drawingType = svg_export.SVGRecorder
+    svg = drawingType(
             outpath,
-            debug=False,
             size=('{}in'.format(paperWidth), '{}in'.format(paperHeight)),
+            pretty=sceneProps.svg_pretty_print,
             viewBox=('0 0 {} {}'.format(width,height)),
             id='root',
         )
@@ -516,13 +750,36 @@ def render_main_svg(self, context, animation=False):
     # -----------------------------
     # Loop to draw all objects
     # -----------------------------
-    draw3d_loop(context,objlist,svg=svg)
-    draw_titleblock(context,svg=svg)
-
- 
-
-    svg.save(pretty=True)
+    job = None
+    try:
+        draw3d_loop(context,objlist,svg=svg)
+        draw_titleblock(context,svg=svg)
+        if jobDir is not None:
+            job = get_svg_job(svg, scene, jobDir)
+    finally:
+        svg.save()
+        svg_shaders.set_depth_buffer(None)
     # restore default value
     sceneProps.is_render_draw = False
     sceneProps.is_vector_draw = False
+    if job is not None:
+        return job
     return True
+
+
+# --------------------------------------------------------------------
+# Snapshot a recorded drawing for export_drawing, the depth buffer is
+# written to an .npy file the worker maps back in
+# --------------------------------------------------------------------
+def get_svg_job(svg, scene, jobDir):
+    sceneProps = scene.MeasureItArchProps
+    viewMatrix, projectionMatrix, width, height = svg_shaders.get_camera_matrices(scene)
+
+    depthPath = None
+    if sceneProps.vector_depthtest and svg_shaders.depthBuffer is not None:
+        fd, depthPath = tempfile.mkstemp(suffix='.npy', dir=jobDir)
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, svg_shaders.depthBuffer)
+
+    return svg.get_job(viewMatrix, projectionMatrix, width, height, depthPath,
+                       sceneProps.svg_merge_paths, sceneProps.svg_precision)
@@ -37,7 +37,7 @@ from bpy.props import (
         PointerProperty
         )
 
-from .measureit_arch_baseclass import DeletePropButton
+from .measureit_arch_baseclass import DeletePropButton, invalidate_styles
 from .measureit_arch_dimensions import AlignedDimensionProperties, recalc_dimWrapper_index
 from .measureit_arch_annotations import AnnotationProperties
 from .measureit_arch_lines import LineProperties
@@ -60,6 +60,9 @@ def recalc_index(self,context):
             style.itemIndex = id_a
             id_a += 1
 
+    # Styles were added or removed
+    invalidate_styles()
+
 # A Wrapper Object so multiple MeasureIt_ARCH element
 # types can be shown in the same UI List
 
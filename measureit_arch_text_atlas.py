@@ -0,0 +1,227 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Text atlas, rendered labels are packed into a few shared
+# GPU textures and drawn with one batch per atlas page.
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+import bgl
+from gpu_extras.batch import batch_for_shader
+
+PAGE_SIZE = 2048
+PADDING = 4
+MAX_PAGES = 8
+
+# Downsampled levels kept for labels drawn small, labels are placed on
+# a grid of 2^MIP_LEVELS texels so the levels don't mix neighbours
+MIP_LEVELS = 2
+MIP_ALIGN = 1 << MIP_LEVELS
+
+
+def align_size(size):
+    return (size + MIP_ALIGN - 1) // MIP_ALIGN * MIP_ALIGN
+
+
+# --------------------------------------------------------------------
+# Shelf rectangle packer
+# Rectangles are placed left to right on horizontal shelves,
+# a new shelf is opened above the last one when a row is full
+# --------------------------------------------------------------------
+class ShelfPacker():
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.shelves = []  # [y, height, x]
+        self.top = 0
+
+    def allocate(self, width, height):
+        if width > self.width or height > self.height:
+            return None
+
+        # Pick the lowest fitting shelf that wastes the least height
+        best = None
+        for shelf in self.shelves:
+            if shelf[1] >= height and self.width - shelf[2] >= width:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+
+        if best is None:
+            if self.top + height > self.height:
+                return None
+            best = [self.top, height, 0]
+            self.shelves.append(best)
+            self.top += height
+
+        x = best[2]
+        best[2] += width
+        return x, best[0]
+
+
+class AtlasPage():
+
+    def __init__(self, size):
+        self.size = size
+        self.packer = ShelfPacker(size, size)
+        self.lastUsed = 0
+        self.keys = set()
+        self.quads = []
+        self.texture = None
+        self.mipsDirty = False
+
+    def get_texture(self):
+        if self.texture is None:
+            texArray = bgl.Buffer(bgl.GL_INT, [1])
+            bgl.glGenTextures(1, texArray)
+            self.texture = texArray[0]
+
+            bgl.glActiveTexture(bgl.GL_TEXTURE0)
+            bgl.glBindTexture(bgl.GL_TEXTURE_2D, self.texture)
+            bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_WRAP_S, bgl.GL_CLAMP_TO_EDGE)
+            bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_WRAP_T, bgl.GL_CLAMP_TO_EDGE)
+            bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MIN_FILTER, bgl.GL_LINEAR_MIPMAP_LINEAR)
+            bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MAG_FILTER, bgl.GL_LINEAR)
+            bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MAX_LEVEL, MIP_LEVELS)
+
+            # Start from a fully transparent page
+            empty = bgl.Buffer(bgl.GL_BYTE, self.size * self.size * 4)
+            bgl.glTexImage2D(bgl.GL_TEXTURE_2D, 0, bgl.GL_RGBA, self.size, self.size, 0,
+                             bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, empty)
+        return self.texture
+
+    def free(self):
+        if self.texture is not None:
+            texArray = bgl.Buffer(bgl.GL_INT, [1], [self.texture])
+            bgl.glDeleteTextures(1, texArray)
+            self.texture = None
+
+
+# --------------------------------------------------------------------
+# Text atlas
+# Labels are keyed on their content (text, font, size, dpi & color), so
+# identical labels share the same texture space.
+# When the atlas is full the least recently drawn page is evicted, its
+# labels get rasterized again the next time they are drawn.
+# --------------------------------------------------------------------
+class TextAtlas():
+
+    def __init__(self):
+        self.pages = []
+        self.labels = {}  # key -> (page, x, y, width, height)
+        self.tick = 1
+
+    def has_label(self, key):
+        return key in self.labels
+
+    def add_label(self, key, width, height, buffer):
+        if key in self.labels:
+            self.remove_label(key)
+
+        page, x, y = self.allocate(align_size(width + PADDING), align_size(height + PADDING))
+
+        bgl.glActiveTexture(bgl.GL_TEXTURE0)
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, page.get_texture())
+        bgl.glTexSubImage2D(bgl.GL_TEXTURE_2D, 0, x, y, width, height,
+                            bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, buffer)
+
+        page.keys.add(key)
+        page.mipsDirty = True
+        self.labels[key] = (page, x, y, width, height)
+
+    def remove_label(self, key):
+        page = self.labels.pop(key)[0]
+        page.keys.discard(key)
+
+    def allocate(self, width, height):
+        for page in self.pages:
+            position = page.packer.allocate(width, height)
+            if position is not None:
+                return (page,) + position
+
+        # Labels bigger than a page get a page of their own
+        size = PAGE_SIZE
+        while size < width or size < height:
+            size *= 2
+
+        if len(self.pages) >= MAX_PAGES:
+            self.evict_page()
+
+        page = AtlasPage(size)
+        self.pages.append(page)
+        return (page,) + page.packer.allocate(width, height)
+
+    # Drop the least recently drawn page, unless it's in use this frame
+    def evict_page(self):
+        oldest = min(self.pages, key=lambda page: page.lastUsed)
+        if oldest.lastUsed >= self.tick:
+            return
+
+        for key in oldest.keys:
+            del self.labels[key]
+        oldest.free()
+        self.pages.remove(oldest)
+
+    # card: 4 world space corners, uvs: matching [0,1] label coords
+    def queue_label(self, key, card, uvs):
+        page, x, y, width, height = self.labels[key]
+        page.lastUsed = self.tick
+
+        size = page.size
+        pageUVs = [((x + uv[0] * width) / size, (y + uv[1] * height) / size) for uv in uvs]
+        for idx in (0, 1, 2, 0, 2, 3):
+            page.quads.append((card[idx], pageUVs[idx]))
+
+    # Draw all queued labels, one batch per page
+    def flush(self, shader):
+        for page in self.pages:
+            if len(page.quads) == 0:
+                continue
+
+            bgl.glActiveTexture(bgl.GL_TEXTURE0)
+            bgl.glBindTexture(bgl.GL_TEXTURE_2D, page.get_texture())
+
+            # Rebuild the downsampled levels once per batch of new labels
+            if page.mipsDirty:
+                bgl.glGenerateMipmap(bgl.GL_TEXTURE_2D)
+                page.mipsDirty = False
+
+            shader.bind()
+            shader.uniform_int("image", 0)
+
+            batch = batch_for_shader(shader, 'TRIS', {
+                "pos": [quad[0] for quad in page.quads],
+                "uv": [quad[1] for quad in page.quads],
+            })
+            batch.draw(shader)
+            page.quads.clear()
+
+        self.tick += 1
+
+    def clear(self):
+        for page in self.pages:
+            page.free()
+        self.pages.clear()
+        self.labels.clear()
+
+
+textAtlas = TextAtlas()
@@ -18,11 +18,13 @@ from bpy.props import (
         )
 
 from .measureit_arch_render import render_main
+from .measureit_arch_baseclass import queue_text_update
 from datetime import datetime
 
 def scene_text_update_flag(self, context):
     scene = context.scene
     scene.MeasureItArchProps.text_updated = True
+    queue_text_update(scene.MeasureItArchProps)
     update(self,context)
 
 def update(self,context):
@@ -44,7 +46,8 @@ def update(self,context):
     else:
         update_camera_px(scene,camera)
 
-    if view.view_layer != "":
+    # There's no window to switch the view layer on in background mode
+    if view.view_layer != "" and context.window is not None:
         vl = context.scene.view_layers[view.view_layer]
         context.window.view_layer = vl
 
@@ -57,7 +60,7 @@ def update(self,context):
             renderpath = bpy.path.abspath(view.output_path)
             datepath = os.path.join(renderpath, today.strftime('%Y%m%d'))
             if not os.path.exists(datepath):
-                os.mkdir(renderpath + today.strftime('%Y%m%d'))
+                os.mkdir(datepath)
             render.filepath = os.path.join(datepath, filenameStr)
               
 def update_camera(scene,camera):
@@ -540,7 +543,9 @@ class M_ARCH_OP_Render_Preview(Operator):
             self.report({'INFO'}, msg)
             if 'preview' in view:
                 del view['preview']
-            view['preview'] = render_results[1]
+            # Tiled renders go straight to file, there's no buffer to preview
+            if render_results[1] is not None:
+                view['preview'] = render_results[1]
         del render_results
 
             
@@ -0,0 +1,95 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Minimal streaming PNG writer for 8 bit RGBA renders.
+# Rows are compressed a block at a time, so writing a frame
+# never needs more than one extra block of memory.
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+ROWS_PER_BLOCK = 256
+
+
+def write_chunk(file, chunkType, data):
+    file.write(struct.pack('>I', len(data)))
+    file.write(chunkType)
+    file.write(data)
+    file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunkType)) & 0xffffffff))
+
+
+# --------------------------------------------------------------------
+# Streaming writer, rows are added top to bottom in any number of
+# calls, so a frame can be written a strip at a time
+# --------------------------------------------------------------------
+class PNGWriter():
+
+    def __init__(self, filepath, width, height, compression=6):
+        self.width = width
+        self.height = height
+        self.compressor = zlib.compressobj(compression)
+        self.file = open(filepath, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        # 8 bit depth, color type 6 (RGBA)
+        write_chunk(self.file, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        self.block = np.zeros((ROWS_PER_BLOCK, width * 4 + 1), dtype=np.uint8)
+
+    # rows: (n, width, 4) uint8 array, top row first
+    def write_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.uint8).reshape(-1, self.width * 4)
+        for row in range(0, len(rows), ROWS_PER_BLOCK):
+            blockRows = rows[row:row + ROWS_PER_BLOCK]
+            # Each row starts with its filter type, 0 (none)
+            self.block[:len(blockRows), 1:] = blockRows
+            data = self.compressor.compress(self.block[:len(blockRows)].tobytes())
+            if len(data) > 0:
+                write_chunk(self.file, b'IDAT', data)
+
+    def close(self):
+        if self.file is None:
+            return
+        write_chunk(self.file, b'IDAT', self.compressor.flush())
+        write_chunk(self.file, b'IEND', b'')
+        self.file.close()
+        self.file = None
+
+
+# --------------------------------------------------------------------
+# Write an (height, width, 4) uint8 array to a PNG file
+# flip: rows are stored bottom to top, like an OpenGL read back
+# --------------------------------------------------------------------
+def write_png(filepath, pixels, flip=True, compression=6):
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    height, width = pixels.shape[:2]
+    if flip:
+        pixels = pixels[::-1]
+
+    writer = PNGWriter(filepath, width, height, compression)
+    try:
+        writer.write_rows(pixels)
+    finally:
+        writer.close()
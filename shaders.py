@@ -119,6 +119,69 @@ class Base_Shader_3D_AA ():
         }
     '''
 
+# --------------------------------------------------------------------
+# Anti aliased line fragment shader, shared by the single item and the
+# batch shaders
+# color: GLSL expression of the line color
+# uniforms: declarations the color needs
+# toFramebuffer: convert to the framebuffer color space (Blender 2.83+)
+# --------------------------------------------------------------------
+def aa_fragment_source(color, uniforms='', toFramebuffer=True):
+    output = 'aaColor'
+    if toFramebuffer:
+        output = 'blender_srgb_to_framebuffer_space(aaColor)'
+
+    return '''
+        in vec2 mTexCoord;
+        in vec4 fcolor;
+        in vec4 gl_FragCoord;
+        in float alpha;
+
+        %s
+        uniform bool depthPass;
+
+        out vec4 fragColor;
+
+        void main()
+        {
+            vec4 lineColor = %s;
+            vec4 aaColor = vec4(lineColor[0],lineColor[1],lineColor[2],alpha*lineColor[3]);
+            vec4 mixColor = vec4(lineColor[0],lineColor[1],lineColor[2],0);
+
+            vec2 center = vec2(0,0.5);
+            float dist = length(mTexCoord - center);
+            float distFromEdge = 1-(dist*2);
+
+            float delta = fwidth(distFromEdge);
+            float threshold = 1.5 * delta;
+            float aa = clamp((distFromEdge/threshold)+0.5,0,1);
+            aa = smoothstep(0,1,aa);
+
+            aaColor = mix(mixColor,aaColor,aa);
+
+            if(depthPass){
+                if (aa<1){
+                    discard;
+                }
+            }
+            
+            fragColor = %s; 
+        }
+    ''' % (uniforms, color, output)
+
+class Batch_Frag_Shaders_3D ():
+    aa_fragment_shader = aa_fragment_source('fcolor', toFramebuffer=False)
+
+    base_fragment_shader = '''
+        in vec4 fcolor;
+        out vec4 fragColor;
+
+        void main()
+        {
+            fragColor = fcolor;
+        }
+    '''
+
 class Line_Shader_3D ():
     geometry_shader = '''
         layout(lines) in;
@@ -429,41 +492,17 @@ class Frag_Shaders_3D_B283 ():
         }
     '''
     
-    aa_fragment_shader = '''
-        in vec2 mTexCoord;
-        in vec4 fcolor;
-        in vec4 gl_FragCoord;
-        in float alpha;
+    aa_fragment_shader = aa_fragment_source('finalColor', uniforms='uniform vec4 finalColor;')
 
-        uniform vec4 finalColor;
-        uniform bool depthPass;
+    aa_batch_fragment_shader = aa_fragment_source('fcolor')
 
+    base_batch_fragment_shader = '''
+        in vec4 fcolor;
         out vec4 fragColor;
 
         void main()
         {
-            
-            vec4 aaColor = vec4(finalColor[0],finalColor[1],finalColor[2],alpha*finalColor[3]);
-            vec4 mixColor = vec4(finalColor[0],finalColor[1],finalColor[2],0);
-
-            vec2 center = vec2(0,0.5);
-            float dist = length(mTexCoord - center);
-            float distFromEdge = 1-(dist*2);
-
-            float delta = fwidth(distFromEdge);
-            float threshold = 1.5 * delta;
-            float aa = clamp((distFromEdge/threshold)+0.5,0,1);
-            aa = smoothstep(0,1,aa);
-
-            aaColor = mix(mixColor,aaColor,aa);
-
-            if(depthPass){
-                if (aa<1){
-                    discard;
-                }
-            }
-            
-            fragColor = blender_srgb_to_framebuffer_space(aaColor); 
+            fragColor = blender_srgb_to_framebuffer_space(fcolor);
         }
     '''
 
@@ -772,6 +811,221 @@ class Point_Shader_3D ():
         }  
     '''
 
+class Batch_Shader_3D ():
+    # Shared by the line and point batch shaders,
+    # color and thickness come in per vertex
+    vertex_shader = '''
+        uniform mat4 ModelViewProjectionMatrix;
+        uniform float offset;
+        in vec3 pos;
+        in vec4 color;
+        in float weight;
+
+        out VS_OUT
+        {
+            vec4 color;
+            float weight;
+        } vs_out;
+
+        void main()
+        {
+            vec4 vecOffset = vec4(0.0,0.0,offset,0.0);
+            gl_Position = ModelViewProjectionMatrix * vec4(pos, 1.0) + vecOffset;
+            vs_out.color = color;
+            vs_out.weight = weight;
+        }
+    '''
+
+    tri_vertex_shader = '''
+        uniform mat4 ModelViewProjectionMatrix;
+        uniform float offset;
+        in vec3 pos;
+        in vec4 color;
+
+        out vec4 fcolor;
+
+        void main()
+        {
+            vec4 vecOffset = vec4(0.0,0.0,offset,0.0);
+            gl_Position = ModelViewProjectionMatrix * vec4(pos, 1.0) + vecOffset;
+            fcolor = color;
+        }
+    '''
+
+    line_geometry_shader = '''
+        layout(lines) in;
+        layout(triangle_strip, max_vertices = 10) out;
+
+        in VS_OUT {
+            vec4 color;
+            float weight;
+        } gs_in[];
+
+        uniform vec2 Viewport;
+
+        out vec2 mTexCoord;
+        out vec4 fcolor;
+        out float alpha;
+
+        vec2 pxVec = vec2(1.0/Viewport.x,1.0/Viewport.y);
+        float minLength =  length(pxVec);
+
+        vec2 get_line_width(vec2 normal, float width){
+            vec2 offsetvec = vec2(normal * width);
+            offsetvec.x /= Viewport.x;
+            offsetvec.y /= Viewport.y;
+
+            if (length(offsetvec) < minLength){
+                offsetvec = normalize(offsetvec);
+                offsetvec *= minLength;
+            }
+            return(offsetvec);
+        }
+
+        float get_line_alpha(vec2 normal, float width){
+            vec2 offsetvec = vec2(normal * width);
+            offsetvec.x /= Viewport.x;
+            offsetvec.y /= Viewport.y;
+
+            float alpha = 1.0;
+            if (length(offsetvec) < minLength){
+                alpha *= (length(offsetvec)/minLength);
+            }
+            return alpha;
+        }
+
+        void main() {
+            //calculate line normal
+
+            vec4 p1 =  gl_in[0].gl_Position;
+            vec4 p2 =  gl_in[1].gl_Position;
+            
+            vec2 ssp1 = vec2(p1.xy / p1.w);
+            vec2 ssp2 = vec2(p2.xy / p2.w);
+
+            float width = gs_in[0].weight;
+
+            vec2 dir = normalize(ssp2 - ssp1);
+            vec2 normal = vec2(-dir[1], dir[0]);
+            normal = normalize(normal);
+
+            // get offset factor from normal and per vertex thickness
+            vec2 offset = get_line_width(normal,width);
+            float lineAlpha = get_line_alpha(normal,width);
+
+            vec4 coords[4];
+            vec2 texCoords[4];
+
+            coords[0] = vec4((ssp1 + offset)*p1.w,p1.z,p1.w);
+            texCoords[0] = vec2(0,1);
+
+            coords[1] = vec4((ssp1 - offset)*p1.w,p1.z,p1.w);
+            texCoords[1] = vec2(0,0);
+
+            coords[2] = vec4((ssp2 + offset)*p2.w,p2.z,p2.w);
+            texCoords[2] = vec2(0,1);
+
+            coords[3] = vec4((ssp2 - offset)*p2.w,p2.z,p2.w);
+            texCoords[3] = vec2(0,0);
+
+            for (int i = 0; i < 4; ++i) {
+                mTexCoord = texCoords[i];
+                gl_Position = coords[i];
+                fcolor = gs_in[0].color;
+                alpha = lineAlpha;
+                EmitVertex();
+            }
+            EndPrimitive();
+        }  
+    '''
+
+    point_geometry_shader = '''
+        layout(points) in;
+        layout(triangle_strip, max_vertices = 50) out;
+
+        in VS_OUT {
+            vec4 color;
+            float weight;
+        } gs_in[];
+
+        uniform vec2 Viewport;
+
+        out vec2 mTexCoord;
+        out vec4 fcolor;
+        out float alpha;
+
+        float aspect = Viewport.x/Viewport.y;
+
+        const float PI = 3.1415926;
+
+        vec2 pxVec = vec2(1.0/Viewport.x,1.0/Viewport.y);
+        float minLength =  length(pxVec);
+
+        vec2 get_line_width(vec2 normal, float width){
+            vec2 offsetvec = vec2(normal * width);
+            offsetvec.x /= Viewport.x;
+            offsetvec.y /= Viewport.y;
+
+            if (length(offsetvec) < minLength){
+                offsetvec = normalize(offsetvec);
+                offsetvec *= minLength;
+            }
+            return(offsetvec);
+        }
+
+        float get_line_alpha(vec2 normal, float width){
+            vec2 offsetvec = vec2(normal * width);
+            offsetvec.x /= Viewport.x;
+            offsetvec.y /= Viewport.y;
+
+            float alpha = 1.0;
+            if (length(offsetvec) < minLength){
+                alpha *= (length(offsetvec)/minLength);
+            }
+            return alpha;
+        }
+
+        void main() {
+            vec4 p1 =  gl_in[0].gl_Position;
+            vec2 ssp1 = vec2(p1.xy / p1.w);
+
+            float thickness = gs_in[0].weight;
+            float val = 0.8625;
+            float radius = length(get_line_width(vec2(val), thickness));
+            float lineAlpha = get_line_alpha(vec2(val), thickness);
+
+            gl_Position = gl_in[0].gl_Position;
+            mTexCoord = vec2(0,0.5);
+            fcolor = gs_in[0].color;
+            alpha = lineAlpha;
+            EmitVertex();
+            
+            int segments = int(thickness) + 5;
+            segments = clamp(segments,0,24);
+            for (int i = 0; i <= segments; i++) {
+                // Angle between each side in radians
+                float ang = PI * 2.0 / segments * i;
+
+                // Offset from center of point
+                vec2 offset = vec2(cos(ang)*radius, -sin(ang)*radius);
+                offset.x /= aspect;
+                mTexCoord = vec2(0,1);
+                gl_Position = vec4((ssp1 + offset)*p1.w,p1.z,p1.w);
+                fcolor = gs_in[0].color;
+                alpha=lineAlpha;
+                EmitVertex();
+
+                gl_Position = gl_in[0].gl_Position;
+                mTexCoord = vec2(0,0.5);
+                fcolor = gs_in[0].color;
+                alpha=lineAlpha;
+                EmitVertex();
+            }
+
+            EndPrimitive();
+        }  
+    '''
+
 class Text_Shader():
     vertex_shader = '''
     uniform mat4 ModelViewProjectionMatrix;
@@ -0,0 +1,186 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Deferred SVG export.
+# The recorder stands in for the SVG Drawing during the draw
+# loop and keeps world space segments and fills as plain arrays
+# instead of projecting them. The recorded job is replayed by
+# export_drawing, which only needs NumPy, so jobs can be run
+# in worker processes while Blender draws the next View.
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+import time
+
+import numpy as np
+
+try:
+    from . import svg_occlusion
+    from . import svg_paths
+    from . import svg_writer
+except ImportError:
+    # Loaded as a top level module by the export worker processes,
+    # which have the addon folder on their path but no bpy
+    import svg_occlusion
+    import svg_paths
+    import svg_writer
+
+
+# --------------------------------------------------------------------
+# Write projected line segments into a group
+# p1ss, p2ss: (N,2) arrays of SVG image positions
+# --------------------------------------------------------------------
+def write_lines(svg, group, p1ss, p2ss, mergePaths, precision, join):
+    if mergePaths:
+        # One path of chained polylines for the whole group
+        pathData = svg_paths.segments_to_path(p1ss, p2ss, precision)
+        if pathData != '':
+            group.add(svg.path(d=pathData, fill='none', stroke_linejoin=join))
+    else:
+        group.add_lines(p1ss.tolist(), p2ss.tolist())
+
+
+# --------------------------------------------------------------------
+# Write triangles into a group
+# coords3d: (N*3,3) world space corners, coords2d: the SVG positions
+# --------------------------------------------------------------------
+def write_fills(svg, group, coords3d, coords2d, mergePaths, precision):
+    if mergePaths:
+        # Union the triangles of each plane into outlines
+        for pathData in svg_paths.triangles_to_paths(coords3d, coords2d, precision):
+            group.add(svg.path(d=pathData))
+        return
+
+    coords2d = coords2d.tolist()
+    for x in range(0, len(coords2d) - 2, 3):
+        group.add(svg.polygon(points=coords2d[x:x + 3]))
+
+
+# --------------------------------------------------------------------
+# Drawing stand in that records everything added to it
+# Elements are the streaming writer's, only writing is replaced, so
+# the draw functions can't tell the difference
+# --------------------------------------------------------------------
+class SVGRecorder(svg_writer.Drawing):
+
+    def __init__(self, filename, size=('100%', '100%'), pretty=True, **extra):
+        svg_writer.SVGElement.__init__(self, self, 'svg', {}, container=True)
+        self.filename = filename
+        self.size = size
+        self.pretty = pretty
+        self.extra = extra
+        self.index = 0
+        self.numContainers = 1
+        self.ops = []
+
+    def write_element(self, parent, element):
+        self.ops.append(('ADD', parent.index, element.tag, element.attribs, element.content, element.container))
+        if element.container:
+            element.index = self.numContainers
+            self.numContainers += 1
+
+    def write_lines(self, parent, starts, ends):
+        self.ops.append(('LINES2D', parent.index,
+                         np.asarray(starts, dtype=np.float64).reshape(-1, 2),
+                         np.asarray(ends, dtype=np.float64).reshape(-1, 2)))
+
+    # segStart, segEnd: (N,3) world space points
+    # zOffset: depth test offset, None draws the segments unclipped
+    def record_lines(self, group, segStart, segEnd, zOffset, join):
+        self.ops.append(('LINES', group.index,
+                         np.asarray(segStart, dtype=np.float64), np.asarray(segEnd, dtype=np.float64),
+                         zOffset, join))
+
+    # coords3d: (N*3,3) world space triangle corners
+    def record_fills(self, group, coords3d):
+        self.ops.append(('FILLS', group.index, np.asarray(coords3d, dtype=np.float64)))
+
+    def save(self, pretty=None):
+        pass
+
+    # --------------------------------------------------------------------
+    # Everything export_drawing needs, as plain data
+    # depthPath: .npy file of the linear depth buffer, or None
+    # --------------------------------------------------------------------
+    def get_job(self, viewMatrix, projectionMatrix, width, height, depthPath, mergePaths, precision):
+        return {
+            'filename': self.filename,
+            'size': self.size,
+            'pretty': self.pretty,
+            'extra': self.extra,
+            'ops': self.ops,
+            'viewMatrix': np.asarray(viewMatrix, dtype=np.float64),
+            'projectionMatrix': np.asarray(projectionMatrix, dtype=np.float64),
+            'width': width,
+            'height': height,
+            'depthPath': depthPath,
+            'mergePaths': mergePaths,
+            'precision': precision,
+        }
+
+
+# --------------------------------------------------------------------
+# Replay a recorded job to its SVG file
+# return: (filename, seconds)
+# --------------------------------------------------------------------
+def export_drawing(job):
+    start = time.perf_counter()
+    viewMatrix = job['viewMatrix']
+    projectionMatrix = job['projectionMatrix']
+
+    depthBuffer = None
+    if job['depthPath'] is not None:
+        depthBuffer = np.load(job['depthPath'], mmap_mode='r')
+
+    projection = svg_occlusion.CameraProjection(viewMatrix, projectionMatrix, job['width'], job['height'])
+    to_image = projection.to_image
+
+    svg = svg_writer.Drawing(job['filename'], job['size'], job['pretty'], **job['extra'])
+    containers = [svg]
+    try:
+        for op in job['ops']:
+            parent = containers[op[1]]
+            if op[0] == 'ADD':
+                tag, attribs, content, container = op[2:]
+                element = parent.add(svg_writer.SVGElement(svg, tag, attribs, content, container))
+                if container:
+                    containers.append(element)
+
+            elif op[0] == 'LINES2D':
+                parent.add_lines(op[2].tolist(), op[3].tolist())
+
+            elif op[0] == 'LINES':
+                segStart, segEnd, zOffset, join = op[2:]
+                if zOffset is not None and depthBuffer is not None:
+                    segStart, segEnd = svg_occlusion.clip_segments(
+                        segStart, segEnd, depthBuffer, viewMatrix, projectionMatrix, zOffset=zOffset)
+                write_lines(svg, parent, to_image(segStart), to_image(segEnd),
+                            job['mergePaths'], job['precision'], join)
+
+            elif op[0] == 'FILLS':
+                coords3d = op[2]
+                write_fills(svg, parent, coords3d, to_image(coords3d), job['mergePaths'], job['precision'])
+    finally:
+        svg.save()
+        del depthBuffer
+
+    return job['filename'], time.perf_counter() - start
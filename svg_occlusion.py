@@ -0,0 +1,225 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Batched depth buffer occlusion for the SVG export.
+# Everything in here works on plain NumPy arrays so that it
+# can be run on a whole line group at once (and without bpy).
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+import numpy as np
+
+
+# --------------------------------------------------------------------
+# Linearize a raw [0,1] depth buffer to camera space distances
+# (vectorized version of svg_shaders.true_z_buffer)
+# --------------------------------------------------------------------
+def linearize_depth(zValues, cameraType, nearClip, farClip):
+    zValues = np.asarray(zValues, dtype=np.float32)
+    if cameraType == 'ORTHO':
+        return zValues * (farClip - nearClip) + nearClip
+
+    elif cameraType == 'PERSP':
+        z_ndc = 2.0 * zValues - 1.0
+        return 2.0 * nearClip * farClip / (farClip + nearClip - z_ndc * (farClip - nearClip))
+
+    return zValues
+
+
+# --------------------------------------------------------------------
+# Transform an (N,3) array of points by a 4x4 matrix
+# --------------------------------------------------------------------
+def transform_points(points, matrix):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+# --------------------------------------------------------------------
+# Projection of a camera into the render image, the matrices are
+# combined once so projecting is a single matrix product per batch
+# of points
+# --------------------------------------------------------------------
+class CameraProjection():
+
+    def __init__(self, viewMatrix, projectionMatrix, width, height):
+        self.viewMatrix = np.asarray(viewMatrix, dtype=np.float64)
+        self.projectionMatrix = np.asarray(projectionMatrix, dtype=np.float64)
+        self.width = width
+        self.height = height
+        self.matrix = self.projectionMatrix @ self.viewMatrix
+
+    # --------------------------------------------------------------------
+    # Project world space points to the render image
+    # return (N,3) array of pixel x, pixel y (origin bottom left, like the
+    # depth buffer) and camera space depth (like world_to_camera_view z)
+    # --------------------------------------------------------------------
+    def project(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        clipCoords = points @ self.matrix[:, :3].T + self.matrix[:, 3]
+
+        w = clipCoords[:, 3]
+        w = np.where(np.abs(w) < 1e-12, 1e-12, w)
+
+        projected = np.empty((len(points), 3))
+        projected[:, 0] = (clipCoords[:, 0] / w + 1.0) * 0.5 * self.width
+        projected[:, 1] = (clipCoords[:, 1] / w + 1.0) * 0.5 * self.height
+        projected[:, 2] = -(points @ self.viewMatrix[2, :3] + self.viewMatrix[2, 3])
+        return projected
+
+    # Same as world_to_camera_view, x & y are 0 to 1 across the image
+    def camera_view(self, points):
+        projected = self.project(points)
+        projected[:, 0] /= self.width
+        projected[:, 1] /= self.height
+        return projected
+
+    # (N,2) positions in the SVG image, y down
+    def to_image(self, points):
+        locations = self.project(points)[:, :2]
+        locations[:, 1] = self.height - locations[:, 1]
+        return locations
+
+
+def project_points(points, viewMatrix, projectionMatrix, width, height):
+    return CameraProjection(viewMatrix, projectionMatrix, width, height).project(points)
+
+
+# --------------------------------------------------------------------
+# Conservative test of axis aligned boxes against the view frustum
+# matrix: 4x4 projection @ view (@ object) matrix
+# boxMins, boxMaxs: (N,3) box corners
+# margin: widens the sides of the frustum (not near & far)
+# return (N,) bool, False only for boxes entirely outside one clip plane
+# --------------------------------------------------------------------
+def boxes_in_frustum(matrix, boxMins, boxMaxs, margin=1.0):
+    boxMins = np.asarray(boxMins, dtype=np.float64).reshape(-1, 3)
+    boxMaxs = np.asarray(boxMaxs, dtype=np.float64).reshape(-1, 3)
+    matrix = np.asarray(matrix, dtype=np.float64)
+
+    corners = np.ones((len(boxMins), 8, 4))
+    for corner in range(8):
+        useMax = [(corner >> axis) & 1 == 1 for axis in range(3)]
+        corners[:, corner, :3] = np.where(useMax, boxMaxs, boxMins)
+    clipCoords = corners @ matrix.T
+
+    # Clip planes are -w <= x,y,z <= w
+    w = clipCoords[:, :, 3]
+    inside = np.ones(len(boxMins), dtype=bool)
+    for axis, axisMargin in ((0, margin), (1, margin), (2, 1.0)):
+        inside &= ~np.all(clipCoords[:, :, axis] > w * axisMargin, axis=1)
+        inside &= ~np.all(clipCoords[:, :, axis] < -w * axisMargin, axis=1)
+    return inside
+
+
+# --------------------------------------------------------------------
+# Test the sampled points against the linear depth buffer
+# Points outside of the image can't be tested and count as visible
+# --------------------------------------------------------------------
+def sample_visibility(projected, depthBuffer, zOffset):
+    height, width = depthBuffer.shape
+    px = projected[:, 0]
+    py = projected[:, 1]
+    pz = projected[:, 2]
+
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height) & (pz > 0)
+    ix = np.clip(px.astype(np.int64), 0, width - 1)
+    iy = np.clip(py.astype(np.int64), 0, height - 1)
+
+    bufferDepth = depthBuffer[iy, ix]
+    return ~inside | (bufferDepth > pz - zOffset)
+
+
+# --------------------------------------------------------------------
+# Clip a set of world space segments against the depth buffer
+# segStart, segEnd: (N,3) world space segment end points
+# depthBuffer: (height, width) array of linear depth values
+# samplesSpacing: distance in pixels between depth samples
+# return: (M,3), (M,3) start and end points of the visible
+#         sub-segments in world space
+# --------------------------------------------------------------------
+def clip_segments(segStart, segEnd, depthBuffer, viewMatrix, projectionMatrix,
+                  zOffset=0.1, sampleSpacing=2.0, maxSamples=256):
+    segStart = np.asarray(segStart, dtype=np.float64).reshape(-1, 3)
+    segEnd = np.asarray(segEnd, dtype=np.float64).reshape(-1, 3)
+    numSegs = len(segStart)
+    if numSegs == 0 or depthBuffer is None:
+        return segStart, segEnd
+
+    height, width = depthBuffer.shape
+    projection = CameraProjection(viewMatrix, projectionMatrix, width, height)
+
+    # Number of samples per segment, based on its length on screen
+    pStart = projection.project(segStart)
+    pEnd = projection.project(segEnd)
+    pxLength = np.hypot(pEnd[:, 0] - pStart[:, 0], pEnd[:, 1] - pStart[:, 1])
+    pxLength = np.nan_to_num(pxLength, nan=0.0, posinf=0.0)
+    numSamples = np.clip(np.ceil(pxLength / sampleSpacing), 1, maxSamples).astype(np.int64) + 1
+
+    # Flat sample arrays, segIdx maps each sample to its segment
+    segIdx = np.repeat(np.arange(numSegs), numSamples)
+    firstSample = np.cumsum(numSamples) - numSamples
+    sampleIdx = np.arange(len(segIdx)) - np.repeat(firstSample, numSamples)
+    t = sampleIdx / (numSamples[segIdx] - 1)
+
+    segDir = segEnd - segStart
+    samples = segStart[segIdx] + segDir[segIdx] * t[:, None]
+    projected = projection.project(samples)
+    visible = sample_visibility(projected, depthBuffer, zOffset)
+
+    # Find runs of visible samples within each segment
+    isFirst = sampleIdx == 0
+    isLast = sampleIdx == numSamples[segIdx] - 1
+
+    prevVisible = np.empty_like(visible)
+    prevVisible[0] = False
+    prevVisible[1:] = visible[:-1]
+    prevVisible[isFirst] = False
+
+    nextVisible = np.empty_like(visible)
+    nextVisible[-1] = False
+    nextVisible[:-1] = visible[1:]
+    nextVisible[isLast] = False
+
+    runStarts = np.nonzero(visible & ~prevVisible)[0]
+    runEnds = np.nonzero(visible & ~nextVisible)[0]
+
+    # Move the run boundaries half way towards the neighbouring hidden sample
+    tStart = t[runStarts].copy()
+    hasHiddenBefore = ~isFirst[runStarts]
+    before = runStarts[hasHiddenBefore] - 1
+    tStart[hasHiddenBefore] = (t[before] + tStart[hasHiddenBefore]) * 0.5
+
+    tEnd = t[runEnds].copy()
+    hasHiddenAfter = ~isLast[runEnds]
+    after = runEnds[hasHiddenAfter] + 1
+    tEnd[hasHiddenAfter] = (t[after] + tEnd[hasHiddenAfter]) * 0.5
+
+    # Drop degenerate runs
+    keep = tEnd > tStart
+    runSegs = segIdx[runStarts][keep]
+    tStart = tStart[keep]
+    tEnd = tEnd[keep]
+
+    visStart = segStart[runSegs] + segDir[runSegs] * tStart[:, None]
+    visEnd = segStart[runSegs] + segDir[runSegs] * tEnd[:, None]
+    return visStart, visEnd
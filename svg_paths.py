@@ -0,0 +1,243 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Merged SVG path output.
+# Line segments are chained into polylines and triangles are
+# unioned into outlines, each written as a single <path> with
+# relative coordinates. Works on plain NumPy arrays (no bpy).
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+import numpy as np
+
+
+# --------------------------------------------------------------------
+# Snap points to the output precision, points that end up on the same
+# grid position get the same id
+# return (N,) ids, (M,2) int64 grid positions of the ids
+# --------------------------------------------------------------------
+def quantize_points(points, precision):
+    scale = 10 ** precision
+    grid = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 2) * scale).astype(np.int64)
+    if len(grid) == 0:
+        return np.zeros(0, dtype=np.int64), grid
+    unique, ids = np.unique(grid, axis=0, return_inverse=True)
+    return ids.reshape(-1), unique
+
+
+def format_number(value, precision):
+    scale = 10 ** precision
+    text = '%.*f' % (precision, value / scale)
+    if precision > 0:
+        text = text.rstrip('0').rstrip('.')
+    # .5 instead of 0.5
+    if text.startswith('0.'):
+        text = text[1:]
+    elif text.startswith('-0.'):
+        text = '-' + text[2:]
+    if text == '-0' or text == '':
+        text = '0'
+    return text
+
+
+# Numbers only need a separator when they don't start with a sign
+def join_numbers(values, precision):
+    text = ''
+    for value in values:
+        number = format_number(value, precision)
+        if text != '' and number[0] != '-':
+            text += ' '
+        text += number
+    return text
+
+
+# --------------------------------------------------------------------
+# Path data of a list of polylines given as lists of grid ids
+# --------------------------------------------------------------------
+def polylines_to_path(polylines, grid, precision):
+    commands = []
+    for polyline in polylines:
+        closed = len(polyline) > 3 and polyline[0] == polyline[-1]
+        if closed:
+            polyline = polyline[:-1]
+
+        points = grid[polyline]
+        deltas = np.diff(points, axis=0).ravel().tolist()
+        start = points[0].tolist()
+
+        command = 'M' + join_numbers(start, precision)
+        if len(deltas) > 0:
+            command += 'l' + join_numbers(deltas, precision)
+        else:
+            # Single point, keep it as a dot for round caps
+            command += 'l0 0'
+        if closed:
+            command += 'z'
+        commands.append(command)
+    return ''.join(commands)
+
+
+# --------------------------------------------------------------------
+# Chain segments that share end points into polylines
+# startIds, endIds: grid ids of the segment end points
+# return: list of polylines as lists of grid ids
+# --------------------------------------------------------------------
+def chain_segments(startIds, endIds):
+    startIds = np.asarray(startIds).tolist()
+    endIds = np.asarray(endIds).tolist()
+    numSegs = len(startIds)
+
+    incident = {}
+    for seg in range(numSegs):
+        incident.setdefault(startIds[seg], []).append(seg)
+        incident.setdefault(endIds[seg], []).append(seg)
+
+    used = bytearray(numSegs)
+
+    def walk(node):
+        path = []
+        segs = incident[node]
+        while True:
+            while len(segs) > 0 and used[segs[-1]]:
+                segs.pop()
+            if len(segs) == 0:
+                return path
+            seg = segs.pop()
+            used[seg] = 1
+            if startIds[seg] == node:
+                node = endIds[seg]
+            else:
+                node = startIds[seg]
+            path.append(node)
+            segs = incident[node]
+
+    # Start at loose ends first so open chains aren't split in two
+    order = sorted(range(numSegs), key=lambda seg: min(len(incident[startIds[seg]]), len(incident[endIds[seg]])) != 1)
+
+    polylines = []
+    for seg in order:
+        if used[seg]:
+            continue
+        used[seg] = 1
+        forward = walk(endIds[seg])
+        backward = walk(startIds[seg])
+        polylines.append(backward[::-1] + [startIds[seg], endIds[seg]] + forward)
+    return polylines
+
+
+# --------------------------------------------------------------------
+# Path data for a set of 2D line segments
+# --------------------------------------------------------------------
+def segments_to_path(starts, ends, precision=2):
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    numSegs = len(starts)
+    if numSegs == 0:
+        return ''
+
+    ids, grid = quantize_points(np.concatenate((starts, ends)), precision)
+    polylines = chain_segments(ids[:numSegs], ids[numSegs:])
+    return polylines_to_path(polylines, grid, precision)
+
+
+# --------------------------------------------------------------------
+# Union triangles into outlines
+# coords3d: (N*3,3) world space triangle corners, used to group the
+#           triangles by plane
+# coords2d: (N*3,2) the same corners in the SVG image
+# return: one path data string per plane, for the default nonzero fill
+#         rule. Outlines wind the same way and holes the other way, so
+#         overlapping triangles stay filled
+# --------------------------------------------------------------------
+def triangles_to_paths(coords3d, coords2d, precision=2):
+    numTris = len(coords2d) // 3
+    if numTris == 0:
+        return []
+
+    tris3d = np.asarray(coords3d, dtype=np.float64)[:numTris * 3].reshape(-1, 3, 3)
+    ids, grid = quantize_points(np.asarray(coords2d)[:numTris * 3], precision)
+    triIds = ids.reshape(-1, 3)
+
+    # Drop triangles that have no area in the image
+    triGrid = grid[triIds].astype(np.float64)
+    edgeA = triGrid[:, 1] - triGrid[:, 0]
+    edgeB = triGrid[:, 2] - triGrid[:, 0]
+    area = edgeA[:, 0] * edgeB[:, 1] - edgeA[:, 1] * edgeB[:, 0]
+    keep = area != 0
+    tris3d = tris3d[keep]
+    triIds = triIds[keep]
+    area = area[keep]
+    if len(triIds) == 0:
+        return []
+
+    # Wind every triangle the same way in the image
+    flip = area < 0
+    triIds[flip] = triIds[flip][:, ::-1]
+
+    # Plane of every triangle, normals point to the positive side of
+    # their dominant axis so both windings of a plane match
+    normals = np.cross(tris3d[:, 1] - tris3d[:, 0], tris3d[:, 2] - tris3d[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    normals /= lengths[:, None]
+    dominant = np.abs(normals).argmax(axis=1)
+    normals *= np.where(normals[np.arange(len(normals)), dominant] < 0, -1.0, 1.0)[:, None]
+    distance = np.einsum('ij,ij->i', normals, tris3d[:, 0])
+    planeKeys = np.round(np.column_stack((normals, distance)), 3)
+    planes = np.unique(planeKeys, axis=0, return_inverse=True)[1].reshape(-1)
+
+    paths = []
+    for plane in range(planes.max() + 1):
+        planeTris = triIds[planes == plane]
+
+        # Outline edges are the ones used by a single triangle
+        edges = np.concatenate((planeTris[:, [0, 1]], planeTris[:, [1, 2]], planeTris[:, [2, 0]]))
+        edgeKeys = np.sort(edges, axis=1)
+        counts = np.unique(edgeKeys, axis=0, return_inverse=True, return_counts=True)
+        outline = edges[counts[2][counts[1].reshape(-1)] == 1]
+
+        loops = chain_loops(outline)
+        if len(loops) > 0:
+            paths.append(polylines_to_path(loops, grid, precision))
+    return paths
+
+
+# Walk directed outline edges into closed loops
+def chain_loops(edges):
+    outgoing = {}
+    for start, end in edges.tolist():
+        outgoing.setdefault(start, []).append(end)
+
+    loops = []
+    for start in list(outgoing):
+        while len(outgoing[start]) > 0:
+            loop = [start]
+            node = outgoing[start].pop()
+            while node != start:
+                loop.append(node)
+                nextNodes = outgoing.get(node)
+                if not nextNodes:
+                    break
+                node = nextNodes.pop()
+            loop.append(node)
+            loops.append(loop)
+    return loops
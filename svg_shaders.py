@@ -27,12 +27,26 @@
 import bpy
 from mathutils import Vector, Matrix, Euler, Quaternion
 import math
-from math import fabs, degrees, radians, sqrt, cos, sin, pi, floor
-import bpy_extras.object_utils as object_utils
+from math import degrees, radians, sqrt, cos, sin, pi, floor
 import svgwrite
 import gpu
+import numpy as np
+
+from . import svg_occlusion
+from . import svg_export
+
+# Linear depth buffer of the current vector render, (height, width) array
+depthBuffer = None
+
+# Projection of the scene camera and the camera & resolution settings
+# it was made for
+cameraProjection = None
+cameraProjectionKey = None
+
+
+# Line joins of merged paths, matching the line caps
+joins = {'round': 'round', 'butt': 'miter'}
 
-from math import fabs
 
 def svg_line_shader(item, coords,thickness,color,svg,parent=None,dashed=False,mat=Matrix.Identity(4)):
     idName = item.name + "_lines"
@@ -56,31 +70,54 @@ def svg_line_shader(item, coords,thickness,color,svg,parent=None,dashed=False,ma
     else:
         svg.add(lines)
 
-    for x in range(0, len(coords) - 1, 2):
-        vis, p1, p2 = check_visible(coords[x],coords[x+1],mat,item)
-        if vis:
-            p1ss = get_render_location(mat@Vector(p1))
-            p2ss = get_render_location(mat@Vector(p2))
-            line = svg.line(start=tuple(p1ss),end=tuple(p2ss))
-            lines.add(line)
+    numSegs = len(coords) // 2
+    if numSegs == 0:
+        return
+
+    # Transform and clip the whole set of segments at once
+    segCoords = svg_occlusion.transform_points(
+        np.asarray(coords[:numSegs * 2], dtype=np.float64), mat)
+
+    sceneProps = bpy.context.scene.MeasureItArchProps
+    if isinstance(svg, svg_export.SVGRecorder):
+        # Projection & clipping are left to the export worker
+        zOffset = None
+        if sceneProps.vector_depthtest:
+            zOffset = get_line_depth_offset(item)
+        svg.record_lines(lines, segCoords[0::2], segCoords[1::2], zOffset, joins[cap])
+        return
+
+    segStart, segEnd = get_visible_segments(
+        segCoords[0::2], segCoords[1::2], item)
+
+    svg_export.write_lines(svg, lines, get_render_locations(segStart), get_render_locations(segEnd),
+                           sceneProps.svg_merge_paths, sceneProps.svg_precision, joins[cap])
     
 
 def svg_fill_shader(item, coords,color,svg,parent=None):
-    coords_2d = []
     idName = item.name + "_fills"
     svgColor = svgwrite.rgb(color[0]*100, color[1]*100, color[2]*100, '%')
     fills = svg.g(id=idName,fill=svgColor)
     parent.add(fills)
 
-    for coord in coords:
-        coords_2d.append(get_render_location(coord))
+    numTris = len(coords) // 3
+    if numTris == 0:
+        return
+    coords3d = np.asarray(coords[:numTris * 3], dtype=np.float64).reshape(-1, 3)
 
-    for x in range(0, len(coords_2d) - 1, 3):
-        tri = svg.polygon(points=[coords_2d[x],coords_2d[x+1],coords_2d[x+2]])
-        fills.add(tri)
+    if isinstance(svg, svg_export.SVGRecorder):
+        svg.record_fills(fills, coords3d)
+        return
 
+    sceneProps = bpy.context.scene.MeasureItArchProps
+    svg_export.write_fills(svg, fills, coords3d, get_render_locations(coords3d),
+                           sceneProps.svg_merge_paths, sceneProps.svg_precision)
 
-def svg_text_shader(item, text, mid, textCard, color,svg,parent=None):
+
+# textAlignment: overrides the one of item
+def svg_text_shader(item, text, mid, textCard, color,svg,parent=None,textAlignment=None):
+    if textAlignment is None:
+        textAlignment = item.textAlignment
 
     # Card Indicies:
     #     
@@ -90,12 +127,9 @@ def svg_text_shader(item, text, mid, textCard, color,svg,parent=None):
     #     0----------------3
 
 
-    text_position = get_render_location(mid)
     svgColor = svgwrite.rgb(color[0]*100, color[1]*100, color[2]*100, '%')
-    ssp0 = get_render_location(textCard[0])
-    ssp1 = get_render_location(textCard[1])
-    ssp2 = get_render_location(textCard[2])
-    ssp3 = get_render_location(textCard[3])
+    ssp0, ssp1, ssp2, ssp3 = get_render_locations(
+        np.array([corner[:3] for corner in textCard[:4]])).tolist()
 
     cardHeight = Vector(ssp1) - Vector(ssp0)
     
@@ -120,19 +154,19 @@ def svg_text_shader(item, text, mid, textCard, color,svg,parent=None):
 
     text_position = (0,0)
     text_anchor = 'start'
-    if item.textAlignment == 'L':
+    if textAlignment == 'L':
         text_position  = leftVec
         text_anchor = 'start'
         position_flip = rightVec
         anchor_flip = 'end'
 
-    if item.textAlignment == 'C':
+    if textAlignment == 'C':
         text_position  = midVec
         text_anchor = 'middle'
         position_flip = midVec
         anchor_flip = 'middle'
 
-    if item.textAlignment == 'R':
+    if textAlignment == 'R':
         text_position  = rightVec
         text_anchor = 'end'
         position_flip = leftVec
@@ -178,30 +212,12 @@ def svg_text_shader(item, text, mid, textCard, color,svg,parent=None):
 # return 2d position
 # --------------------------------------------------------------------
 def get_render_location(mypoint):
-    scene = bpy.context.scene
-    render_scale = scene.render.resolution_percentage / 100
-    
-    width = int(scene.render.resolution_x * render_scale)
-    height = int(scene.render.resolution_y * render_scale)
-
-    v1 = Vector(mypoint)
-
-    co_2d = object_utils.world_to_camera_view(scene, scene.camera, v1)
-    # Get pixel coords
-
-    return [(co_2d.x * width), height-(co_2d.y * height)]
+    return get_render_locations(np.array(mypoint[:3]))[0].tolist()
 
 
 def get_clip_space_coord(mypoint):
-    scene = bpy.context.scene
-    camera = scene.camera
-
-    v1 = Vector(mypoint)
-    co_camera_space = object_utils.world_to_camera_view(scene, scene.camera, v1)
-
-    co_clip = Vector((co_camera_space.x,co_camera_space.y,co_camera_space.z))
-
-    return co_clip
+    projection = get_camera_projection(bpy.context.scene)
+    return Vector(projection.camera_view(np.array(mypoint[:3]))[0])
 
 
 
@@ -227,117 +243,104 @@ def true_z_buffer(context,zValue):
         
 
 
-def check_visible(p1,p2,mat,item,numIterations=0):
-    context = bpy.context
-    scene = bpy.context.scene
-    camera = scene.camera
-    render = scene.render
+# --------------------------------------------------------------------
+# Store the depth buffer of the current vector render
+# buffer: raw [0,1] depth values as read back from the offscreen
+# Pass None to release it once the export is finished
+# --------------------------------------------------------------------
+def set_depth_buffer(buffer, width=0, height=0, camera=None):
+    global depthBuffer
+    if buffer is None:
+        depthBuffer = None
+        return
 
-    if not scene.MeasureItArchProps.vector_depthtest:
-        return True,p1,p2
+    zValues = np.asarray(buffer, dtype=np.float32).reshape(height, width)
+    depthBuffer = svg_occlusion.linearize_depth(
+        zValues, camera.type, camera.clip_start, camera.clip_end)
 
-    #print('Drawing: ' + item.name)  
-    z_offset = 0.1
-    if 'lineDepthOffset' in item:
-        z_offset += item.lineDepthOffset/10
-        
 
-    p1Visible = True
-    p2Visible = True
+# --------------------------------------------------------------------
+# Tiled renders linearize every tile as it's read back, and pass in
+# the assembled (height, width) array, which may be memory mapped
+# --------------------------------------------------------------------
+def set_linear_depth_buffer(depth):
+    global depthBuffer
+    depthBuffer = depth
 
-    sceneProps= bpy.context.scene.MeasureItArchProps
-    if 'depthbuffer' in sceneProps:
-        depthbuffer = sceneProps['depthbuffer'].to_list()
 
-    render_scale = scene.render.resolution_percentage / 100
-    width = int(render.resolution_x * render_scale)
-    height = int(render.resolution_y * render_scale)
+# --------------------------------------------------------------------
+# Camera projection of the scene, kept until the camera, its settings
+# or the render resolution change, so all points drawn in one render
+# share the same matrices
+# --------------------------------------------------------------------
+def get_camera_projection(scene):
+    global cameraProjection
+    global cameraProjectionKey
 
-    # Get Screen Space Points
-    p1ss = get_render_location(mat@Vector(p1))
-    p1ss = Vector((p1ss[0], height-p1ss[1]))
-    p2ss = get_render_location(mat@Vector(p2))
-    p2ss = Vector((p2ss[0], height-p2ss[1]))
+    render = scene.render
+    camera = scene.camera
+    camData = camera.data
+    key = (camera.name, tuple(v for row in camera.matrix_world for v in row),
+           camData.type, camData.lens, camData.ortho_scale, camData.sensor_fit,
+           camData.sensor_width, camData.sensor_height, camData.shift_x, camData.shift_y,
+           camData.clip_start, camData.clip_end,
+           render.resolution_x, render.resolution_y, render.resolution_percentage,
+           render.pixel_aspect_x, render.pixel_aspect_y)
 
+    if cameraProjection is None or key != cameraProjectionKey:
+        render_scale = render.resolution_percentage / 100
+        width = int(render.resolution_x * render_scale)
+        height = int(render.resolution_y * render_scale)
 
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        viewMatrix = np.array(camera.matrix_world.normalized().inverted())
+        projectionMatrix = np.array(
+            camera.calc_matrix_camera(depsgraph, x=width, y=height))
 
-    ## Get Clip Space Points
-    p1clip = get_clip_space_coord(mat@ Vector(p1))
-    p2clip = get_clip_space_coord(mat@ Vector(p2))
-    
-    # Get Buffer Index and depthbuffer value based on SS Point
-    p1pxIdx = int(((width * round(p1ss[1])) + round(p1ss[0])-1)*1)
-    p2pxIdx = int(((width * round(p2ss[1])) + round(p2ss[0])-1)*1)
+        cameraProjection = svg_occlusion.CameraProjection(viewMatrix, projectionMatrix, width, height)
+        cameraProjectionKey = key
 
-    try:
-        p1depth = depthbuffer[p1pxIdx]
-    except IndexError:
-        print('Index not in Depth Buffer: ' + str(p1pxIdx) + ', ' + str(p2pxIdx) )
-        p1Visible = True
-        p1depth = 0
+    return cameraProjection
 
-    try:
-        p2depth = depthbuffer[p2pxIdx]
-    except IndexError:
-        print('Index not in Depth Buffer: ' + str(p1pxIdx) + ', ' + str(p2pxIdx) )
-        p2Visible = True
-        p2depth = 0 
 
+# --------------------------------------------------------------------
+# Get the scene camera view and projection matrices as arrays
+# --------------------------------------------------------------------
+def get_camera_matrices(scene):
+    projection = get_camera_projection(scene)
+    return projection.viewMatrix, projection.projectionMatrix, projection.width, projection.height
 
-    p1depth = true_z_buffer(context,p1depth)
-    p2depth = true_z_buffer(context,p2depth)
-    
-    # Get Depth From Clip Space point
-    p1vecdepth = (p1clip[2]) - z_offset
-    p2vecdepth = (p2clip[2]) - z_offset
-
-    # Check Clip space point against depth buffer value
-    #print('')
-    #print('p1')
-    #print(p1clip)
-    #print(str(p1depth) + ' vs ' + str(p1vecdepth) + ' at Coords: ' + str(p1ss[0]) + "," + str(p1ss[1]) + 'Index: ' + str(p1pxIdx))
-    if p1depth > p1vecdepth:
-        p1Visible = True
-    else:
-        p1Visible = False
-        #print('p1 not visible')
 
-    #print('')
+# --------------------------------------------------------------------
+# Get positions in final render image for an (N,3) array of points
+# return (N,2) array of 2d positions (same as get_render_location)
+# --------------------------------------------------------------------
+def get_render_locations(points):
+    return get_camera_projection(bpy.context.scene).to_image(points)
 
-    #print('p2')
-    #print(p2clip)
-    #print(str(p2depth) + ' vs ' + str(p2vecdepth) + ' at Coords: ' + str(p2ss[0]) + "," + str(p2ss[1]) + 'Index: ' + str(p2pxIdx))
-    if p2depth > p2vecdepth:
-        p2Visible = True
-    else:
-        p2Visible = False
-        #print('p2 not visible')
+
+# Depth test offset of an items lines
+def get_line_depth_offset(item):
+    z_offset = 0.1
+    if 'lineDepthOffset' in item:
+        z_offset += item.lineDepthOffset/10
+    return z_offset
 
 
-    if p1Visible and p2Visible:
-        #print('vis test passed')
-        return True, p1, p2
-    elif not p1Visible and not p2Visible:
-        #print('vis test failed')
-        return False, p1, p2
-    else:
-        vis = False
-        maxIter = 3
+# --------------------------------------------------------------------
+# Clip world space segments against the depth buffer
+# segStart, segEnd: (N,3) arrays of world space points
+# return: start and end points of the visible parts of the segments
+# --------------------------------------------------------------------
+def get_visible_segments(segStart, segEnd, item):
+    scene = bpy.context.scene
+    if not scene.MeasureItArchProps.vector_depthtest or depthBuffer is None:
+        return segStart, segEnd
 
-        if p1Visible and not p2Visible:
-            pass
-        else:
-            temp = p1
-            p1 = p2
-            p2 = temp
-
-        if numIterations <= maxIter:
-            numIterations += 1
-            distVector = Vector(p1)-Vector(p2)
-            dist = distVector.length
-            p3 = interpolate3d(p1,p2,fabs(dist - (dist/maxIter)*numIterations))
-            vis, p1, p2 = check_visible(p1,p3,mat,item,numIterations=numIterations)
-        return vis, p1, p2
+    viewMatrix, projectionMatrix, width, height = get_camera_matrices(scene)
+    return svg_occlusion.clip_segments(
+        segStart, segEnd, depthBuffer, viewMatrix, projectionMatrix,
+        zOffset=get_line_depth_offset(item))
 
 
 # --------------------------------------------------------------------
@@ -0,0 +1,195 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Streaming SVG writer.
+# Implements the part of the svgwrite Drawing API used by the
+# vector render, but writes every element to the file as soon
+# as it's added instead of building an element tree.
+# Groups stay open until something is added to one of their
+# ancestors, so elements have to be added depth first.
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+from xml.sax.saxutils import escape, quoteattr
+
+BUFFER_SIZE = 1 << 20
+
+
+def format_number(value):
+    if isinstance(value, float):
+        text = '%.3f' % value
+        text = text.rstrip('0').rstrip('.')
+        if text == '-0':
+            return '0'
+        return text
+    return str(value)
+
+
+def format_value(value):
+    if isinstance(value, (list, tuple)):
+        return ' '.join(format_value(item) for item in value)
+    return format_number(value)
+
+
+# svgwrite style keyword names, stroke_width -> stroke-width
+def format_attribs(attribs):
+    text = ''
+    for name, value in attribs.items():
+        if value is None:
+            continue
+        name = name.rstrip('_').replace('_', '-')
+        text += ' ' + name + '=' + quoteattr(format_value(value))
+    return text
+
+
+class SVGElement():
+
+    def __init__(self, drawing, tag, attribs, content=None, container=False):
+        self.drawing = drawing
+        self.tag = tag
+        self.attribs = attribs
+        self.content = content
+        self.container = container
+        self.isOpen = False
+
+    def add(self, element):
+        self.drawing.write_element(self, element)
+        return element
+
+    # Many lines at once, starts & ends are sequences of (x, y)
+    def add_lines(self, starts, ends):
+        self.drawing.write_lines(self, starts, ends)
+
+
+class Drawing(SVGElement):
+
+    def __init__(self, filename, size=('100%', '100%'), pretty=True, **extra):
+        attribs = {
+            'baseProfile': 'full',
+            'height': size[1],
+            'version': '1.1',
+            'width': size[0],
+            'xmlns': 'http://www.w3.org/2000/svg',
+            'xmlns:ev': 'http://www.w3.org/2001/xml-events',
+            'xmlns:xlink': 'http://www.w3.org/1999/xlink',
+        }
+        attribs.update(extra)
+        SVGElement.__init__(self, self, 'svg', attribs, container=True)
+
+        self.pretty = pretty
+        self.stack = []
+        self.file = open(filename, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+        self.file.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        self.open_element(self)
+
+    # --------------------------------------------------------------------
+    # Element factories, matching svgwrite's
+    # --------------------------------------------------------------------
+    def g(self, **extra):
+        return SVGElement(self, 'g', extra, container=True)
+
+    def line(self, start=(0, 0), end=(0, 0), **extra):
+        attribs = {'x1': start[0], 'x2': end[0], 'y1': start[1], 'y2': end[1]}
+        attribs.update(extra)
+        return SVGElement(self, 'line', attribs)
+
+    def polygon(self, points=[], **extra):
+        attribs = {'points': ' '.join(format_number(p[0]) + ',' + format_number(p[1]) for p in points)}
+        attribs.update(extra)
+        return SVGElement(self, 'polygon', attribs)
+
+    def path(self, d='', **extra):
+        attribs = {'d': d}
+        attribs.update(extra)
+        return SVGElement(self, 'path', attribs)
+
+    def text(self, text, insert=None, **extra):
+        attribs = {}
+        if insert is not None:
+            attribs['x'] = insert[0]
+            attribs['y'] = insert[1]
+        attribs.update(extra)
+        return SVGElement(self, 'text', attribs, content=text)
+
+    def image(self, href, insert=None, size=None, **extra):
+        attribs = {'xlink:href': href}
+        if insert is not None:
+            attribs['x'] = insert[0]
+            attribs['y'] = insert[1]
+        if size is not None:
+            attribs['width'] = size[0]
+            attribs['height'] = size[1]
+        attribs.update(extra)
+        return SVGElement(self, 'image', attribs)
+
+    # --------------------------------------------------------------------
+    # Writing
+    # --------------------------------------------------------------------
+    def indent(self):
+        if self.pretty:
+            return '\t' * len(self.stack)
+        return ''
+
+    def open_element(self, element):
+        self.file.write(self.indent() + '<' + element.tag + format_attribs(element.attribs) + '>\n')
+        self.stack.append(element)
+        element.isOpen = True
+
+    def close_element(self):
+        element = self.stack.pop()
+        element.isOpen = False
+        self.file.write(self.indent() + '</' + element.tag + '>\n')
+
+    # Close every group opened after parent
+    def select_parent(self, parent):
+        if not parent.isOpen:
+            raise ValueError("SVG element '" + str(parent.attribs.get('id')) + "' is already written, "
+                             "elements have to be added depth first")
+        while self.stack[-1] is not parent:
+            self.close_element()
+
+    def write_element(self, parent, element):
+        self.select_parent(parent)
+        if element.container:
+            self.open_element(element)
+        elif element.content is not None:
+            self.file.write(self.indent() + '<' + element.tag + format_attribs(element.attribs) + '>' +
+                            escape(element.content) + '</' + element.tag + '>\n')
+        else:
+            self.file.write(self.indent() + '<' + element.tag + format_attribs(element.attribs) + ' />\n')
+
+    def write_lines(self, parent, starts, ends):
+        self.select_parent(parent)
+        indent = self.indent()
+        self.file.writelines(
+            indent + '<line x1="' + format_number(p1[0]) + '" x2="' + format_number(p2[0]) +
+            '" y1="' + format_number(p1[1]) + '" y2="' + format_number(p2[1]) + '" />\n'
+            for p1, p2 in zip(starts, ends))
+
+    # pretty is only kept for svgwrite compatibility, it's set up front
+    def save(self, pretty=None):
+        if self.file is None:
+            return
+        while len(self.stack) > 0:
+            self.close_element()
+        self.file.close()
+        self.file = None